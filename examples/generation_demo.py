@@ -2,17 +2,23 @@
 生成模块使用示例
 """
 
+import asyncio
+import logging
 import os
 import sys
-from dotenv import load_dotenv
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from nodes.indexing import IndexModule
 from nodes.retrieval import RetrievalModule
 from nodes.generation import GenerationModule
+from nodes._env import load
 
-load_dotenv()
+load()
+
+# 生成模块的详细信息通过 logging 输出
+logging.basicConfig(format="%(message)s")
+logging.getLogger("nodes.generation").setLevel(logging.INFO)
 
 
 def setup_test_data():
@@ -33,7 +39,7 @@ def setup_test_data():
     return vectorstore
 
 
-def example_1_basic_generation(vectorstore):
+async def example_1_basic_generation(retrieval):
     """示例 1: 基础生成"""
     print("=" * 70)
     print("示例 1: 基础生成")
@@ -42,9 +48,7 @@ def example_1_basic_generation(vectorstore):
     query = "美国科技公司裁员的主要原因是什么？"
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 3})
-    retrieval.build(vectorstore=vectorstore)
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = await retrieval.aretrieve(query, k=3, verbose=False)
 
     # 生成
     generation = GenerationModule({
@@ -53,11 +57,11 @@ def example_1_basic_generation(vectorstore):
         "model": "qwen-plus"
     })
 
-    answer = generation.generate(query, docs)
+    answer = await generation.agenerate(query, docs)
     print(f"\n答案：\n{answer}")
 
 
-def example_2_stream_generation(vectorstore):
+async def example_2_stream_generation(retrieval):
     """示例 2: 流式生成"""
     print("\n" + "=" * 70)
     print("示例 2: 流式生成")
@@ -65,9 +69,7 @@ def example_2_stream_generation(vectorstore):
 
     query = "分析科技股是否存在泡沫"
 
-    retrieval = RetrievalModule({"strategy": "dense", "k": 3})
-    retrieval.build(vectorstore=vectorstore)
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = await retrieval.aretrieve(query, k=3, verbose=False)
 
     generation = GenerationModule({
         "prompt_strategy": "contextual",
@@ -75,10 +77,14 @@ def example_2_stream_generation(vectorstore):
         "model": "qwen-plus"
     })
 
-    answer = generation.generate(query, docs, verbose=False)
+    # 增量到达即打印，不必等待完整答案
+    print("\n答案：")
+    async for content in generation.astream(query, docs):
+        print(content, end="", flush=True)
+    print()
 
 
-def example_3_cot_generation(vectorstore):
+async def example_3_cot_generation(retrieval):
     """示例 3: 思维链生成"""
     print("\n" + "=" * 70)
     print("示例 3: Chain-of-Thought 生成")
@@ -86,9 +92,7 @@ def example_3_cot_generation(vectorstore):
 
     query = "为什么科技公司会出现大规模裁员？背后的深层原因是什么？"
 
-    retrieval = RetrievalModule({"strategy": "dense", "k": 4})
-    retrieval.build(vectorstore=vectorstore)
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = await retrieval.aretrieve(query, k=4, verbose=False)
 
     generation = GenerationModule({
         "prompt_strategy": "cot",
@@ -97,11 +101,11 @@ def example_3_cot_generation(vectorstore):
         "steps": ["理解问题", "分析上下文信息", "识别关键因素", "逻辑推理", "得出结论"]
     })
 
-    answer = generation.generate(query, docs, verbose=False)
+    answer = await generation.agenerate(query, docs, verbose=False)
     print(f"\n答案：\n{answer}")
 
 
-def example_4_verification(vectorstore):
+async def example_4_verification(retrieval):
     """示例 4: 答案验证"""
     print("\n" + "=" * 70)
     print("示例 4: 答案验证（事实核查）")
@@ -112,9 +116,7 @@ def example_4_verification(vectorstore):
     query = "美国科技公司裁员规模有多大？"
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 3})
-    retrieval.build(vectorstore=vectorstore)
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = await retrieval.aretrieve(query, k=3, verbose=False)
 
     # 生成答案
     generation = GenerationModule({
@@ -123,14 +125,15 @@ def example_4_verification(vectorstore):
         "model": "qwen-plus"
     })
 
-    answer = generation.generate(query, docs, verbose=False)
+    answer = await generation.agenerate(query, docs, verbose=False)
     print(f"\n生成的答案：\n{answer}")
 
     # 基础验证
     print("\n" + "-" * 70)
     print("基础验证：")
     verifier = VerificationOperator({"threshold": 0.5})
-    result = verifier.execute(query, docs, answer=answer)
+    # 验证算子只有同步 execute，放到线程中执行，不阻塞事件循环上的其他示例
+    result = await asyncio.to_thread(verifier.execute, query, docs, answer=answer)
     print(f"  有效性: {result['is_valid']}")
     print(f"  置信度: {result['confidence']:.2f}")
     print(f"  原因: {result['reason']}")
@@ -139,14 +142,14 @@ def example_4_verification(vectorstore):
     print("\n" + "-" * 70)
     print("事实核查：")
     fact_checker = FactCheckOperator({"model": "qwen-plus"})
-    fact_result = fact_checker.execute(query, docs, answer=answer)
+    fact_result = await asyncio.to_thread(fact_checker.execute, query, docs, answer=answer)
     print(f"  事实准确: {fact_result.get('is_factual', True)}")
     print(f"  置信度: {fact_result.get('confidence', 0.0):.2f}")
     if fact_result.get('violations'):
         print(f"  问题陈述: {fact_result['violations']}")
 
 
-def example_5_citation(vectorstore):
+async def example_5_citation(retrieval):
     """示例 5: 添加引用标注"""
     print("\n" + "=" * 70)
     print("示例 5: 添加引用标注")
@@ -157,9 +160,7 @@ def example_5_citation(vectorstore):
     query = "分析科技股的投资风险"
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 3})
-    retrieval.build(vectorstore=vectorstore)
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = await retrieval.aretrieve(query, k=3, verbose=False)
 
     # 生成答案
     generation = GenerationModule({
@@ -168,16 +169,16 @@ def example_5_citation(vectorstore):
         "model": "qwen-plus"
     })
 
-    answer = generation.generate(query, docs, verbose=False)
+    answer = await generation.agenerate(query, docs, verbose=False)
 
     # 添加引用（脚注样式）
     citation_op = CitationOperator({"style": "footnote", "model": "qwen-plus"})
-    cited_answer = citation_op.execute(query, docs, answer=answer)
+    cited_answer = await citation_op.aexecute(query, docs, answer=answer)
 
     print(f"\n添加引用后的答案：\n{cited_answer}")
 
 
-def example_6_formatting(vectorstore):
+async def example_6_formatting(retrieval):
     """示例 6: 答案格式化"""
     print("\n" + "=" * 70)
     print("示例 6: 答案格式化")
@@ -188,9 +189,7 @@ def example_6_formatting(vectorstore):
     query = "科技公司裁员的主要原因"
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 3})
-    retrieval.build(vectorstore=vectorstore)
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = await retrieval.aretrieve(query, k=3, verbose=False)
 
     # 生成答案
     generation = GenerationModule({
@@ -199,7 +198,7 @@ def example_6_formatting(vectorstore):
         "model": "qwen-plus"
     })
 
-    answer = generation.generate(query, docs, verbose=False)
+    answer = await generation.agenerate(query, docs, verbose=False)
 
     # Markdown 格式
     print("\n" + "-" * 70)
@@ -216,7 +215,7 @@ def example_6_formatting(vectorstore):
     print(json_output)
 
 
-def example_7_refinement(vectorstore):
+async def example_7_refinement(retrieval):
     """示例 7: 答案精炼"""
     print("\n" + "=" * 70)
     print("示例 7: 答案精炼")
@@ -227,9 +226,7 @@ def example_7_refinement(vectorstore):
     query = "评估当前科技行业的发展趋势"
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 4})
-    retrieval.build(vectorstore=vectorstore)
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = await retrieval.aretrieve(query, k=4, verbose=False)
 
     # 生成答案
     generation = GenerationModule({
@@ -238,7 +235,7 @@ def example_7_refinement(vectorstore):
         "model": "qwen-plus"
     })
 
-    answer = generation.generate(query, docs, verbose=False)
+    answer = await generation.agenerate(query, docs, verbose=False)
     print(f"\n原始答案：\n{answer}")
 
     # 精炼答案
@@ -248,11 +245,11 @@ def example_7_refinement(vectorstore):
         "goals": ["clarity", "conciseness", "professional"],
         "model": "qwen-plus"
     })
-    refined_answer = refiner.execute(query, docs, answer=answer)
+    refined_answer = await refiner.aexecute(query, docs, answer=answer)
     print(refined_answer)
 
 
-def example_8_complete_pipeline(vectorstore):
+async def example_8_complete_pipeline(retrieval):
     """示例 8: 完整的生成流水线"""
     print("\n" + "=" * 70)
     print("示例 8: 完整的生成流水线（生成 → 验证 → 引用 → 格式化）")
@@ -268,9 +265,7 @@ def example_8_complete_pipeline(vectorstore):
 
     # 步骤 1: 检索
     print("\n📥 步骤 1: 检索相关文档")
-    retrieval = RetrievalModule({"strategy": "dense", "k": 3})
-    retrieval.build(vectorstore=vectorstore)
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = await retrieval.aretrieve(query, k=3, verbose=False)
     print(f"✅ 检索到 {len(docs)} 个相关文档")
 
     # 步骤 2: 生成
@@ -281,20 +276,20 @@ def example_8_complete_pipeline(vectorstore):
         "model": "qwen-plus",
         "steps": ["理解问题", "分析信息", "归纳总结", "得出结论"]
     })
-    answer = generation.generate(query, docs, verbose=False)
+    answer = await generation.agenerate(query, docs, verbose=False)
     print(f"✅ 答案已生成（{len(answer)} 字符）")
 
     # 步骤 3: 验证
     print("\n🔍 步骤 3: 验证答案")
     verifier = VerificationOperator({"threshold": 0.6})
-    verification = verifier.execute(query, docs, answer=answer)
+    verification = await asyncio.to_thread(verifier.execute, query, docs, answer=answer)
     print(f"  验证结果: {'✅ 通过' if verification['is_valid'] else '❌ 未通过'}")
     print(f"  置信度: {verification['confidence']:.2f}")
 
     # 步骤 4: 添加引用
     print("\n📎 步骤 4: 添加引用")
     citation_op = CitationOperator({"style": "numbered"})
-    cited_answer = citation_op.execute(query, docs, answer=answer)
+    cited_answer = await citation_op.aexecute(query, docs, answer=answer)
     print("✅ 引用已添加")
 
     # 步骤 5: 格式化
@@ -308,23 +303,34 @@ def example_8_complete_pipeline(vectorstore):
     print(final_output)
 
 
+async def main(vectorstore):
+    """并发运行示例：各示例相互独立，总耗时约等于最慢的一个示例"""
+    # 所有示例共用一个检索模块，只在查询时调整 k
+    retrieval = RetrievalModule({"strategy": "dense", "k": 10})
+    retrieval.build(vectorstore=vectorstore)
+
+    await asyncio.gather(
+        # 基础生成示例
+        example_1_basic_generation(retrieval),
+        # example_2_stream_generation(retrieval),
+        # example_3_cot_generation(retrieval),
+
+        # 验证和后处理示例
+        # example_4_verification(retrieval),
+        # example_5_citation(retrieval),
+        # example_6_formatting(retrieval),
+        # example_7_refinement(retrieval),
+
+        # 完整流水线示例
+        # example_8_complete_pipeline(retrieval),
+    )
+
+
 if __name__ == "__main__":
     print("🚀 生成模块示例演示\n")
 
     vectorstore = setup_test_data()
 
-    # 基础生成示例
-    example_1_basic_generation(vectorstore)
-    # example_2_stream_generation(vectorstore)
-    # example_3_cot_generation(vectorstore)
-
-    # 验证和后处理示例
-    # example_4_verification(vectorstore)
-    # example_5_citation(vectorstore)
-    # example_6_formatting(vectorstore)
-    # example_7_refinement(vectorstore)
-
-    # 完整流水线示例
-    # example_8_complete_pipeline(vectorstore)
+    asyncio.run(main(vectorstore))
 
     print("\n✅ 示例演示完成！")
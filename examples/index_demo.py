@@ -6,15 +6,15 @@
 
 import os
 import sys
-from dotenv import load_dotenv
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from nodes.indexing import IndexModule
+from nodes._env import load
 
 # 加载环境变量
-load_dotenv()
+load()
 
 
 def example_1_basic_indexing():
@@ -30,7 +30,11 @@ def example_1_basic_indexing():
             "chunk_size": 1000,
             "chunk_overlap": 200,
         },
-        "embedding": {"type": "dashscope", "model": "text-embedding-v4"},
+        "embedding": {
+            "type": "dashscope",
+            "model": "text-embedding-v4",
+            "cache_path": "./data/embedding_cache.sqlite",  # 重复运行示例时复用向量
+        },
         "store": {
             "type": "chroma",
             "persist_directory": "./data/chroma_basic",
@@ -76,7 +80,11 @@ def example_2_small_to_big():
             "big_chunk_size": 2000,
             "big_chunk_overlap": 200,
         },
-        "embedding": {"type": "dashscope", "model": "text-embedding-v4"},
+        "embedding": {
+            "type": "dashscope",
+            "model": "text-embedding-v4",
+            "cache_path": "./data/embedding_cache.sqlite",
+        },
         "store": {
             "type": "chroma",
             "persist_directory": "./data/chroma_small_to_big",
@@ -95,9 +103,10 @@ def example_2_small_to_big():
     for i, doc in enumerate(results, 1):
         print(f"\n结果 {i}:")
         print(f"小块内容: {doc.page_content[:100]}...")
-        if "parent_chunk_content" in doc.metadata:
+        if "parent_chunk_id" in doc.metadata:
+            parent_content = index_module.splitter.get_parent(doc.metadata["parent_chunk_id"])
             print(f"父块大小: {doc.metadata['parent_chunk_size']} 字符")
-            print(f"父块内容预览: {doc.metadata['parent_chunk_content'][:150]}...")
+            print(f"父块内容预览: {parent_content[:150]}...")
 
 
 def example_3_hierarchical():
@@ -112,7 +121,11 @@ def example_3_hierarchical():
             "type": "recursive",  # 层次化策略会忽略这个设置
             "chunk_size": 1000,
         },
-        "embedding": {"type": "dashscope", "model": "text-embedding-v4"},
+        "embedding": {
+            "type": "dashscope",
+            "model": "text-embedding-v4",
+            "cache_path": "./data/embedding_cache.sqlite",
+        },
         "store": {
             "type": "chroma",
             "persist_directory": "./data/chroma_hierarchical",
@@ -151,7 +164,11 @@ def example_4_semantic_splitter():
             "chunk_size": 800,
             "chunk_overlap": 100,
         },
-        "embedding": {"type": "dashscope", "model": "text-embedding-v4"},
+        "embedding": {
+            "type": "dashscope",
+            "model": "text-embedding-v4",
+            "cache_path": "./data/embedding_cache.sqlite",
+        },
         "store": {
             "type": "chroma",
             "persist_directory": "./data/chroma_semantic",
@@ -177,7 +194,11 @@ def example_5_load_existing():
     config = {
         "loader": {"type": "directory"},
         "splitter": {"type": "recursive"},
-        "embedding": {"type": "dashscope", "model": "text-embedding-v4"},
+        "embedding": {
+            "type": "dashscope",
+            "model": "text-embedding-v4",
+            "cache_path": "./data/embedding_cache.sqlite",
+        },
         "store": {
             "type": "chroma",
             "persist_directory": "./data/chroma_basic",
@@ -6,7 +6,6 @@
 
 import os
 import sys
-from dotenv import load_dotenv
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,9 +13,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from nodes.indexing import IndexModule
 from nodes.retrieval import RetrievalModule
 from nodes.post_retrieval import PostRetrievalModule, PostRetrievalPipeline
+from nodes._env import load
 
 # 加载环境变量
-load_dotenv()
+load()
 
 
 def setup_test_data():
@@ -42,28 +42,30 @@ def setup_test_data():
 
     print(f"✅ 数据准备完成")
 
-    return vectorstore
+    return vectorstore, index_module.splits
 
 
-def example_1_rerank(vectorstore):
+def example_1_rerank(vectorstore, retrieval):
     """示例 1: 基础重排序"""
     print("\n" + "=" * 70)
     print("示例 1: Rerank（基础重排序）")
     print("=" * 70)
 
-    # 先检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 10})
-    retrieval.build(vectorstore=vectorstore)
+    # 先用 BM25 召回（稀疏检索，比稠密检索快得多）
     query = "美国科技公司的裁员情况"
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = retrieval.retrieve(query, k=10, verbose=False)
 
     print(f"\n检索到 {len(docs)} 个文档")
     print("\n重排序前（前3个）:")
     for i, doc in enumerate(docs[:3], 1):
         print(f"{i}. {doc.page_content[:80]}...")
 
-    # 重排序
-    post_retrieval = PostRetrievalModule({"strategy": "rerank", "top_n": 5})
+    # 重排序：只对召回的 top-k 做稠密向量打分
+    post_retrieval = PostRetrievalModule({
+        "strategy": "rerank",
+        "top_n": 5,
+        "embedding_model": vectorstore.embeddings,
+    })
     reranked = post_retrieval.process(docs, query, verbose=False)
 
     print(f"\n重排序后（前3个）:")
@@ -71,23 +73,22 @@ def example_1_rerank(vectorstore):
         print(f"{i}. {doc.page_content[:80]}...")
 
 
-def example_2_diversity_rerank(vectorstore):
+def example_2_diversity_rerank(vectorstore, retrieval):
     """示例 2: 多样性重排序"""
     print("\n" + "=" * 70)
     print("示例 2: Diversity Rerank（多样性重排序）")
     print("=" * 70)
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 10})
-    retrieval.build(vectorstore=vectorstore)
     query = "科技行业投资风险"
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = retrieval.retrieve(query, k=10, verbose=False)
 
     # 多样性重排序
     config = {
         "strategy": "diversity_rerank",
         "diversity_weight": 0.6,
-        "top_n": 5
+        "top_n": 5,
+        "embedding_model": vectorstore.embeddings,  # 使用向量余弦相似度衡量多样性
     }
     post_retrieval = PostRetrievalModule(config)
     reranked = post_retrieval.process(docs, query, verbose=False)
@@ -97,17 +98,15 @@ def example_2_diversity_rerank(vectorstore):
         print(f"{i}. {doc.page_content[:80]}...")
 
 
-def example_3_llm_rerank(vectorstore):
+def example_3_llm_rerank(vectorstore, retrieval):
     """示例 3: LLM 重排序"""
     print("\n" + "=" * 70)
     print("示例 3: LLM Rerank（使用 LLM 评分重排序）")
     print("=" * 70)
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 5})
-    retrieval.build(vectorstore=vectorstore)
     query = "人工智能投资的主要风险是什么？"
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = retrieval.retrieve(query, k=5, verbose=False)
 
     # LLM 重排序
     config = {
@@ -123,17 +122,15 @@ def example_3_llm_rerank(vectorstore):
         print(f"{i}. {doc.page_content[:100]}...")
 
 
-def example_4_context_compression(vectorstore):
+def example_4_context_compression(vectorstore, retrieval):
     """示例 4: 上下文压缩"""
     print("\n" + "=" * 70)
     print("示例 4: Context Compression（上下文压缩）")
     print("=" * 70)
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 5})
-    retrieval.build(vectorstore=vectorstore)
     query = "裁员原因"
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = retrieval.retrieve(query, k=5, verbose=False)
 
     print(f"\n压缩前:")
     for i, doc in enumerate(docs[:2], 1):
@@ -155,17 +152,15 @@ def example_4_context_compression(vectorstore):
         print(f"内容: {doc.page_content[:150]}...\n")
 
 
-def example_5_summary_compression(vectorstore):
+def example_5_summary_compression(vectorstore, retrieval):
     """示例 5: 摘要压缩"""
     print("\n" + "=" * 70)
     print("示例 5: Summary Compression（摘要压缩）")
     print("=" * 70)
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 3})
-    retrieval.build(vectorstore=vectorstore)
     query = "科技股泡沫"
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = retrieval.retrieve(query, k=3, verbose=False)
 
     print(f"\n原始文档（第1个）:")
     print(f"长度: {len(docs[0].page_content)} 字符")
@@ -185,17 +180,15 @@ def example_5_summary_compression(vectorstore):
     print(f"摘要: {summarized[0].page_content}")
 
 
-def example_6_relevance_filter(vectorstore):
+def example_6_relevance_filter(vectorstore, retrieval):
     """示例 6: 相关性过滤"""
     print("\n" + "=" * 70)
     print("示例 6: Relevance Filter（相关性过滤）")
     print("=" * 70)
 
     # 检索（获取更多文档，其中可能有不相关的）
-    retrieval = RetrievalModule({"strategy": "dense", "k": 8})
-    retrieval.build(vectorstore=vectorstore)
     query = "英特尔公司的裁员数量"
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = retrieval.retrieve(query, k=8, verbose=False)
 
     print(f"\n过滤前: {len(docs)} 个文档")
 
@@ -212,24 +205,23 @@ def example_6_relevance_filter(vectorstore):
     print(f"\n过滤后: {len(filtered)} 个相关文档")
 
 
-def example_7_redundancy_filter(vectorstore):
+def example_7_redundancy_filter(vectorstore, retrieval):
     """示例 7: 冗余过滤"""
     print("\n" + "=" * 70)
     print("示例 7: Redundancy Filter（冗余过滤）")
     print("=" * 70)
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 10})
-    retrieval.build(vectorstore=vectorstore)
     query = "科技公司裁员"
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = retrieval.retrieve(query, k=10, verbose=False)
 
     print(f"\n去重前: {len(docs)} 个文档")
 
     # 冗余过滤
     config = {
         "strategy": "redundancy_filter",
-        "similarity_threshold": 0.8
+        "similarity_threshold": 0.8,
+        "embedding_model": vectorstore.embeddings,
     }
     post_retrieval = PostRetrievalModule(config)
     filtered = post_retrieval.process(docs, query, verbose=False)
@@ -237,29 +229,38 @@ def example_7_redundancy_filter(vectorstore):
     print(f"\n去重后: {len(filtered)} 个唯一文档")
 
 
-def example_8_pipeline(vectorstore):
+def example_8_pipeline(vectorstore, retrieval):
     """示例 8: 检索后流水线"""
     print("\n" + "=" * 70)
     print("示例 8: Post-Retrieval Pipeline（多步骤优化）")
     print("=" * 70)
 
-    # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 15})
-    retrieval.build(vectorstore=vectorstore)
+    # 检索（BM25 召回）
     query = "美国科技行业的主要问题"
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = retrieval.retrieve(query, k=15, verbose=False)
 
     print(f"\n原始检索结果: {len(docs)} 个文档")
 
     # 创建流水线
     pipeline = PostRetrievalPipeline()
-    pipeline.add_step("rerank", {"top_n": 10})               # 步骤1: 重排序
+    pipeline.add_step("rerank", {"top_n": 10, "embedding_model": vectorstore.embeddings})  # 步骤1: 稠密精排
     pipeline.add_step("redundancy_filter", {"similarity_threshold": 0.85})  # 步骤2: 去重
     pipeline.add_step("context_compression", {"compression_ratio": 0.6})    # 步骤3: 压缩
 
     # 执行流水线
     optimized = pipeline.process(docs, query, verbose=True)
 
+    # 等价的融合版本：向量只计算一次，三步共享相似度矩阵
+    fused = PostRetrievalModule({
+        "strategy": "fused",
+        "top_n": 10,
+        "similarity_threshold": 0.85,
+        "compression_ratio": 0.6,
+        "embedding_model": vectorstore.embeddings,
+    })
+    fused_docs = fused.process(docs, query, verbose=False)
+    print(f"\n融合处理结果: {len(fused_docs)} 个文档")
+
     print(f"\n最终结果（前2个）:")
     for i, doc in enumerate(optimized[:2], 1):
         print(f"\n文档 {i}:")
@@ -267,17 +268,15 @@ def example_8_pipeline(vectorstore):
         print(f"内容: {doc.page_content[:150]}...")
 
 
-def example_9_dynamic_strategy(vectorstore):
+def example_9_dynamic_strategy(vectorstore, retrieval):
     """示例 9: 动态切换策略"""
     print("\n" + "=" * 70)
     print("示例 9: 动态切换优化策略")
     print("=" * 70)
 
     # 检索
-    retrieval = RetrievalModule({"strategy": "dense", "k": 8})
-    retrieval.build(vectorstore=vectorstore)
     query = "投资风险"
-    docs = retrieval.retrieve(query, verbose=False)
+    docs = retrieval.retrieve(query, k=8, verbose=False)
 
     # 创建模块，初始使用 Rerank
     post_retrieval = PostRetrievalModule({"strategy": "rerank", "top_n": 5})
@@ -306,7 +305,7 @@ def example_9_dynamic_strategy(vectorstore):
     print(f"结果: {len(result3)} 个文档（已压缩）")
 
 
-def example_10_complete_workflow(vectorstore):
+def example_10_complete_workflow(vectorstore, retrieval):
     """示例 10: 完整工作流（检索 + 后处理）"""
     print("\n" + "=" * 70)
     print("示例 10: 完整工作流（Retrieval + Post-Retrieval）")
@@ -316,21 +315,8 @@ def example_10_complete_workflow(vectorstore):
 
     # 步骤1: 混合检索
     print("\n📍 步骤 1: 混合检索")
-    retrieval = RetrievalModule({
-        "strategy": "hybrid",
-        "dense_weight": 0.6,
-        "sparse_weight": 0.4,
-        "k": 10
-    })
-    # 需要 documents 用于 BM25
-    from nodes.indexing import IndexModule
-    index_module = IndexModule()
-    # 假设已有 vectorstore 和 documents
-    # 这里简化，只用 dense
-    retrieval = RetrievalModule({"strategy": "dense", "k": 10})
-    retrieval.build(vectorstore=vectorstore)
-
-    docs = retrieval.retrieve(query, verbose=False)
+    # 混合检索需要 documents 用于 BM25，这里简化，复用共享的 dense 检索模块
+    docs = retrieval.retrieve(query, k=10, verbose=False)
     print(f"检索到 {len(docs)} 个文档")
 
     # 步骤2: 后处理流水线
@@ -356,27 +342,37 @@ if __name__ == "__main__":
     print("=" * 70)
 
     # 准备数据
-    vectorstore = setup_test_data()
+    vectorstore, splits = setup_test_data()
+
+    # 所有示例共用一个检索模块，只在查询时调整 k；
+    # 检索结果附带已存储的向量，去冗余 / 多样性重排序无需重新向量化
+    retrieval = RetrievalModule({"strategy": "dense", "k": 10, "attach_embeddings": True})
+    retrieval.build(vectorstore=vectorstore)
+
+    # 稀疏优先：BM25 负责第一阶段召回，稠密向量只用于对召回结果精排
+    # （BM25 检索器不接受查询时的 k，构建时取各示例所需的最大值）
+    sparse_retrieval = RetrievalModule({"strategy": "bm25", "k": 15, "attach_embeddings": True})
+    sparse_retrieval.build(documents=splits, vectorstore=vectorstore)
 
     # 运行示例（取消注释想要运行的示例）
 
     # 重排序示例
-    example_1_rerank(vectorstore)
-    # example_2_diversity_rerank(vectorstore)
-    # example_3_llm_rerank(vectorstore)
+    example_1_rerank(vectorstore, sparse_retrieval)
+    # example_2_diversity_rerank(vectorstore, retrieval)
+    # example_3_llm_rerank(vectorstore, retrieval)
 
     # 压缩示例
-    # example_4_context_compression(vectorstore)
-    # example_5_summary_compression(vectorstore)
+    # example_4_context_compression(vectorstore, retrieval)
+    # example_5_summary_compression(vectorstore, retrieval)
 
     # 过滤示例
-    # example_6_relevance_filter(vectorstore)
-    # example_7_redundancy_filter(vectorstore)
+    # example_6_relevance_filter(vectorstore, retrieval)
+    # example_7_redundancy_filter(vectorstore, retrieval)
 
     # 流水线和完整工作流
-    # example_8_pipeline(vectorstore)
-    # example_9_dynamic_strategy(vectorstore)
-    # example_10_complete_workflow(vectorstore)
+    # example_8_pipeline(vectorstore, sparse_retrieval)
+    # example_9_dynamic_strategy(vectorstore, retrieval)
+    # example_10_complete_workflow(vectorstore, retrieval)
 
     print("\n" + "=" * 70)
     print("✅ 示例演示完成！")
@@ -4,17 +4,18 @@
 演示如何使用 PreRetrievalModule 的各种优化策略
 """
 
+import asyncio
 import os
 import sys
-from dotenv import load_dotenv
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from nodes.pre_retrieval import PreRetrievalModule, PreRetrievalPipeline
+from nodes._env import load
 
 # 加载环境变量
-load_dotenv()
+load()
 
 
 def example_1_query_rewrite():
@@ -38,9 +39,11 @@ def example_1_query_rewrite():
         "美国科技股咋样了？",
     ]
 
-    for query in queries:
+    # 所有查询并发发出，总耗时约等于最慢的一次调用
+    results = asyncio.run(pre_retrieval.aprocess_batch(queries))
+
+    for query, rewritten in zip(queries, results):
         print(f"\n原始查询: {query}")
-        rewritten = pre_retrieval.process(query, verbose=False)
         print(f"重写查询: {rewritten}")
 
 
@@ -200,9 +203,10 @@ def example_7_text_to_sql():
         "找出销售额最高的5个产品",
     ]
 
-    for query in queries:
+    results = asyncio.run(pre_retrieval.aprocess_batch(queries))
+
+    for query, sql in zip(queries, results):
         print(f"\n自然语言: {query}")
-        sql = pre_retrieval.process(query, verbose=False)
         print(f"SQL查询: {sql}")
 
 
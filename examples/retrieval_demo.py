@@ -4,18 +4,26 @@
 演示如何使用 RetrievalModule 的各种检索策略
 """
 
+import asyncio
 import os
 import sys
-from dotenv import load_dotenv
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from nodes.indexing import IndexModule
 from nodes.retrieval import RetrievalModule, RetrievalPipeline
+from nodes._env import load
 
 # 加载环境变量
-load_dotenv()
+load()
+
+
+async def _run_queries(retrieval, queries):
+    """并发执行多个查询（同步检索放入线程），结果与 queries 顺序一致"""
+    return await asyncio.gather(
+        *(asyncio.to_thread(retrieval.retrieve, query, verbose=False) for query in queries)
+    )
 
 
 def setup_test_data():
@@ -30,9 +38,11 @@ def setup_test_data():
         "splitter": {"type": "recursive", "chunk_size": 1000, "chunk_overlap": 200},
         "embedding": {"type": "dashscope", "model": "text-embedding-v4"},
         "store": {
-            "type": "chroma",
-            "persist_directory": "./data/retrieval_demo_db",
-            "collection_name": "retrieval_test"
+            "type": "faiss_hnsw",
+            "index_path": "./data/retrieval_demo_hnsw",
+            "m": 32,
+            "ef_construction": 200,
+            "ef_search": 64,
         },
     }
 
@@ -166,9 +176,9 @@ def example_5_adaptive_hybrid(vectorstore, documents):
         "裁员 英特尔",  # 关键词查询
     ]
 
-    for query in queries:
+    all_results = asyncio.run(_run_queries(retrieval, queries))
+    for query, results in zip(queries, all_results):
         print(f"\n--- 查询: {query} ---")
-        results = retrieval.retrieve(query, verbose=False)
         print(f"检索到 {len(results)} 个文档")
 
 
@@ -194,9 +204,10 @@ def example_6_adaptive_k(vectorstore, documents):
         "请详细分析并比较美国科技行业在2024年的投资风险和市场泡沫现象，包括各个细分领域的具体情况",  # 复杂
     ]
 
-    for query in queries:
+    all_results = asyncio.run(_run_queries(retrieval, queries))
+    for query, results in zip(queries, all_results):
         print(f"\n--- 查询: {query[:50]}... ---")
-        results = retrieval.retrieve(query, verbose=False)
+        print(f"检索到 {len(results)} 个文档")
 
 
 def example_7_query_router(vectorstore, documents):
@@ -233,9 +244,10 @@ def example_7_query_router(vectorstore, documents):
         "查找 裁员 新闻",  # 关键词查询 -> sparse
     ]
 
-    for query in queries:
+    all_results = asyncio.run(_run_queries(retrieval, queries))
+    for query, results in zip(queries, all_results):
         print(f"\n--- 查询: {query} ---")
-        results = retrieval.retrieve(query, verbose=False)
+        print(f"检索到 {len(results)} 个文档")
 
 
 def example_8_retrieval_pipeline(vectorstore, documents):
@@ -330,6 +342,30 @@ def example_10_dynamic_strategy(vectorstore, documents):
     print(f"找到 {len(results3)} 个文档")
 
 
+def example_11_range_retrieval(vectorstore, documents):
+    """示例 11: Range Retrieval（FAISS 范围检索）"""
+    print("\n" + "=" * 70)
+    print("示例 11: Range Retrieval（按相似度阈值直接在索引内检索）")
+    print("=" * 70)
+
+    config = {
+        "strategy": "range",
+        "radius": 0.5,       # 最小余弦相似度（faiss_hnsw 使用内积 + L2 归一化）
+        "max_results": 10,
+    }
+
+    retrieval = RetrievalModule(config)
+    retrieval.build(vectorstore=vectorstore)
+
+    query = "美国科技公司的投资风险"
+    results = retrieval.retrieve(query, verbose=False)
+
+    print(f"\n查询: {query}")
+    print(f"相似度 ≥ {config['radius']} 的文档: {len(results)} 个\n")
+    for i, doc in enumerate(results[:3], 1):
+        print(f"{i}. [{doc.metadata['range_score']:.3f}] {doc.page_content[:100]}...")
+
+
 if __name__ == "__main__":
     print("\n" + "=" * 70)
     print("🚀 检索模块示例演示")
@@ -357,6 +393,7 @@ if __name__ == "__main__":
     # 多查询和动态策略
     # example_9_multi_query_retrieval(vectorstore, documents)
     # example_10_dynamic_strategy(vectorstore, documents)
+    # example_11_range_retrieval(vectorstore, documents)
 
     print("\n" + "=" * 70)
     print("✅ 示例演示完成！")
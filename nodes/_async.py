@@ -0,0 +1,109 @@
+"""
+同步 / 异步桥接工具
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+
+def run_async(coro):
+    """
+    在同步代码中运行协程
+
+    若当前线程已有运行中的事件循环（如 Jupyter），asyncio.run 会报错，
+    此时改到独立线程中运行。
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class AdaptiveSemaphore:
+    """
+    AIMD 自适应并发控制
+
+    并发上限从 limit 开始：
+    - 每个请求成功后加性增长 1/上限（约每轮请求 +1），直到初始上限
+    - 遇到限流（429）时乘性减半，最低为 min_limit
+    一轮并发请求同时收到的多个 429 只算一次拥塞：
+    在上次减半之前发出的请求再遇到 429 时不再减半（每个窗口最多减半一次）。
+    用法与 asyncio.Semaphore 相同：async with limiter: ...
+    """
+
+    def __init__(self, limit: int, min_limit: int = 1):
+        """
+        初始化
+
+        Args:
+            limit: 初始（也是最大）并发数
+            min_limit: 最小并发数
+        """
+        self.max_limit = limit
+        self.min_limit = min_limit
+        self.limit = float(limit)
+        self.completed = 0
+        self.rate_limited = 0
+        self._in_flight = 0
+        self._condition = None
+        self._loop = None
+        self._last_decrease = float("-inf")
+
+    def _get_condition(self) -> asyncio.Condition:
+        """获取当前事件循环下的条件变量（不能跨事件循环复用）"""
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self._in_flight = 0
+        return self._condition
+
+    async def __aenter__(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        condition = self._get_condition()
+        async with condition:
+            self._in_flight -= 1
+            condition.notify_all()
+
+    def increase(self):
+        """请求成功：加性增长"""
+        self.completed += 1
+        self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def decrease(self, started: Optional[float] = None):
+        """
+        遇到限流：乘性减半
+
+        Args:
+            started: 该请求发出时的 time.monotonic()；早于上次减半时不再减半
+        """
+        self.rate_limited += 1
+        if started is not None and started < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        self.limit = max(float(self.min_limit), self.limit * 0.5)
+
+    def stats(self) -> dict:
+        """
+        并发控制统计
+
+        Returns:
+            包含当前上限、在途请求数、成功数、限流次数的字典
+        """
+        return {
+            "current_limit": int(self.limit),
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rate_limited": self.rate_limited,
+        }
@@ -0,0 +1,20 @@
+"""
+环境变量加载
+
+.env 只在进程内解析一次：多个示例 / 模块先后导入时不再重复读取文件。
+"""
+
+import functools
+
+from dotenv import load_dotenv
+
+
+@functools.cache
+def load() -> bool:
+    """
+    加载 .env（不覆盖已存在的环境变量），结果在进程内缓存
+
+    Returns:
+        是否找到并加载了 .env 文件
+    """
+    return load_dotenv(override=False)
@@ -0,0 +1,41 @@
+"""
+共享 HTTP 客户端
+
+所有 LLM 客户端的同步调用复用同一个连接池：TCP / TLS 握手只在首次请求时发生，
+之后的请求（包括多线程并发请求）复用已建立的连接。
+安装了 h2 时启用 HTTP/2（单连接多路复用）。
+
+异步客户端不做进程级共享：httpx.AsyncClient 的连接属于创建它们的事件循环，
+而同步入口（run_async → asyncio.run）每次都会新建事件循环，
+跨循环复用已关闭循环上的 keep-alive 连接会报 "Event loop is closed" 或挂起。
+"""
+
+import functools
+from typing import Any, Dict
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:  # h2 为可选依赖，缺失时使用 HTTP/1.1 连接池
+    _HTTP2 = False
+
+_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+
+@functools.cache
+def get_client() -> httpx.Client:
+    """获取进程内共享的同步 HTTP 客户端"""
+    return httpx.Client(http2=_HTTP2, limits=_LIMITS, timeout=_TIMEOUT)
+
+
+def http_clients() -> Dict[str, Any]:
+    """
+    LLM 构造参数：注入共享的同步 HTTP 客户端（异步客户端由各 LLM 自行创建）
+
+    Example:
+        llm = ChatQwen(model="qwen-plus", **http_clients())
+    """
+    return {"http_client": get_client()}
@@ -0,0 +1,55 @@
+"""
+JSON 解析
+
+LLM 的结构化输出（查询变体、过滤条件、验证结果）统一经这里解析，
+批处理请求文件也经这里序列化：安装了 orjson 时使用其 C 实现，否则退回标准库 json。
+orjson 拒绝 NaN / Infinity 等非标准 JSON，解析失败同样抛出 JSONDecodeError。
+"""
+
+import json
+from json import JSONDecodeError
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    解析 JSON 文本
+
+    Args:
+        data: JSON 字符串或 UTF-8 字节串
+
+    Returns:
+        解析后的 Python 对象
+
+    Raises:
+        JSONDecodeError: 不是合法 JSON 时抛出（orjson.JSONDecodeError 是其子类）
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """
+    序列化为 JSON 文本（保留非 ASCII 字符）
+
+    Args:
+        obj: 待序列化的对象
+        indent: 是否以 2 空格缩进输出（默认紧凑格式）
+
+    Returns:
+        JSON 字符串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+__all__ = ["loads", "dumps", "JSONDecodeError"]
@@ -0,0 +1,35 @@
+"""
+API 调用重试
+
+生成和向量化共用同一套重试策略：限流（429）、连接 / 超时、服务端 5xx 时退避重试，
+等待时间优先使用服务端返回的 Retry-After，否则指数退避。
+"""
+
+import random
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+# 值得重试的错误：限流（429）、连接 / 超时、服务端 5xx
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+def retry_delay(error: Exception, attempt: int, jitter: float = 0.0) -> float:
+    """
+    重试前的等待时间：优先使用 Retry-After，否则指数退避
+
+    Args:
+        error: 本次请求的异常
+        attempt: 已重试次数（从 0 开始）
+        jitter: 附加的随机抖动上限（秒），避免多个请求在同一时刻集中重试
+
+    Returns:
+        等待秒数
+    """
+    # 连接错误没有 response
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+    return delay + random.uniform(0, jitter) if jitter else delay
+
+
+__all__ = ["RETRYABLE_ERRORS", "retry_delay"]
@@ -21,6 +21,8 @@
    - Standard: 标准生成
    - Stream: 流式生成
    - Ensemble: 集成生成
+   - Batch: 离线批处理生成（Batch API）
+   - Speculative: 查询改写与生成合并为一次请求
    - Adaptive: 自适应生成
 
 3. Post-processing（后处理）
@@ -29,9 +31,16 @@
    - Refinement: 答案精炼
 """
 
-from typing import List, Dict, Any
+import asyncio
+import logging
+from typing import TYPE_CHECKING, AsyncIterator, List, Dict, Any, Optional, Type
 from langchain_core.documents import Document
 
+from ._async import run_async
+
+if TYPE_CHECKING:
+    from .pre_retrieval import PreRetrievalModule
+
 from .generation_operators import (
     BaseGenerationOperator,
     PromptTemplateOperator,
@@ -40,8 +49,28 @@ from .generation_operators import (
     LLMGeneratorOperator,
     StreamGeneratorOperator,
     EnsembleGeneratorOperator,
+    BatchLLMGeneratorOperator,
+    SpeculativeCombinedOperator,
 )
 
+logger = logging.getLogger(__name__)
+
+# 策略名 -> operator 类
+_PROMPT_OPS: Dict[str, Type[BaseGenerationOperator]] = {
+    "template": PromptTemplateOperator,
+    "contextual": ContextualPromptOperator,
+    "cot": ChainOfThoughtPromptOperator,
+    "chain_of_thought": ChainOfThoughtPromptOperator,
+}
+
+_GENERATOR_OPS: Dict[str, Type[BaseGenerationOperator]] = {
+    "llm": LLMGeneratorOperator,
+    "stream": StreamGeneratorOperator,
+    "ensemble": EnsembleGeneratorOperator,
+    "batch": BatchLLMGeneratorOperator,
+    "speculative": SpeculativeCombinedOperator,
+}
+
 
 class GenerationModule:
     """
@@ -62,18 +91,30 @@ class GenerationModule:
 
         generation = GenerationModule(config)
         answer = generation.generate(query, context_docs)
+
+    关联 PreRetrievalModule（如 query_rewrite）后，生成前先改写查询；
+    配置 speculative=True 时，较短的查询把改写和生成合并为一次请求。
     """
 
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Dict[str, Any] = None, pre_retrieval: Optional["PreRetrievalModule"] = None):
         """
         初始化生成模块
 
         Args:
             config: 配置字典
+            pre_retrieval: 关联的查询优化模块（可选）
         """
         self.config = config or {}
         self.prompt_strategy = self.config.get("prompt_strategy", "template")
         self.generator_type = self.config.get("generator", "llm")
+        self.pre_retrieval = pre_retrieval
+
+        # 推测式合并：查询长度不超过 speculative_max_query_length 时一次请求完成改写和生成
+        self.speculative_max_query_length = self.config.get("speculative_max_query_length", 30)
+        self.speculative_operator = (
+            SpeculativeCombinedOperator(self.config)
+            if self.config.get("speculative") and pre_retrieval is not None else None
+        )
 
         # 初始化 prompt operator
         self.prompt_operator = self._init_prompt_operator()
@@ -84,30 +125,20 @@ class GenerationModule:
     def _init_prompt_operator(self) -> BaseGenerationOperator:
         """初始化 prompt operator"""
         strategy = self.prompt_strategy.lower()
-
-        if strategy == "template":
-            return PromptTemplateOperator(self.config)
-        elif strategy == "contextual":
-            return ContextualPromptOperator(self.config)
-        elif strategy == "cot" or strategy == "chain_of_thought":
-            return ChainOfThoughtPromptOperator(self.config)
-        else:
-            print(f"⚠️  未知的 prompt 策略: {strategy}，使用默认 template")
-            return PromptTemplateOperator(self.config)
+        operator_cls = _PROMPT_OPS.get(strategy)
+        if operator_cls is None:
+            logger.warning("⚠️  未知的 prompt 策略: %s，使用默认 template", strategy)
+            operator_cls = PromptTemplateOperator
+        return operator_cls(self.config)
 
     def _init_generator_operator(self) -> BaseGenerationOperator:
         """初始化 generator operator"""
         gen_type = self.generator_type.lower()
-
-        if gen_type == "llm":
-            return LLMGeneratorOperator(self.config)
-        elif gen_type == "stream":
-            return StreamGeneratorOperator(self.config)
-        elif gen_type == "ensemble":
-            return EnsembleGeneratorOperator(self.config)
-        else:
-            print(f"⚠️  未知的 generator 类型: {gen_type}，使用默认 llm")
-            return LLMGeneratorOperator(self.config)
+        operator_cls = _GENERATOR_OPS.get(gen_type)
+        if operator_cls is None:
+            logger.warning("⚠️  未知的 generator 类型: %s，使用默认 llm", gen_type)
+            operator_cls = LLMGeneratorOperator
+        return operator_cls(self.config)
 
     def generate(
         self,
@@ -121,29 +152,46 @@ class GenerationModule:
         Args:
             query: 用户查询
             context: 检索到的上下文文档
-            verbose: 是否打印详细信息
+            verbose: 是否输出详细信息（通过 logging 以 INFO 级别输出）
 
         Returns:
             生成的答案
         """
+        verbose = verbose and logger.isEnabledFor(logging.INFO)
+
         if verbose:
-            print("\n" + "=" * 60)
-            print(f"🤖 生成模块")
-            print("=" * 60)
-            print(f"Prompt 策略: {self.prompt_strategy}")
-            print(f"Generator 类型: {self.generator_type}")
+            logger.info("\n" + "=" * 60)
+            logger.info("🤖 生成模块")
+            logger.info("=" * 60)
+            logger.info("Prompt 策略: %s", self.prompt_strategy)
+            logger.info("Generator 类型: %s", self.generator_type)
             if context:
-                print(f"上下文文档数: {len(context)}")
+                logger.info("上下文文档数: %d", len(context))
+
+        # 关联了查询优化模块时，先改写查询（短查询尝试与生成合并为一次请求）
+        if self.pre_retrieval is not None:
+            if self.speculative_operator is not None and len(query) <= self.speculative_max_query_length:
+                result = self.speculative_operator.execute_combined(query, context)
+                if result is not None:
+                    if verbose:
+                        logger.info("\n⚡ 改写与生成合并完成，改写后的查询: %s", result["rewritten"])
+                    return result["answer"]
+                if verbose:
+                    logger.info("\n⚠️  合并请求解析失败，退回两步流程")
+
+            rewritten = self.pre_retrieval.process(query, verbose=False)
+            if isinstance(rewritten, str) and rewritten:
+                query = rewritten
 
         # 步骤1: 构建 prompt
         if verbose:
-            print("\n📝 步骤 1: 构建 Prompt")
+            logger.info("\n📝 步骤 1: 构建 Prompt")
 
         prompt = self.prompt_operator.execute(query, context)
 
         # 步骤2: 生成答案
         if verbose:
-            print("\n🔄 步骤 2: 生成答案")
+            logger.info("\n🔄 步骤 2: 生成答案")
 
         answer = self.generator_operator.execute(
             query,
@@ -152,12 +200,134 @@ class GenerationModule:
         )
 
         if verbose:
-            print("\n" + "=" * 60)
-            print("✅ 生成完成")
-            print("=" * 60)
+            logger.info("\n" + "=" * 60)
+            logger.info("✅ 生成完成")
+            logger.info("=" * 60)
 
         return answer
 
+    async def agenerate(
+        self,
+        query: str,
+        context: List[Document] = None,
+        verbose: bool = True
+    ) -> str:
+        """
+        异步生成答案
+
+        生成器提供 aexecute（如集成生成）时直接在事件循环中等待；
+        否则把同步 LLM 调用放到线程中运行。多个生成请求可以并发执行，
+        总耗时约等于最慢的一次调用，而不是各次调用之和。
+
+        Args:
+            query: 用户查询
+            context: 检索到的上下文文档
+            verbose: 是否打印详细信息
+
+        Returns:
+            生成的答案
+        """
+        if self.pre_retrieval is None and hasattr(self.generator_operator, "aexecute"):
+            prompt = self.prompt_operator.execute(query, context)
+            return await self.generator_operator.aexecute(query, context, prompt=prompt)
+        return await asyncio.to_thread(self.generate, query, context, verbose)
+
+    async def astream(
+        self,
+        query: str,
+        context: List[Document] = None
+    ) -> AsyncIterator[str]:
+        """
+        异步流式生成答案
+
+        生成器支持流式（generator="stream"）时逐段转发增量；
+        否则生成完成后一次性输出完整答案。
+
+        Args:
+            query: 用户查询
+            context: 检索到的上下文文档
+
+        Yields:
+            答案文本增量
+        """
+        prompt = self.prompt_operator.execute(query, context)
+
+        if hasattr(self.generator_operator, "astream"):
+            async for content in self.generator_operator.astream(query, context, prompt=prompt):
+                yield content
+        else:
+            yield await asyncio.to_thread(self.generator_operator.execute, query, context, prompt=prompt)
+
+    async def agenerate_batch(
+        self,
+        queries: List[str],
+        contexts: Optional[List[List[Document]]] = None,
+        verbose: bool = True
+    ) -> List[str]:
+        """
+        异步批量生成答案
+
+        先一次性构建所有 prompt，再交给生成器并发请求：
+        LLM 生成器使用 abatch（受 max_concurrency / rate_limit_rpm 约束），
+        其他生成器按查询放到线程中并发执行。
+
+        Args:
+            queries: 查询列表
+            contexts: 与 queries 一一对应的上下文文档列表（可选）
+            verbose: 是否打印详细信息
+
+        Returns:
+            与 queries 顺序一致的答案列表
+        """
+        contexts = contexts or [None] * len(queries)
+        if len(contexts) != len(queries):
+            raise ValueError("queries 与 contexts 的数量必须一致")
+
+        verbose = verbose and logger.isEnabledFor(logging.INFO)
+
+        if verbose:
+            logger.info("\n" + "=" * 60)
+            logger.info("🤖 批量生成: %d 个查询", len(queries))
+            logger.info("=" * 60)
+
+        prompts = [
+            self.prompt_operator.execute(query, context)
+            for query, context in zip(queries, contexts)
+        ]
+
+        if hasattr(self.generator_operator, "aexecute_many"):
+            answers = await self.generator_operator.aexecute_many(prompts, queries, contexts)
+        else:
+            answers = list(await asyncio.gather(*(
+                asyncio.to_thread(self.generator_operator.execute, query, context, prompt=prompt)
+                for query, context, prompt in zip(queries, contexts, prompts)
+            )))
+
+        if verbose:
+            logger.info("✅ 批量生成完成")
+            logger.info("=" * 60)
+
+        return answers
+
+    def generate_batch(
+        self,
+        queries: List[str],
+        contexts: Optional[List[List[Document]]] = None,
+        verbose: bool = True
+    ) -> List[str]:
+        """
+        批量生成答案（agenerate_batch 的同步版本）
+
+        Args:
+            queries: 查询列表
+            contexts: 与 queries 一一对应的上下文文档列表（可选）
+            verbose: 是否打印详细信息
+
+        Returns:
+            与 queries 顺序一致的答案列表
+        """
+        return run_async(self.agenerate_batch(queries, contexts, verbose))
+
     def change_strategy(
         self,
         prompt_strategy: str = None,
@@ -175,12 +345,12 @@ class GenerationModule:
         if prompt_strategy:
             self.prompt_strategy = prompt_strategy
             self.prompt_operator = self._init_prompt_operator()
-            print(f"✅ 已切换 Prompt 策略: {prompt_strategy}")
+            logger.debug("已切换 Prompt 策略: %s", prompt_strategy)
 
         if generator_type:
             self.generator_type = generator_type
             self.generator_operator = self._init_generator_operator()
-            print(f"✅ 已切换 Generator 类型: {generator_type}")
+            logger.debug("已切换 Generator 类型: %s", generator_type)
 
         if new_config:
             self.config.update(new_config)
@@ -192,7 +362,7 @@ class GenerationModule:
         Returns:
             摘要字典
         """
-        return {
+        summary = {
             "module": "GenerationModule",
             "prompt_strategy": self.prompt_strategy,
             "generator_type": self.generator_type,
@@ -200,3 +370,8 @@ class GenerationModule:
             "generator_operator": self.generator_operator.name,
             "config": self.config,
         }
+        if hasattr(self.generator_operator, "cache_stats"):
+            summary["cache"] = self.generator_operator.cache_stats()
+        if hasattr(self.generator_operator, "concurrency_stats"):
+            summary["concurrency"] = self.generator_operator.concurrency_stats()
+        return summary
@@ -8,7 +8,7 @@ Generation Operators 包
 4. Post-processing（后处理）
 """
 
-from .base import BaseGenerationOperator
+from .base import BaseGenerationOperator, CacheableOperator
 from .prompt import (
     PromptTemplateOperator,
     ContextualPromptOperator,
@@ -18,30 +18,42 @@ from .generator import (
     LLMGeneratorOperator,
     StreamGeneratorOperator,
     EnsembleGeneratorOperator,
+    BatchLLMGeneratorOperator,
+    SpeculativeCombinedOperator,
 )
+from .response_cache import ResponseCache, ResponseCachingMixin
 from .verification import (
     VerificationOperator,
     FactCheckOperator,
     ConsistencyCheckOperator,
+    CombinedVerificationOperator,
 )
 from .postprocess import (
     OutputFormatterOperator,
     CitationOperator,
     AnswerRefinementOperator,
+    FusedPostprocessOperator,
 )
 
 __all__ = [
     "BaseGenerationOperator",
+    "CacheableOperator",
     "PromptTemplateOperator",
     "ContextualPromptOperator",
     "ChainOfThoughtPromptOperator",
     "LLMGeneratorOperator",
     "StreamGeneratorOperator",
     "EnsembleGeneratorOperator",
+    "BatchLLMGeneratorOperator",
+    "SpeculativeCombinedOperator",
+    "ResponseCache",
+    "ResponseCachingMixin",
     "VerificationOperator",
     "FactCheckOperator",
     "ConsistencyCheckOperator",
+    "CombinedVerificationOperator",
     "OutputFormatterOperator",
     "CitationOperator",
     "AnswerRefinementOperator",
+    "FusedPostprocessOperator",
 ]
@@ -2,18 +2,45 @@
 Generation Operator 基类
 """
 
+import functools
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List
 from langchain_core.documents import Document
 
 
+@functools.lru_cache(maxsize=None)
+def get_chat(model: str, temperature: float):
+    """
+    获取共享的 ChatTongyi 实例
+
+    验证、后处理等操作器按 (模型, 温度) 共用同一个客户端，
+    避免每个 operator 重复导入并构造客户端、各自建立 HTTP 会话。
+
+    Args:
+        model: 模型名称
+        temperature: 采样温度
+
+    Returns:
+        ChatTongyi 实例
+    """
+    from langchain_community.chat_models import ChatTongyi
+    return ChatTongyi(model_name=model, temperature=temperature)
+
+
 class BaseGenerationOperator(ABC):
     """
     生成操作器基类
 
     所有生成相关操作都继承此类
+
+    Prompt 的拼接顺序约定（便于服务端前缀缓存 / KV cache 复用）：
+    固定的系统指令和格式说明在最前，随后是上下文，最后是随调用变化的评估信息和查询。
+    不要在系统消息或前缀中放入随查询、上下文变化的内容。
     """
 
+    __slots__ = ("config", "name")
+
     def __init__(self, config: Dict[str, Any] = None):
         """
         初始化 operator
@@ -41,3 +68,57 @@ class BaseGenerationOperator(ABC):
 
     def __repr__(self) -> str:
         return f"{self.name}(config={self.config})"
+
+
+class CacheableOperator:
+    """
+    Prompt 构建结果的 LRU 缓存（mixin）
+
+    同一 (查询, 上下文) 组合反复出现时（评测循环、多查询召回到重叠的文档），
+    直接复用已构建的 prompt，跳过上下文格式化和模板拼接。
+    缓存容量由配置 prompt_cache_size 控制（默认 4096，设为 0 关闭）。
+    使用者需在 __slots__ 中声明 "_prompt_cache"。
+    """
+
+    __slots__ = ()
+
+    def _cache_key(self, query: str, context: List[Document] = None) -> Hashable:
+        """
+        计算缓存键：查询 + 上下文文档内容（保持顺序，文档编号依赖顺序）
+
+        键中直接保存文档内容字符串的引用（不复制），命中时按内容精确比较。
+        """
+        return (
+            query,
+            tuple(doc.page_content for doc in context or []),
+            tuple(doc.metadata.get("source") for doc in context or []),
+        )
+
+    def _cached(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """
+        查询缓存，未命中时调用 build 构建并写入缓存
+
+        Args:
+            key: 缓存键
+            build: 构建函数
+
+        Returns:
+            缓存或新构建的结果
+        """
+        max_size = self.config.get("prompt_cache_size", 4096)
+        if max_size <= 0:
+            return build()
+
+        try:
+            cache = self._prompt_cache
+        except AttributeError:
+            cache = self._prompt_cache = OrderedDict()
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        value = build()
+        cache[key] = value
+        if len(cache) > max_size:
+            cache.popitem(last=False)
+        return value
@@ -4,15 +4,156 @@ LLM Generator Operators（LLM 生成器）
 支持不同的 LLM 和生成策略
 """
 
-from typing import List, Dict, Any
+import asyncio
+import functools
+import io
+import os
+import re
+import sys
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple, Union
+
+import numpy as np
 from langchain_core.documents import Document
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.rate_limiters import InMemoryRateLimiter
 from langchain_qwq import ChatQwen
+from openai import OpenAI, RateLimitError
+from .. import _json
+from .._async import AdaptiveSemaphore, run_async
+from .._http import get_client, http_clients
+from .._retry import RETRYABLE_ERRORS, retry_delay
 from .base import BaseGenerationOperator
+from .prompt import default_context_budget, pack_contents
+from .response_cache import CacheTicket, ResponseCachingMixin, response_key
+from .stream import abatch_stream, batch_stream
 
+# 默认系统消息：固定不变，作为请求的公共前缀
+DEFAULT_SYSTEM_MESSAGE = "你是一个专业的AI助手。"
 
-class LLMGeneratorOperator(BaseGenerationOperator):
+# 默认提示的共享前缀：任务说明 + 输出要求，放在系统消息中且不随请求变化，
+# 检索到的上下文紧随其后，查询放在最后——相同前缀的请求可以命中服务端前缀缓存
+SHARED_PREFIX = """你是一个专业的AI助手，负责基于检索到的上下文信息回答用户问题。
+
+回答要求：
+1. 优先使用上下文中的信息，不要编造上下文中没有的事实
+2. 上下文不足以回答时，明确说明，并可以补充通用知识（需注明）
+3. 引用具体信息时，标注对应的文档编号，如 [文档 1]
+4. 回答应准确、简洁、条理清晰"""
+
+Prompt = Union[str, List[BaseMessage]]
+
+def to_messages(prompt: Prompt) -> List[BaseMessage]:
+    """
+    把 prompt 转换为消息列表
+
+    prompt operator 可以直接返回消息列表（静态系统消息 + 动态上下文），
+    也可以返回字符串（放入默认系统消息之后的用户消息）。
+    prompt 文本不再经过模板解析，上下文中的花括号不会被当作变量。
+
+    Args:
+        prompt: 提示文本或消息列表
+
+    Returns:
+        消息列表
+    """
+    if isinstance(prompt, list):
+        return prompt
+    return [SystemMessage(DEFAULT_SYSTEM_MESSAGE), HumanMessage(prompt)]
+
+
+def _parse_numbered_answers(result: str, n: int) -> Dict[int, str]:
+    """
+    解析批量生成的 JSON 输出：{"1": "...", "2": "...", ...}
+
+    Args:
+        result: LLM 输出（可能包裹在 ```json 代码块中）
+        n: 批内问题数量
+
+    Returns:
+        编号（从 1 开始）-> 答案；解析失败或缺失的编号不出现在结果中
+    """
+    match = re.search(r"\{.*\}", result, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        data = _json.loads(match.group())
+    except _json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    parsed = {}
+    for i in range(1, n + 1):
+        answer = data.get(str(i))
+        if isinstance(answer, str) and answer.strip():
+            parsed[i] = answer.strip()
+    return parsed
+
+
+@functools.lru_cache(maxsize=256)
+def _format_contents(contents: Tuple[str, ...]) -> str:
+    return "\n\n".join(f"[文档 {i}]\n{content}" for i, content in enumerate(contents, 1))
+
+
+def format_context(
+    context: List[Document],
+    token_budget: Optional[int] = None,
+    model: str = "qwen-plus",
+) -> str:
+    """
+    把上下文文档格式化为带编号的文本块
+
+    同一组文档在流水线中多次出现（生成 → 查询改写 → 重新生成、评测循环）时，
+    直接命中缓存，不再重复拼接。缓存按文档内容（保持顺序）匹配。
+
+    指定 token_budget 时先按预算装填：文档都带有 relevance_score 时按分数从高到低装填，
+    否则按原顺序；超出预算的部分被截断。装填结果同样缓存，后续调用直接复用。
+
+    Args:
+        context: 上下文文档
+        token_budget: 上下文 token 预算（None 表示不限制）
+        model: 计算 token 数使用的模型
+
+    Returns:
+        "[文档 1]\n内容\n\n[文档 2]\n内容..." 形式的文本
+    """
+    if token_budget is not None and all("relevance_score" in doc.metadata for doc in context):
+        context = sorted(context, key=lambda doc: doc.metadata["relevance_score"], reverse=True)
+
+    contents = tuple(doc.page_content for doc in context)
+    if token_budget is not None:
+        contents = pack_contents(contents, token_budget, model)
+    return _format_contents(contents)
+
+
+def build_default_prompt(
+    query: str,
+    context: List[Document] = None,
+    token_budget: Optional[int] = None,
+    model: str = "qwen-plus",
+) -> List[BaseMessage]:
+    """
+    构建默认提示：固定的系统消息（SHARED_PREFIX），用户消息中先放上下文、最后放查询
+
+    Args:
+        query: 用户查询
+        context: 上下文文档
+        token_budget: 上下文 token 预算（None 表示不限制）
+        model: 计算 token 数使用的模型
+
+    Returns:
+        消息列表
+    """
+    if context:
+        content = f"上下文信息：\n{format_context(context, token_budget, model)}\n\n用户问题：{query}\n\n答案："
+    else:
+        content = f"用户问题：{query}\n\n答案："
+    return [SystemMessage(SHARED_PREFIX), HumanMessage(content)]
+
+
+class LLMGeneratorOperator(ResponseCachingMixin, BaseGenerationOperator):
     """
     基础 LLM Generator 操作器
 
@@ -26,12 +167,49 @@ class LLMGeneratorOperator(BaseGenerationOperator):
     - RAG 问答
     """
 
+    __slots__ = (
+        "_cag_prefix",
+        "_chain",
+        "_limiter",
+        "batch_size",
+        "cag_documents",
+        "context_token_budget",
+        "enable_cag",
+        "llm",
+        "max_concurrency",
+        "max_retries",
+        "max_tokens",
+        "model",
+        "rate_limit_rpm",
+        "response_cache",
+        "stream",
+        "temperature",
+        "top_p",
+    )
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.model = self.config.get("model", "qwen-plus")
         self.temperature = self.config.get("temperature", 0.7)
         self.max_tokens = self.config.get("max_tokens", 2000)
         self.top_p = self.config.get("top_p", 0.9)
+        self.stream = self.config.get("stream", True)  # 底层以流式请求，客户端拼接完整答案（首包更快返回）
+        # 批量生成：同时在途的请求数 + （可选）每分钟请求数上限，按 DashScope 账户额度调整
+        self.max_concurrency = self.config.get("max_concurrency", 16)
+        self.rate_limit_rpm = self.config.get("rate_limit_rpm", None)
+        # 遇到限流（429）时并发数减半并等待后重试，成功后逐步恢复（AIMD）
+        self.max_retries = self.config.get("max_retries", 3)
+        self._limiter = AdaptiveSemaphore(self.max_concurrency)
+        # batch_execute：每次请求合并的 (查询, 上下文) 数量
+        self.batch_size = self.config.get("batch_size", 8)
+        # 默认提示中上下文的 token 预算（默认为模型上下文窗口的 75%）
+        self.context_token_budget = self.config.get("context_token_budget", default_context_budget(self.model))
+        # 响应缓存：只对低温度生成（temperature ≤ cache_max_temperature）生效，config["cache"] = False 可关闭
+        self._init_response_cache(self.temperature)
+        # CAG（Cache-Augmented Generation）：固定文档集预先放入不变的前缀，跳过检索
+        self.enable_cag = self.config.get("enable_cag", False)
+        self.cag_documents = self.config.get("cag_documents", [])
+        self._cag_prefix = self._build_cag_prefix() if self.enable_cag else None
 
         # 初始化 LLM
         self.llm = ChatQwen(
@@ -39,12 +217,24 @@ class LLMGeneratorOperator(BaseGenerationOperator):
             temperature=self.temperature,
             max_tokens=self.max_tokens,
             top_p=self.top_p,
+            rate_limiter=InMemoryRateLimiter(
+                requests_per_second=self.rate_limit_rpm / 60,
+                check_every_n_seconds=0.05,
+                max_bucket_size=self.max_concurrency,
+            ) if self.rate_limit_rpm else None,
+            # 重试由 _invoke / _ainvoke 负责：429 需要立即反馈给并发控制，而不是在客户端内部重试
+            max_retries=0,
+            **http_clients(),
         )
+        # 调用链只组合一次（| 每次都会创建新的 RunnableSequence）
+        self._chain = self.llm | StrOutputParser()
 
     def execute(self, query: str, context: List[Document] = None, **kwargs) -> str:
         """
         生成答案
 
+        CAG 模式下忽略传入的 prompt 和 context，基于预加载的文档集回答。
+
         Args:
             query: 用户查询
             context: 上下文文档
@@ -56,43 +246,250 @@ class LLMGeneratorOperator(BaseGenerationOperator):
         # 获取提示（可能从 kwargs 传入）
         prompt_text = kwargs.get("prompt", None)
 
-        if prompt_text is None:
+        if self._cag_prefix is not None:
+            prompt_text = self._cag_prefix + [HumanMessage(f"用户问题：{query}\n\n答案：")]
+            context = self.cag_documents
+        elif prompt_text is None:
             # 使用默认提示格式
-            prompt_text = self._build_default_prompt(query, context)
-
-        # 创建 prompt template
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", "你是一个专业的AI助手。"),
-            ("human", prompt_text)
-        ])
+            prompt_text = build_default_prompt(query, context, self.context_token_budget, self.model)
 
         # 生成
-        chain = prompt_template | self.llm | StrOutputParser()
+        messages = to_messages(prompt_text)
+        cached, ticket = self._cache_lookup(self.model, messages, self._params(), query, context)
+        if cached is not None:
+            return cached
 
         try:
-            answer = chain.invoke({})
-            return answer.strip()
+            answer = self._invoke(messages).strip()
+            self._cache_store(ticket, answer)
+            return answer
         except Exception as e:
             print(f"❌ 生成失败: {e}")
             return f"抱歉，生成答案时出现错误：{str(e)}"
 
-    def _build_default_prompt(self, query: str, context: List[Document]) -> str:
-        """构建默认提示"""
-        if context:
-            context_text = "\n\n".join([f"[文档 {i+1}]\n{doc.page_content}" for i, doc in enumerate(context)])
-            return f"""基于以下上下文信息回答问题：
+    async def aexecute_many(
+        self,
+        prompts: List[Prompt],
+        queries: Optional[List[str]] = None,
+        contexts: Optional[List[List[Document]]] = None,
+    ) -> List[str]:
+        """
+        批量生成答案
+
+        并发发出请求：并发数由 AIMD 控制（从 max_concurrency 开始，遇到 429 减半），
+        配置了 rate_limit_rpm 时再经令牌桶限流，结果与 prompts 顺序一致。
+        批内相同的提示只请求一次，答案分发给所有重复的位置。
+
+        Args:
+            prompts: 已构建好的提示列表（字符串或消息列表）
+            queries: 与 prompts 一一对应的查询（可选，提供时启用语义缓存，与 execute 一致）
+            contexts: 与 prompts 一一对应的上下文文档（可选）
+
+        Returns:
+            生成的答案列表（单条失败时对应位置为错误信息）
+        """
+        all_messages, keys, answers, tickets = self._cache_lookup_many(prompts, queries, contexts)
+
+        # 只对未命中缓存的提示发出请求，相同的提示合并为一次请求
+        unique: Dict[str, int] = {}
+        for i, answer in enumerate(answers):
+            if answer is None:
+                unique.setdefault(keys[i], i)
+        pending = list(unique.values())
+        responses = await asyncio.gather(
+            *(self._ainvoke(all_messages[i]) for i in pending),
+            return_exceptions=True,
+        )
 
-上下文：
-{context_text}
+        generated: Dict[str, str] = {}
+        for i, response in zip(pending, responses):
+            if isinstance(response, Exception):
+                print(f"❌ 生成失败: {response}")
+                generated[keys[i]] = f"抱歉，生成答案时出现错误：{str(response)}"
+            else:
+                generated[keys[i]] = response
+                self._cache_store(tickets[i], response)
+
+        return [answer if answer is not None else generated[key] for answer, key in zip(answers, keys)]
+
+    def _cache_lookup_many(
+        self,
+        prompts: List[Prompt],
+        queries: Optional[List[str]] = None,
+        contexts: Optional[List[List[Document]]] = None,
+    ) -> Tuple[List[List[BaseMessage]], List[str], List[Optional[str]], List[Optional[CacheTicket]]]:
+        """
+        批量查询响应缓存（精确 + 语义，与 execute 相同）
+
+        Returns:
+            (消息列表, 批内去重用的键, 缓存的答案或 None, 写回用的 CacheTicket)
+        """
+        queries = queries or [None] * len(prompts)
+        contexts = contexts or [None] * len(prompts)
+        params = self._params()
+        all_messages = [to_messages(prompt) for prompt in prompts]
+        keys = [self._response_key(messages) for messages in all_messages]
+        lookups = [
+            self._cache_lookup(self.model, messages, params, query, context)
+            for messages, query, context in zip(all_messages, queries, contexts)
+        ]
+        answers = [answer for answer, _ in lookups]
+        tickets = [ticket for _, ticket in lookups]
+        return all_messages, keys, answers, tickets
+
+    def _invoke(self, messages: List[BaseMessage]) -> str:
+        """
+        同步调用 LLM，遇到限流或临时错误时退避重试
 
-问题：{query}
+        Args:
+            messages: 消息列表
+
+        Returns:
+            生成的答案
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.stream:
+                    # 流式接收增量内容，再拼接为完整答案（调用方得到的仍是完整字符串）
+                    return "".join(self._chain.stream(messages))
+                return self._chain.invoke(messages)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(retry_delay(e, attempt))
+
+    async def _ainvoke(self, messages: List[BaseMessage]) -> str:
+        """
+        在自适应并发控制下调用 LLM，遇到限流或临时错误时退避重试
 
-答案："""
+        Args:
+            messages: 消息列表
+
+        Returns:
+            生成的答案
+        """
+        for attempt in range(self.max_retries + 1):
+            async with self._limiter:
+                started = time.monotonic()
+                try:
+                    response = await self.llm.ainvoke(messages)
+                except RETRYABLE_ERRORS as e:
+                    if isinstance(e, RateLimitError):
+                        self._limiter.decrease(started)
+                    if attempt == self.max_retries:
+                        raise
+                    delay = retry_delay(e, attempt)
+                else:
+                    self._limiter.increase()
+                    return response.content.strip()
+            # 在释放并发名额之后再等待
+            await asyncio.sleep(delay)
+
+    def _build_cag_prefix(self) -> List[BaseMessage]:
+        """
+        构建 CAG 前缀：系统消息 + 全部预加载文档（每次请求都完全相同）
+
+        Returns:
+            前缀消息列表
+        """
+        context_text = format_context(self.cag_documents)
+        return [SystemMessage(f"{SHARED_PREFIX}\n\n上下文信息：\n{context_text}")]
+
+    def warmup_cag(self):
+        """
+        预热 CAG 前缀：先发一次只含前缀的极短请求，让服务端缓存前缀
+
+        之后并发到达的查询都能命中前缀缓存（否则同时发出的首批请求都会未命中）。
+        """
+        if self._cag_prefix is None:
+            return
+        print(f"🔥 预热 CAG 前缀（{len(self.cag_documents)} 个文档）...")
+        self.llm.bind(max_tokens=1).invoke(self._cag_prefix + [HumanMessage("请回复：好的")])
+
+    def _params(self) -> Dict[str, Any]:
+        """影响输出的生成参数（参与缓存键计算）"""
+        return {"temperature": self.temperature, "max_tokens": self.max_tokens, "top_p": self.top_p}
+
+    def _response_key(self, messages: List[BaseMessage]) -> str:
+        """计算提示的键（用于响应缓存和批内去重）"""
+        return response_key(self.model, messages, self._params())
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        响应缓存的命中统计
+
+        Returns:
+            统计字典（未启用缓存时为空字典）
+        """
+        return self.response_cache.stats() if self.response_cache is not None else {}
+
+    def concurrency_stats(self) -> Dict[str, Any]:
+        """
+        自适应并发控制的统计（当前并发上限、成功数、429 次数）
+
+        Returns:
+            统计字典
+        """
+        return self._limiter.stats()
+
+    def batch_execute(self, queries: List[str], contexts: Optional[List[List[Document]]] = None) -> List[str]:
+        """
+        把多个 (查询, 上下文) 合并到同一次请求中生成答案
+
+        每 batch_size 个查询共用一份任务说明（共享前缀），按编号列出各自的问题和上下文，
+        要求按编号返回 JSON；各批请求并发发出。某个编号解析失败时单独回退到 execute。
+        合并后每次请求处理多个问题，请求次数和前缀 token 约降为 1/batch_size，
+        但单个答案的质量可能略低于单独请求，batch_size 越大越明显。
+
+        Args:
+            queries: 查询列表
+            contexts: 与 queries 一一对应的上下文文档列表（可选）
+
+        Returns:
+            与 queries 顺序一致的答案列表
+        """
+        contexts = contexts or [None] * len(queries)
+        if len(contexts) != len(queries):
+            raise ValueError("queries 与 contexts 的数量必须一致")
+
+        starts = range(0, len(queries), self.batch_size)
+        prompts = [
+            self._shared_prefix() + "\n\n".join(
+                self._format_tuple(i, query, context)
+                for i, (query, context) in enumerate(
+                    zip(queries[start:start + self.batch_size], contexts[start:start + self.batch_size]), 1
+                )
+            )
+            for start in starts
+        ]
+        raw_answers = run_async(self.aexecute_many(prompts))
+
+        answers = []
+        for start, raw in zip(starts, raw_answers):
+            batch = list(zip(queries[start:start + self.batch_size], contexts[start:start + self.batch_size]))
+            parsed = _parse_numbered_answers(raw, len(batch))
+            for i, (query, context) in enumerate(batch, 1):
+                answers.append(parsed[i] if i in parsed else self.execute(query, context))
+        return answers
+
+    def _shared_prefix(self) -> str:
+        """批量请求的共享前缀：任务说明 + 输出格式"""
+        return """请分别回答下面按编号列出的问题，每个问题只能使用其后给出的上下文信息。
+只输出一个 JSON 对象，键为问题编号（字符串），值为该问题的答案，例如：
+{"1": "第 1 个问题的答案", "2": "第 2 个问题的答案"}
+
+"""
+
+    def _format_tuple(self, index: int, query: str, context: List[Document] = None) -> str:
+        """格式化批量请求中的单个 (查询, 上下文)"""
+        if context:
+            context_text = "\n".join(f"[文档 {i}] {doc.page_content}" for i, doc in enumerate(context, 1))
         else:
-            return f"问题：{query}\n\n答案："
+            context_text = "暂无上下文信息。"
+        return f"{index}. 问题：{query}\n上下文：\n{context_text}"
 
 
-class StreamGeneratorOperator(BaseGenerationOperator):
+class StreamGeneratorOperator(ResponseCachingMixin, BaseGenerationOperator):
     """
     Stream Generator 操作器（流式生成）
 
@@ -107,11 +504,30 @@ class StreamGeneratorOperator(BaseGenerationOperator):
     - 交互式应用
     """
 
+    __slots__ = (
+        "context_token_budget",
+        "llm",
+        "max_tokens",
+        "model",
+        "response_cache",
+        "stream_batch_growth",
+        "stream_batch_items",
+        "stream_batch_latency_ms",
+        "temperature",
+    )
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.model = self.config.get("model", "qwen-plus")
         self.temperature = self.config.get("temperature", 0.7)
         self.max_tokens = self.config.get("max_tokens", 2000)
+        # 流式增量批处理：合并细碎的 token 再输出，减少写操作次数
+        # 批大小从 1 开始按 stream_batch_growth 倍增长到 stream_batch_items（首个 token 立即输出）
+        self.stream_batch_items = self.config.get("stream_batch_items", 50)
+        self.stream_batch_latency_ms = self.config.get("stream_batch_latency_ms", 200)
+        self.stream_batch_growth = self.config.get("stream_batch_growth", 3)
+        self.context_token_budget = self.config.get("context_token_budget", default_context_budget(self.model))
+        self._init_response_cache(self.temperature)
 
         # 初始化 LLM（启用流式）
         self.llm = ChatQwen(
@@ -119,6 +535,7 @@ class StreamGeneratorOperator(BaseGenerationOperator):
             temperature=self.temperature,
             max_tokens=self.max_tokens,
             streaming=True,
+            **http_clients(),
         )
 
     def execute(self, query: str, context: List[Document] = None, **kwargs) -> str:
@@ -133,51 +550,71 @@ class StreamGeneratorOperator(BaseGenerationOperator):
         Returns:
             完整的生成答案
         """
-        prompt_text = kwargs.get("prompt", self._build_default_prompt(query, context))
+        prompt_text = kwargs.get("prompt") or build_default_prompt(
+            query, context, self.context_token_budget, self.model
+        )
 
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", "你是一个专业的AI助手。"),
-            ("human", prompt_text)
-        ])
+        messages = to_messages(prompt_text)
+        params = {"temperature": self.temperature, "max_tokens": self.max_tokens}
+        cached, ticket = self._cache_lookup(self.model, messages, params, query, context)
+        if cached is not None:
+            print(f"\n💾 命中缓存\n{cached}")
+            return cached
 
         print("\n🔄 开始流式生成...")
         print("-" * 60)
 
         # 收集流式输出
-        full_response = []
+        full_response = io.StringIO()
 
         try:
-            for chunk in self.llm.stream(prompt_template.format_messages()):
-                content = chunk.content
-                print(content, end="", flush=True)
-                full_response.append(content)
+            deltas = (chunk.content for chunk in self.llm.stream(messages))
+            for content in batch_stream(
+                deltas, self.stream_batch_items, self.stream_batch_latency_ms, self.stream_batch_growth
+            ):
+                sys.stdout.write(content)
+                sys.stdout.flush()
+                full_response.write(content)
 
             print("\n" + "-" * 60)
             print("✅ 生成完成\n")
 
-            return "".join(full_response).strip()
+            answer = full_response.getvalue().strip()
+            self._cache_store(ticket, answer)
+            return answer
 
         except Exception as e:
             print(f"\n❌ 流式生成失败: {e}")
             return f"抱歉，生成答案时出现错误：{str(e)}"
 
-    def _build_default_prompt(self, query: str, context: List[Document]) -> str:
-        """构建默认提示"""
-        if context:
-            context_text = "\n\n".join([f"[文档 {i+1}]\n{doc.page_content}" for i, doc in enumerate(context)])
-            return f"""基于以下上下文信息回答问题：
+    async def astream(self, query: str, context: List[Document] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        异步流式生成：增量到达即转发给调用方
 
-上下文：
-{context_text}
+        与 execute 不同，不在内部拼接完整答案；下游（UI、后续处理）
+        在首个增量到达时就可以开始消费。增量按 stream_batch_items /
+        stream_batch_latency_ms / stream_batch_growth 合并后输出。
 
-问题：{query}
+        Args:
+            query: 用户查询
+            context: 上下文文档
+            **kwargs: 额外参数（如 prompt）
 
-答案："""
-        else:
-            return f"问题：{query}\n\n答案："
+        Yields:
+            答案文本增量
+        """
+        prompt_text = kwargs.get("prompt") or build_default_prompt(
+            query, context, self.context_token_budget, self.model
+        )
+        deltas = (chunk.content async for chunk in self.llm.astream(to_messages(prompt_text)))
+
+        async for content in abatch_stream(
+            deltas, self.stream_batch_items, self.stream_batch_latency_ms, self.stream_batch_growth
+        ):
+            yield content
 
 
-class EnsembleGeneratorOperator(BaseGenerationOperator):
+class EnsembleGeneratorOperator(ResponseCachingMixin, BaseGenerationOperator):
     """
     Ensemble Generator 操作器（集成生成）
 
@@ -192,21 +629,56 @@ class EnsembleGeneratorOperator(BaseGenerationOperator):
     - 关键任务
     """
 
+    __slots__ = (
+        "_chains",
+        "context_token_budget",
+        "fusion_strategy",
+        "llms",
+        "max_concurrency",
+        "models",
+        "response_cache",
+        "temperature",
+    )
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.models = self.config.get("models", ["qwen-plus", "qwen-max"])
         self.temperature = self.config.get("temperature", 0.7)
         self.fusion_strategy = self.config.get("fusion_strategy", "voting")  # voting 或 concatenate
+        self.max_concurrency = self.config.get("max_concurrency", len(self.models))  # 同时请求的模型数
+        # 上下文需要同时装得下所有模型，取最小的默认预算
+        self.context_token_budget = self.config.get(
+            "context_token_budget", min(default_context_budget(model) for model in self.models)
+        )
+        self._init_response_cache(self.temperature)
 
         # 初始化多个 LLM
         self.llms = [
-            ChatQwen(model=model, temperature=self.temperature)
+            ChatQwen(model=model, temperature=self.temperature, **http_clients())
             for model in self.models
         ]
+        self._chains = [llm | StrOutputParser() for llm in self.llms]
 
     def execute(self, query: str, context: List[Document] = None, **kwargs) -> str:
         """
-        集成生成答案
+        集成生成答案（aexecute 的同步版本）
+
+        Args:
+            query: 用户查询
+            context: 上下文文档
+            **kwargs: 额外参数
+
+        Returns:
+            融合后的答案
+        """
+        return run_async(self.aexecute(query, context, **kwargs))
+
+    async def aexecute(self, query: str, context: List[Document] = None, **kwargs) -> str:
+        """
+        异步集成生成答案
+
+        prompt 只构建一次，所有模型的请求通过 asyncio.gather 同时发出
+        （最多 max_concurrency 个在途），总耗时约等于最慢的模型。
 
         Args:
             query: 用户查询
@@ -216,74 +688,327 @@ class EnsembleGeneratorOperator(BaseGenerationOperator):
         Returns:
             融合后的答案
         """
-        prompt_text = kwargs.get("prompt", self._build_default_prompt(query, context))
+        prompt_text = kwargs.get("prompt", None)
+        if prompt_text is None:
+            prompt_text = build_default_prompt(query, context, self.context_token_budget, self.models[0])
 
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", "你是一个专业的AI助手。"),
-            ("human", prompt_text)
-        ])
+        messages = to_messages(prompt_text)
+        model_key = "+".join(self.models)
+        params = {"temperature": self.temperature, "fusion_strategy": self.fusion_strategy}
+        cached, ticket = self._cache_lookup(model_key, messages, params, query, context)
+        if cached is not None:
+            return cached
 
         print(f"🔄 使用 {len(self.llms)} 个模型生成答案...")
 
-        # 从每个模型生成答案
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def invoke(chain) -> str:
+            async with semaphore:
+                return await chain.ainvoke(messages)
+
+        results = await asyncio.gather(*(invoke(chain) for chain in self._chains), return_exceptions=True)
+
         answers = []
-        for i, llm in enumerate(self.llms, 1):
-            try:
-                chain = prompt_template | llm | StrOutputParser()
-                answer = chain.invoke({})
-                answers.append(answer.strip())
+        for i, result in enumerate(results, 1):
+            if isinstance(result, Exception):
+                print(f"   ✗ 模型 {i} 失败: {result}")
+            else:
+                answers.append(result.strip())
                 print(f"   ✓ 模型 {i} 完成")
-            except Exception as e:
-                print(f"   ✗ 模型 {i} 失败: {e}")
 
         if not answers:
             return "抱歉，所有模型都生成失败。"
 
+        # 最长的答案（假设更详细）：长度只计算一次，投票和连接共用
+        lengths = np.fromiter((len(answer) for answer in answers), dtype=np.int64, count=len(answers))
+        longest = answers[int(lengths.argmax())]
+
         # 融合答案
         if self.fusion_strategy == "voting":
-            # 简单的投票：返回最长的答案（假设更详细）
-            final_answer = max(answers, key=len)
+            # 简单的投票：返回最长的答案
+            final_answer = longest
         elif self.fusion_strategy == "concatenate":
             # 连接所有答案
-            final_answer = self._concatenate_answers(answers)
+            final_answer = self._concatenate_answers(answers, longest)
         else:
             # 默认返回第一个
             final_answer = answers[0]
 
         print(f"✅ 集成完成")
 
+        self._cache_store(ticket, final_answer)
         return final_answer
 
-    def _build_default_prompt(self, query: str, context: List[Document]) -> str:
-        """构建默认提示"""
-        if context:
-            context_text = "\n\n".join([f"[文档 {i+1}]\n{doc.page_content}" for i, doc in enumerate(context)])
-            return f"""基于以下上下文信息回答问题：
+    def _concatenate_answers(self, answers: List[str], longest: str) -> str:
+        """连接多个答案（longest 为最长的答案，作为综合结论）"""
+        parts = ["综合多个模型的回答：\n\n"]
+        parts.extend(f"模型 {i}：\n{answer}\n\n" for i, answer in enumerate(answers, 1))
+        parts.append("综合结论：\n")
+        # 简单地返回最长的答案作为综合结论
+        parts.append(longest)
+
+        return "".join(parts)
+
+
+class BatchLLMGeneratorOperator(LLMGeneratorOperator):
+    """
+    Batch LLM Generator 操作器（离线批处理生成）
+
+    功能：
+    - 把一批提示写成 JSONL 上传，通过 Batch API 提交（OpenAI 兼容接口，DashScope 同样支持）
+    - 按指数退避轮询任务状态，完成后下载结果并按 custom_id 还原顺序
+    - 确定性生成时复用响应缓存，只提交未命中的提示
+
+    应用场景：
+    - 离线评测、批量 text_to_sql 等不要求实时返回的大批量生成
+    - 以数分钟到 24 小时的等待换取约一半的调用费用
+    """
+
+    __slots__ = (
+        "api_key",
+        "base_url",
+        "client",
+        "completion_window",
+        "max_poll_interval",
+        "poll_interval",
+    )
+
+    # 消息类型 -> Chat Completions 角色
+    ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self.base_url = self.config.get("batch_base_url", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+        self.api_key = self.config.get("batch_api_key", os.getenv("DASHSCOPE_API_KEY"))
+        self.completion_window = self.config.get("completion_window", "24h")
+        self.poll_interval = self.config.get("poll_interval", 5)  # 首次轮询间隔（秒），之后指数增长
+        self.max_poll_interval = self.config.get("max_poll_interval", 300)
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=get_client())
+
+    def execute(self, query: str, context: List[Document] = None, **kwargs) -> str:
+        """
+        生成答案（单条提示同样走 Batch API）
+
+        Args:
+            query: 用户查询
+            context: 上下文文档
+            **kwargs: 额外参数（如 prompt）
+
+        Returns:
+            生成的答案
+        """
+        prompt = kwargs.get("prompt", None)
+        if prompt is None:
+            prompt = build_default_prompt(query, context, self.context_token_budget, self.model)
+        return self.execute_batch([prompt])[0]
+
+    async def aexecute_many(
+        self,
+        prompts: List[Prompt],
+        queries: Optional[List[str]] = None,
+        contexts: Optional[List[List[Document]]] = None,
+    ) -> List[str]:
+        """批量生成答案（在线程中等待批处理任务完成）"""
+        return await asyncio.to_thread(self.execute_batch, prompts, queries, contexts)
+
+    def execute_batch(
+        self,
+        prompts: List[Prompt],
+        queries: Optional[List[str]] = None,
+        contexts: Optional[List[List[Document]]] = None,
+    ) -> List[str]:
+        """
+        通过 Batch API 批量生成答案
+
+        Args:
+            prompts: 已构建好的提示列表（字符串或消息列表）
+            queries: 与 prompts 一一对应的查询（可选，提供时启用语义缓存）
+            contexts: 与 prompts 一一对应的上下文文档（可选）
+
+        Returns:
+            与 prompts 顺序一致的答案列表（单条失败时对应位置为错误信息）
+        """
+        all_messages, keys, answers, tickets = self._cache_lookup_many(prompts, queries, contexts)
 
-上下文：
-{context_text}
+        # 相同的提示只提交一次
+        unique: Dict[str, int] = {}
+        for i, answer in enumerate(answers):
+            if answer is None:
+                unique.setdefault(keys[i], i)
 
-问题：{query}
+        if unique:
+            try:
+                results = self._run_batch({str(i): all_messages[i] for i in unique.values()})
+            except Exception as e:
+                print(f"❌ 批处理生成失败: {e}")
+                results = {}
 
-答案："""
+            for key, i in unique.items():
+                answer = results.get(str(i))
+                if answer is None:
+                    answer = "抱歉，生成答案时出现错误：批处理任务未返回结果"
+                else:
+                    self._cache_store(tickets[i], answer)
+                unique[key] = answer
+
+        return [answer if answer is not None else unique[key] for answer, key in zip(answers, keys)]
+
+    def _run_batch(self, requests: Dict[str, List[BaseMessage]]) -> Dict[str, str]:
+        """
+        提交批处理任务并等待结果
+
+        Args:
+            requests: custom_id -> 消息列表
+
+        Returns:
+            custom_id -> 答案（失败的请求不出现在结果中）
+        """
+        lines = [
+            _json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [
+                        {"role": self.ROLES.get(message.type, "user"), "content": message.content}
+                        for message in messages
+                    ],
+                    "temperature": self.temperature,
+                    "max_tokens": self.max_tokens,
+                    "top_p": self.top_p,
+                },
+            })
+            for custom_id, messages in requests.items()
+        ]
+
+        input_file = self.client.files.create(
+            file=("batch_input.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+        print(f"📦 已提交批处理任务 {batch.id}（{len(lines)} 条请求）")
+
+        # 指数退避轮询
+        interval = self.poll_interval
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+
+        if batch.status != "completed":
+            raise RuntimeError(f"批处理任务 {batch.id} 状态为 {batch.status}")
+
+        results = {}
+        if batch.output_file_id:
+            for line in self.client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = _json.loads(line)
+                response = record.get("response") or {}
+                if response.get("status_code") != 200:
+                    continue
+                results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"].strip()
+
+        print(f"✅ 批处理任务完成: {len(results)}/{len(lines)} 条成功")
+        return results
+
+
+class SpeculativeCombinedOperator(LLMGeneratorOperator):
+    """
+    Speculative Combined 操作器（改写 + 生成合并为一次请求）
+
+    功能：
+    - 在同一次 LLM 调用中先改写查询、再基于上下文回答
+    - 输出 JSON {"rewritten": ..., "answer": ...}，省去单独的改写往返
+    - JSON 解析失败时返回 None，由调用方退回 改写 → 生成 两步流程
+
+    应用场景：
+    - 简单（较短）查询的 query_rewrite → generation 流程
+    - 对延迟敏感的问答
+    """
+
+    __slots__ = ()
+
+    SYSTEM_MESSAGE = (
+        "你是一个专业的AI助手。请分两步完成任务：\n"
+        "1. 先把用户问题改写为更清晰、完整的表述；\n"
+        "2. 再基于提供的上下文信息回答改写后的问题。\n"
+        '只输出 JSON，格式为：{"rewritten": "改写后的问题", "answer": "答案"}'
+    )
+
+    def execute(self, query: str, context: List[Document] = None, **kwargs) -> str:
+        """
+        生成答案（合并请求失败时退回普通生成）
+
+        Args:
+            query: 用户查询
+            context: 上下文文档
+            **kwargs: 额外参数
+
+        Returns:
+            生成的答案
+        """
+        result = self.execute_combined(query, context)
+        if result is not None:
+            return result["answer"]
+        return super().execute(query, context, **kwargs)
+
+    def execute_combined(self, query: str, context: List[Document] = None) -> Optional[Dict[str, str]]:
+        """
+        一次请求完成查询改写和答案生成
+
+        Args:
+            query: 用户查询
+            context: 上下文文档
+
+        Returns:
+            {"rewritten": 改写后的查询, "answer": 答案}；解析失败时返回 None
+        """
+        if context:
+            context_text = format_context(context, self.context_token_budget, self.model)
         else:
-            return f"问题：{query}\n\n答案："
+            context_text = "暂无上下文信息。"
 
-    def _concatenate_answers(self, answers: List[str]) -> str:
-        """连接多个答案"""
-        combined = "综合多个模型的回答：\n\n"
+        messages = [
+            SystemMessage(self.SYSTEM_MESSAGE),
+            HumanMessage(f"上下文信息：\n{context_text}\n\n用户问题：{query}"),
+        ]
+        raw = super().execute(query, context, prompt=messages)
 
-        for i, answer in enumerate(answers, 1):
-            combined += f"模型 {i}：\n{answer}\n\n"
+        match = re.search(r"\{.*\}", raw, re.DOTALL)
+        if not match:
+            return None
+        try:
+            data = _json.loads(match.group())
+        except _json.JSONDecodeError:
+            return None
+        if not isinstance(data, dict) or not data.get("answer"):
+            return None
 
-        combined += "综合结论：\n"
-        # 简单地返回最长的答案作为综合结论
-        combined += max(answers, key=len)
+        return {
+            "rewritten": str(data.get("rewritten") or query).strip(),
+            "answer": str(data["answer"]).strip(),
+        }
 
-        return combined
 
+# 复杂查询关键词：编译为一个多选正则，单次扫描查询即可判断是否命中任一关键词
+COMPLEX_KEYWORDS = ["比较", "分析", "评估", "综合", "详细", "解释", "为什么"]
+_COMPLEX_KEYWORDS_RE = re.compile("|".join(map(re.escape, COMPLEX_KEYWORDS)))
 
-class AdaptiveGeneratorOperator(BaseGenerationOperator):
+
+@functools.lru_cache(maxsize=4096)
+def _has_complex_keyword(query: str) -> bool:
+    """查询中是否包含复杂关键词（相同查询反复出现时直接命中缓存）"""
+    return _COMPLEX_KEYWORDS_RE.search(query) is not None
+
+
+class AdaptiveGeneratorOperator(ResponseCachingMixin, BaseGenerationOperator):
     """
     Adaptive Generator 操作器（自适应生成）
 
@@ -298,15 +1023,36 @@ class AdaptiveGeneratorOperator(BaseGenerationOperator):
     - 资源优化
     """
 
+    __slots__ = (
+        "_complex_chain",
+        "_simple_chain",
+        "complex_llm",
+        "complex_model",
+        "complexity_threshold",
+        "context_token_budget",
+        "response_cache",
+        "simple_llm",
+        "simple_model",
+        "temperature",
+    )
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.simple_model = self.config.get("simple_model", "qwen-turbo")
         self.complex_model = self.config.get("complex_model", "qwen-max")
         self.complexity_threshold = self.config.get("complexity_threshold", 0.6)
+        self.temperature = self.config.get("temperature", 0.7)
+        self.context_token_budget = self.config.get(
+            "context_token_budget",
+            min(default_context_budget(self.simple_model), default_context_budget(self.complex_model)),
+        )
+        self._init_response_cache(self.temperature)
 
         # 初始化两个模型
-        self.simple_llm = ChatQwen(model=self.simple_model, temperature=0.7)
-        self.complex_llm = ChatQwen(model=self.complex_model, temperature=0.7)
+        self.simple_llm = ChatQwen(model=self.simple_model, temperature=self.temperature, **http_clients())
+        self.complex_llm = ChatQwen(model=self.complex_model, temperature=self.temperature, **http_clients())
+        self._simple_chain = self.simple_llm | StrOutputParser()
+        self._complex_chain = self.complex_llm | StrOutputParser()
 
     def execute(self, query: str, context: List[Document] = None, **kwargs) -> str:
         """
@@ -325,27 +1071,29 @@ class AdaptiveGeneratorOperator(BaseGenerationOperator):
 
         # 选择模型
         if complexity >= self.complexity_threshold:
-            llm = self.complex_llm
+            chain, model = self._complex_chain, self.complex_model
             model_type = "复杂模型"
         else:
-            llm = self.simple_llm
+            chain, model = self._simple_chain, self.simple_model
             model_type = "简单模型"
 
         print(f"📊 查询复杂度: {complexity:.2f}")
         print(f"🤖 选择模型: {model_type}")
 
         # 生成答案
-        prompt_text = kwargs.get("prompt", self._build_default_prompt(query, context))
+        prompt_text = kwargs.get("prompt") or build_default_prompt(
+            query, context, self.context_token_budget, model
+        )
 
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", "你是一个专业的AI助手。"),
-            ("human", prompt_text)
-        ])
+        messages = to_messages(prompt_text)
+        cached, ticket = self._cache_lookup(model, messages, {"temperature": self.temperature}, query, context)
+        if cached is not None:
+            return cached
 
         try:
-            chain = prompt_template | llm | StrOutputParser()
-            answer = chain.invoke({})
-            return answer.strip()
+            answer = chain.invoke(messages).strip()
+            self._cache_store(ticket, answer)
+            return answer
         except Exception as e:
             print(f"❌ 生成失败: {e}")
             return f"抱歉，生成答案时出现错误：{str(e)}"
@@ -380,23 +1128,7 @@ class AdaptiveGeneratorOperator(BaseGenerationOperator):
             complexity += 0.1
 
         # 复杂关键词
-        complex_keywords = ["比较", "分析", "评估", "综合", "详细", "解释", "为什么"]
-        if any(kw in query for kw in complex_keywords):
+        if _has_complex_keyword(query):
             complexity += 0.3
 
         return min(complexity, 1.0)
-
-    def _build_default_prompt(self, query: str, context: List[Document]) -> str:
-        """构建默认提示"""
-        if context:
-            context_text = "\n\n".join([f"[文档 {i+1}]\n{doc.page_content}" for i, doc in enumerate(context)])
-            return f"""基于以下上下文信息回答问题：
-
-上下文：
-{context_text}
-
-问题：{query}
-
-答案："""
-        else:
-            return f"问题：{query}\n\n答案："
@@ -6,13 +6,143 @@
 2. Citation: 引用标注
 3. Answer Refinement: 答案精炼
 4. Summary: 摘要生成
+5. Fused: 精炼 + 引用 + 结构化 合并为一次 LLM 调用
 """
 
-from typing import List, Dict, Any
+import io
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage
 
-from .base import BaseGenerationOperator
+from .. import _json
+from .base import BaseGenerationOperator, get_chat
+from .generator import _parse_numbered_answers
+from .stream import batch_stream
+
+# 精炼目标 -> 描述
+_GOAL_MAP = {
+    "clarity": "清晰易懂",
+    "conciseness": "简洁明了",
+    "completeness": "完整全面",
+    "professional": "专业准确",
+    "engaging": "生动有趣"
+}
+
+# 结构类型 -> 指令
+_STRUCTURE_INSTRUCTIONS = {
+    "bullet": "使用无序列表（-）的形式重新组织答案",
+    "numbered": "使用有序列表（1. 2. 3.）的形式重新组织答案",
+    "table": "使用 Markdown 表格的形式重新组织答案"
+}
+
+
+# 句子切分：保留句末标点，换行也视为句子边界（列表项）
+_SENTENCE_SPLIT = re.compile(r"(?<=[。！？!?；;\n])")
+
+
+class _ResponseLRU:
+    """
+    进程内的后处理响应缓存：(模型, 温度, prompt) -> LLM 输出
+
+    流水线中同一个答案反复经过相同的后处理（评测循环、重复运行）时直接复用，
+    命中只需一次字典查找，比磁盘上的 ResponseCache 更轻量。
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, float, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, float, str]) -> Optional[str]:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+            return content
+
+    def put(self, key: Tuple[str, float, str], content: str):
+        with self._lock:
+            self._entries[key] = content
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_responses = _ResponseLRU()
+
+
+def _textrank_summary(text: str, k: int = 2, iterations: int = 30, damping: float = 0.85) -> str:
+    """
+    抽取式摘要：首句 + TextRank 得分最高的句子，共 k 句（保持原文顺序）
+
+    句子相似度使用字符 bigram 重叠（对中英文都适用），
+    按 TextRank 原文的方式用两句 bigram 数的对数和归一化。
+
+    Args:
+        text: 原文
+        k: 摘要句子数
+        iterations: 迭代次数
+        damping: 阻尼系数
+
+    Returns:
+        摘要文本
+    """
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+    if len(sentences) <= k:
+        return "".join(sentences)
+
+    grams = [{s[i:i + 2] for i in range(len(s) - 1)} or {s} for s in sentences]
+    n = len(sentences)
+    weights = [
+        [
+            len(grams[i] & grams[j]) / (math.log(len(grams[i]) + 1) + math.log(len(grams[j]) + 1))
+            if i != j else 0.0
+            for j in range(n)
+        ]
+        for i in range(n)
+    ]
+    out_weights = [sum(row) for row in weights]
+
+    scores = [1.0] * n
+    for _ in range(iterations):
+        scores = [
+            (1 - damping) + damping * sum(
+                weights[j][i] / out_weights[j] * scores[j] for j in range(n) if out_weights[j]
+            )
+            for i in range(n)
+        ]
+
+    top = sorted(range(1, n), key=scores.__getitem__, reverse=True)[:k - 1]
+    return "".join(sentences[i] for i in sorted([0, *top]))
+
+
+def _goals_description(goals: List[str]) -> str:
+    """构建精炼目标描述"""
+    return "、".join(_GOAL_MAP.get(g, g) for g in goals)
+
+
+def _structure_instruction(structure_type: str) -> str:
+    """获取结构化指令（未知类型按 bullet 处理）"""
+    return _STRUCTURE_INSTRUCTIONS.get(structure_type, _STRUCTURE_INSTRUCTIONS["bullet"])
+
+
+def _numbered_sources(context: List[Document]) -> str:
+    """构建 "[i] 来源\n" 形式的参考文献列表"""
+    return "".join(
+        f"[{i}] {doc.metadata.get('source', f'文档{i}')}\n" for i, doc in enumerate(context, 1)
+    )
+
+
+def _format_sources(context: List[Document]) -> str:
+    """构建引用标注使用的来源列表"""
+    return "\n".join(
+        f"[{i}] {doc.metadata.get('source', f'文档{i}')}: {doc.page_content[:200]}"
+        for i, doc in enumerate(context, 1)
+    )
 
 
 class OutputFormatterOperator(BaseGenerationOperator):
@@ -23,10 +153,13 @@ class OutputFormatterOperator(BaseGenerationOperator):
     支持: markdown, json, plain, structured
     """
 
+    __slots__ = ("add_metadata", "compact", "format_type")
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.format_type = self.config.get("format", "markdown")
         self.add_metadata = self.config.get("add_metadata", False)
+        self.compact = self.config.get("compact", False)  # JSON 格式：紧凑输出（供程序消费）或缩进输出（便于阅读）
 
     def execute(
         self,
@@ -63,16 +196,15 @@ class OutputFormatterOperator(BaseGenerationOperator):
         context: List[Document] = None
     ) -> str:
         """格式化为 Markdown"""
-        output = f"# 问题\n\n{query}\n\n"
-        output += f"## 答案\n\n{answer}\n\n"
+        parts = [f"# 问题\n\n{query}\n\n", f"## 答案\n\n{answer}\n\n"]
 
         if self.add_metadata and context:
-            output += f"## 来源\n\n"
+            parts.append("## 来源\n\n")
             for i, doc in enumerate(context[:3], 1):
                 source = doc.metadata.get("source", "未知")
-                output += f"{i}. {source}\n"
+                parts.append(f"{i}. {source}\n")
 
-        return output
+        return "".join(parts)
 
     def _format_json(
         self,
@@ -81,8 +213,6 @@ class OutputFormatterOperator(BaseGenerationOperator):
         context: List[Document] = None
     ) -> str:
         """格式化为 JSON"""
-        import json
-
         result = {
             "query": query,
             "answer": answer
@@ -98,7 +228,7 @@ class OutputFormatterOperator(BaseGenerationOperator):
                 for i, doc in enumerate(context[:3])
             ]
 
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return _json.dumps(result, indent=not self.compact)
 
     def _format_structured(
         self,
@@ -107,46 +237,82 @@ class OutputFormatterOperator(BaseGenerationOperator):
         context: List[Document] = None
     ) -> str:
         """格式化为结构化文本"""
-        output = "=" * 60 + "\n"
-        output += "问题：\n" + query + "\n"
-        output += "-" * 60 + "\n"
-        output += "答案：\n" + answer + "\n"
+        parts = [
+            "=" * 60, "\n",
+            "问题：\n", query, "\n",
+            "-" * 60, "\n",
+            "答案：\n", answer, "\n",
+        ]
 
         if self.add_metadata and context:
-            output += "-" * 60 + "\n"
-            output += "参考来源：\n"
+            parts.append("-" * 60 + "\n")
+            parts.append("参考来源：\n")
             for i, doc in enumerate(context[:3], 1):
                 source = doc.metadata.get("source", "未知")
-                output += f"  [{i}] {source}\n"
+                parts.append(f"  [{i}] {source}\n")
 
-        output += "=" * 60 + "\n"
-        return output
+        parts.append("=" * 60 + "\n")
+        return "".join(parts)
 
 
-class CitationOperator(BaseGenerationOperator):
+class LLMPostprocessOperator(BaseGenerationOperator):
     """
-    引用标注操作器
+    基于 LLM 的后处理操作器基类
 
-    在答案中添加引用标注，标明信息来源
+    子类只需实现 _build_prompt / _wrap（或 _finish）/ _fallback，
+    同步 execute、异步 aexecute 与流式 stream 共用同一套 prompt 构建和结果处理逻辑。
+    aexecute 使 orchestrator 可以用 asyncio.gather 并发执行相互独立的后处理步骤
+    （如引用标注 + 摘要生成）；stream 让下游（UI、后续处理）在首个增量到达时就开始消费。
     """
 
-    def __init__(self, config: Dict[str, Any] = None):
-        super().__init__(config)
-        self.citation_style = self.config.get("style", "inline")  # inline, footnote, numbered
-        self.llm = self._init_llm()
+    __slots__ = ("_chat_key", "llm")
 
-    def _init_llm(self):
-        """初始化 LLM（用于智能引用标注）"""
+    # 调用失败时的提示前缀
+    _failure_message = "后处理失败"
+
+    # LLM 输出能否逐段转发（需要解析完整输出的子类设为 False）
+    _streamable = True
+
+    def _init_llm(self, temperature: float):
+        """
+        获取共享的 LLM 客户端（初始化失败时返回 None，退回无 LLM 的处理方式）
+
+        同时记录响应缓存键的前缀 (模型, 温度)；config["cache"] = False 时不缓存。
+        """
+        model = self.config.get("model", "qwen-plus")
+        self._chat_key = (model, temperature) if self.config.get("cache", True) else None
         try:
-            from langchain_community.chat_models import ChatTongyi
-            return ChatTongyi(
-                model_name=self.config.get("model", "qwen-plus"),
-                temperature=0.0
-            )
+            return get_chat(model, temperature)
         except Exception as e:
             print(f"⚠️  初始化 LLM 失败: {e}")
             return None
 
+    def _response_key(self, prompt: str) -> Optional[Tuple[str, float, str]]:
+        return (*self._chat_key, prompt) if self._chat_key is not None else None
+
+    def _build_prompt(self, query: str, context: Optional[List[Document]], answer: str) -> Optional[str]:
+        """构建 prompt；返回 None 表示无需调用 LLM（直接走 _fallback）"""
+        raise NotImplementedError
+
+    def _wrap(self, answer: str, context: Optional[List[Document]]) -> Tuple[str, str]:
+        """LLM 输出前后附加的内容 (head, tail)"""
+        return "", ""
+
+    def _finish(self, content: str, answer: str, context: Optional[List[Document]]) -> str:
+        """处理 LLM 返回内容，得到最终答案"""
+        head, tail = self._wrap(answer, context)
+        return head + content + tail
+
+    def _fallback(self, answer: str, context: Optional[List[Document]]) -> str:
+        """无 LLM、无需处理或调用失败时的结果"""
+        return answer
+
+    def _prepare(self, query: str, context: Optional[List[Document]], kwargs: Dict[str, Any]):
+        """取出待处理的答案并构建 prompt"""
+        answer = kwargs.get("answer", "")
+        prompt = self._build_prompt(query, context, answer) if self.llm else None
+        return answer, prompt
+
     def execute(
         self,
         query: str,
@@ -154,7 +320,7 @@ class CitationOperator(BaseGenerationOperator):
         **kwargs
     ) -> str:
         """
-        执行引用标注
+        执行后处理
 
         Args:
             query: 用户查询
@@ -162,29 +328,195 @@ class CitationOperator(BaseGenerationOperator):
             **kwargs: 必须包含 answer 参数
 
         Returns:
-            添加引用后的答案
+            处理后的答案
         """
-        answer = kwargs.get("answer", "")
+        answer, prompt = self._prepare(query, context, kwargs)
+        if prompt is None:
+            return self._fallback(answer, context)
+
+        key = self._response_key(prompt)
+        content = _responses.get(key) if key else None
+        if content is None:
+            try:
+                content = self.llm.invoke([HumanMessage(content=prompt)]).content
+            except Exception as e:
+                print(f"⚠️  {self._failure_message}: {e}")
+                return self._fallback(answer, context)
+            if key:
+                _responses.put(key, content)
+        return self._finish(content, answer, context)
+
+    async def aexecute(
+        self,
+        query: str,
+        context: List[Document] = None,
+        **kwargs
+    ) -> str:
+        """
+        异步执行后处理（execute 的异步版本）
 
-        if not context:
-            return answer
+        Args:
+            query: 用户查询
+            context: 上下文文档
+            **kwargs: 必须包含 answer 参数
 
-        if self.llm:
-            return self._add_smart_citations(answer, context)
-        else:
-            return self._add_simple_citations(answer, context)
+        Returns:
+            处理后的答案
+        """
+        answer, prompt = self._prepare(query, context, kwargs)
+        if prompt is None:
+            return self._fallback(answer, context)
+
+        key = self._response_key(prompt)
+        content = _responses.get(key) if key else None
+        if content is None:
+            try:
+                content = (await self.llm.ainvoke([HumanMessage(content=prompt)])).content
+            except Exception as e:
+                print(f"⚠️  {self._failure_message}: {e}")
+                return self._fallback(answer, context)
+            if key:
+                _responses.put(key, content)
+        return self._finish(content, answer, context)
+
+    def stream(
+        self,
+        query: str,
+        context: List[Document] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        流式执行后处理：LLM 增量到达即转发给调用方
 
-    def _add_smart_citations(self, answer: str, context: List[Document]) -> str:
-        """使用 LLM 智能添加引用"""
-        # 构建引用信息
-        sources = []
-        for i, doc in enumerate(context, 1):
-            source = doc.metadata.get("source", f"文档{i}")
-            sources.append(f"[{i}] {source}: {doc.page_content[:200]}")
+        增量按 stream_batch_items / stream_batch_latency_ms / stream_batch_growth
+        合并后输出（与 StreamGeneratorOperator 相同）。首个增量到达前失败时退回 _fallback；
+        已输出部分内容后失败只能停止输出。
+
+        Args:
+            query: 用户查询
+            context: 上下文文档
+            **kwargs: 必须包含 answer 参数
+
+        Yields:
+            处理后答案的文本片段（拼接后与 execute 的结果相同）
+        """
+        answer, prompt = self._prepare(query, context, kwargs)
+        if prompt is None:
+            yield self._fallback(answer, context)
+            return
+
+        if not self._streamable:
+            yield self.execute(query, context, **kwargs)
+            return
+
+        head, tail = self._wrap(answer, context)
+        key = self._response_key(prompt)
+        cached = _responses.get(key) if key else None
+        if cached is not None:
+            yield head + cached + tail
+            return
+
+        deltas = (chunk.content for chunk in self.llm.stream([HumanMessage(content=prompt)]))
+        full = io.StringIO()
+        started = False
+        try:
+            for content in batch_stream(
+                deltas,
+                self.config.get("stream_batch_items", 50),
+                self.config.get("stream_batch_latency_ms", 200),
+                self.config.get("stream_batch_growth", 3),
+            ):
+                if not started:
+                    started = True
+                    if head:
+                        yield head
+                full.write(content)
+                yield content
+        except Exception as e:
+            print(f"⚠️  {self._failure_message}: {e}")
+            if not started:
+                yield self._fallback(answer, context)
+            return
+
+        if key:
+            _responses.put(key, full.getvalue())
+        if not started and head:
+            yield head
+        if tail:
+            yield tail
+
+
+class CitationOperator(LLMPostprocessOperator):
+    """
+    引用标注操作器
+
+    在答案中添加引用标注，标明信息来源
+    """
 
-        sources_text = "\n".join(sources)
+    __slots__ = ("batch_size", "citation_style")
 
-        prompt = f"""请在答案中添加引用标注。对于答案中的每个事实陈述，如果能在来源中找到支持，请在句尾添加 [数字] 标注。
+    _failure_message = "智能引用失败"
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self.citation_style = self.config.get("style", "inline")  # inline, footnote, numbered
+        # execute_batch：每次请求合并标注的答案数量
+        self.batch_size = self.config.get("batch_size", 8)
+        self.llm = self._init_llm(0.0)
+
+    def execute_batch(self, answers: List[str], context: List[Document] = None) -> List[str]:
+        """
+        为共用同一组上下文的多个答案添加引用标注
+
+        来源列表（通常是 prompt 中最长的部分）每批只发送一次，
+        各答案按编号列出，要求按编号返回 JSON；某个编号解析失败时单独回退到 execute。
+
+        Args:
+            answers: 答案列表
+            context: 上下文文档（所有答案共用）
+
+        Returns:
+            与 answers 顺序一致的、添加引用后的答案列表
+        """
+        if not context or not self.llm:
+            return [self._fallback(answer, context) for answer in answers]
+
+        prefix = f"""请在下面按编号列出的每个答案中添加引用标注。对于答案中的每个事实陈述，如果能在来源中找到支持，请在句尾添加 [数字] 标注。保持答案内容不变，只添加引用标记。
+
+可用来源：
+{_format_sources(context)}
+
+只输出一个 JSON 对象，键为答案编号（字符串），值为添加了引用标注的答案，例如：
+{{"1": "第 1 个答案", "2": "第 2 个答案"}}
+
+"""
+        results = []
+        for start in range(0, len(answers), self.batch_size):
+            batch = answers[start:start + self.batch_size]
+            prompt = prefix + "\n\n".join(f"答案 {i}：\n{answer}" for i, answer in enumerate(batch, 1))
+            try:
+                content = self.llm.invoke([HumanMessage(content=prompt)]).content
+            except Exception as e:
+                print(f"⚠️  {self._failure_message}: {e}")
+                content = ""
+
+            parsed = _parse_numbered_answers(content, len(batch))
+            for i, answer in enumerate(batch, 1):
+                if i in parsed:
+                    results.append(self._finish(parsed[i], answer, context))
+                else:
+                    results.append(self.execute("", context, answer=answer))
+        return results
+
+    def _build_prompt(self, query: str, context: Optional[List[Document]], answer: str) -> Optional[str]:
+        """使用 LLM 智能添加引用的 prompt（无上下文时不标注）"""
+        if not context:
+            return None
+
+        # 构建引用信息
+        sources_text = _format_sources(context)
+
+        return f"""请在答案中添加引用标注。对于答案中的每个事实陈述，如果能在来源中找到支持，请在句尾添加 [数字] 标注。
 
 答案：
 {answer}
@@ -194,91 +526,52 @@ class CitationOperator(BaseGenerationOperator):
 
 请返回添加了引用标注的答案。保持答案内容不变，只添加引用标记。"""
 
-        try:
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            cited_answer = response.content
-
-            # 添加引用列表
-            if self.citation_style == "footnote":
-                cited_answer += "\n\n---\n参考文献：\n"
-                for i, doc in enumerate(context, 1):
-                    source = doc.metadata.get("source", f"文档{i}")
-                    cited_answer += f"[{i}] {source}\n"
+    def _wrap(self, answer: str, context: Optional[List[Document]]) -> Tuple[str, str]:
+        """添加引用列表"""
+        if self.citation_style == "footnote":
+            return "", "\n\n---\n参考文献：\n" + _numbered_sources(context)
+        return "", ""
 
-            return cited_answer
-        except Exception as e:
-            print(f"⚠️  智能引用失败: {e}")
-            return self._add_simple_citations(answer, context)
+    def _fallback(self, answer: str, context: Optional[List[Document]]) -> str:
+        """无 LLM 或智能引用失败时退回简单引用"""
+        if not context:
+            return answer
+        return self._add_simple_citations(answer, context)
 
     def _add_simple_citations(self, answer: str, context: List[Document]) -> str:
         """简单引用：在答案末尾添加来源列表"""
-        cited_answer = answer + "\n\n"
-
         if self.citation_style == "numbered":
-            cited_answer += "参考来源：\n"
-            for i, doc in enumerate(context, 1):
-                source = doc.metadata.get("source", f"文档{i}")
-                cited_answer += f"[{i}] {source}\n"
-        elif self.citation_style == "inline":
-            sources = [doc.metadata.get("source", f"文档{i}") for i, doc in enumerate(context, 1)]
-            cited_answer += f"（来源：{', '.join(sources)}）"
+            return f"{answer}\n\n参考来源：\n{_numbered_sources(context)}"
+        if self.citation_style == "inline":
+            sources = ", ".join(doc.metadata.get("source", f"文档{i}") for i, doc in enumerate(context, 1))
+            return f"{answer}\n\n（来源：{sources}）"
+        return answer + "\n\n"
 
-        return cited_answer
 
-
-class AnswerRefinementOperator(BaseGenerationOperator):
+class AnswerRefinementOperator(LLMPostprocessOperator):
     """
     答案精炼操作器
 
     使用 LLM 对生成的答案进行精炼和改进
     """
 
+    __slots__ = ("_goals_desc", "refinement_goals")
+
+    _failure_message = "答案精炼失败"
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.refinement_goals = self.config.get(
             "goals",
             ["clarity", "conciseness", "completeness"]
         )
-        self.llm = self._init_llm()
-
-    def _init_llm(self):
-        """初始化 LLM"""
-        try:
-            from langchain_community.chat_models import ChatTongyi
-            return ChatTongyi(
-                model_name=self.config.get("model", "qwen-plus"),
-                temperature=0.3
-            )
-        except Exception as e:
-            print(f"⚠️  初始化 LLM 失败: {e}")
-            return None
-
-    def execute(
-        self,
-        query: str,
-        context: List[Document] = None,
-        **kwargs
-    ) -> str:
-        """
-        执行答案精炼
+        # 精炼目标在初始化后不再变化，描述只构建一次
+        self._goals_desc = _goals_description(self.refinement_goals)
+        self.llm = self._init_llm(0.3)
 
-        Args:
-            query: 用户查询
-            context: 上下文文档
-            **kwargs: 必须包含 answer 参数
-
-        Returns:
-            精炼后的答案
-        """
-        answer = kwargs.get("answer", "")
-
-        if not self.llm:
-            return answer
-
-        # 构建精炼目标描述
-        goals_desc = self._build_goals_description()
-
-        prompt = f"""请精炼以下答案，使其更加{goals_desc}。
+    def _build_prompt(self, query: str, context: Optional[List[Document]], answer: str) -> Optional[str]:
+        """构建精炼 prompt"""
+        return f"""请精炼以下答案，使其更加{self._goals_desc}。
 
 原始问题：{query}
 
@@ -292,73 +585,32 @@ class AnswerRefinementOperator(BaseGenerationOperator):
 
 请直接返回精炼后的答案，不要添加额外说明。"""
 
-        try:
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            return response.content
-        except Exception as e:
-            print(f"⚠️  答案精炼失败: {e}")
-            return answer
-
-    def _build_goals_description(self) -> str:
-        """构建精炼目标描述"""
-        goal_map = {
-            "clarity": "清晰易懂",
-            "conciseness": "简洁明了",
-            "completeness": "完整全面",
-            "professional": "专业准确",
-            "engaging": "生动有趣"
-        }
-
-        descriptions = [goal_map.get(g, g) for g in self.refinement_goals]
-        return "、".join(descriptions)
-
 
-class SummaryGeneratorOperator(BaseGenerationOperator):
+class SummaryGeneratorOperator(LLMPostprocessOperator):
     """
     摘要生成操作器
 
-    为长答案生成简洁摘要
+    为长答案生成简洁摘要：
+    - 短于 200 字符：不生成摘要
+    - 200 ~ extractive_threshold 字符：抽取式摘要（首句 + TextRank），不调用 LLM
+    - 更长的答案：LLM 生成摘要
     """
 
+    __slots__ = ("extractive_threshold", "summary_length")
+
+    _failure_message = "摘要生成失败"
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.summary_length = self.config.get("length", "short")  # short, medium, long
-        self.llm = self._init_llm()
+        self.extractive_threshold = self.config.get("extractive_threshold", 600)
+        self.llm = self._init_llm(0.3)
 
-    def _init_llm(self):
-        """初始化 LLM"""
-        try:
-            from langchain_community.chat_models import ChatTongyi
-            return ChatTongyi(
-                model_name=self.config.get("model", "qwen-plus"),
-                temperature=0.3
-            )
-        except Exception as e:
-            print(f"⚠️  初始化 LLM 失败: {e}")
+    def _build_prompt(self, query: str, context: Optional[List[Document]], answer: str) -> Optional[str]:
+        """构建摘要 prompt（中短答案走抽取式摘要，不调用 LLM）"""
+        if len(answer) < self.extractive_threshold:
             return None
 
-    def execute(
-        self,
-        query: str,
-        context: List[Document] = None,
-        **kwargs
-    ) -> str:
-        """
-        执行摘要生成
-
-        Args:
-            query: 用户查询
-            context: 上下文文档
-            **kwargs: 必须包含 answer 参数
-
-        Returns:
-            摘要 + 原答案
-        """
-        answer = kwargs.get("answer", "")
-
-        if not self.llm or len(answer) < 200:
-            return answer
-
         # 根据长度要求设置字数限制
         word_limit = {
             "short": 50,
@@ -366,7 +618,7 @@ class SummaryGeneratorOperator(BaseGenerationOperator):
             "long": 200
         }.get(self.summary_length, 100)
 
-        prompt = f"""请为以下答案生成一个简洁的摘要（不超过{word_limit}字）。
+        return f"""请为以下答案生成一个简洁的摘要（不超过{word_limit}字）。
 
 问题：{query}
 
@@ -375,76 +627,37 @@ class SummaryGeneratorOperator(BaseGenerationOperator):
 
 请只返回摘要内容，不要添加"摘要："等前缀。"""
 
-        try:
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            summary = response.content
+    def _wrap(self, answer: str, context: Optional[List[Document]]) -> Tuple[str, str]:
+        """组合摘要和原答案"""
+        return "**摘要：**\n", f"\n\n---\n\n**详细答案：**\n{answer}"
 
-            # 组合摘要和原答案
-            result = f"**摘要：**\n{summary}\n\n---\n\n**详细答案：**\n{answer}"
-            return result
-        except Exception as e:
-            print(f"⚠️  摘要生成失败: {e}")
+    def _fallback(self, answer: str, context: Optional[List[Document]]) -> str:
+        """抽取式摘要（无 LLM 或 LLM 调用失败时同样使用）"""
+        if len(answer) < 200:
             return answer
+        return self._finish(_textrank_summary(answer), answer, context)
 
 
-class StructuredOutputOperator(BaseGenerationOperator):
+class StructuredOutputOperator(LLMPostprocessOperator):
     """
     结构化输出操作器
 
     将答案转换为结构化格式（如：要点列表、表格等）
     """
 
+    __slots__ = ("_instruction", "structure_type")
+
+    _failure_message = "结构化输出失败"
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.structure_type = self.config.get("type", "bullet")  # bullet, numbered, table
-        self.llm = self._init_llm()
-
-    def _init_llm(self):
-        """初始化 LLM"""
-        try:
-            from langchain_community.chat_models import ChatTongyi
-            return ChatTongyi(
-                model_name=self.config.get("model", "qwen-plus"),
-                temperature=0.0
-            )
-        except Exception as e:
-            print(f"⚠️  初始化 LLM 失败: {e}")
-            return None
-
-    def execute(
-        self,
-        query: str,
-        context: List[Document] = None,
-        **kwargs
-    ) -> str:
-        """
-        执行结构化输出
+        self._instruction = _structure_instruction(self.structure_type)
+        self.llm = self._init_llm(0.0)
 
-        Args:
-            query: 用户查询
-            context: 上下文文档
-            **kwargs: 必须包含 answer 参数
-
-        Returns:
-            结构化后的答案
-        """
-        answer = kwargs.get("answer", "")
-
-        if not self.llm:
-            return answer
-
-        structure_instructions = {
-            "bullet": "使用无序列表（-）的形式重新组织答案",
-            "numbered": "使用有序列表（1. 2. 3.）的形式重新组织答案",
-            "table": "使用 Markdown 表格的形式重新组织答案"
-        }
-
-        instruction = structure_instructions.get(
-            self.structure_type,
-            structure_instructions["bullet"]
-        )
-
-        prompt = f"""请{instruction}。
+    def _build_prompt(self, query: str, context: Optional[List[Document]], answer: str) -> Optional[str]:
+        """构建结构化 prompt"""
+        return f"""请{self._instruction}。
 
 原始答案：
 {answer}
@@ -456,9 +669,91 @@ class StructuredOutputOperator(BaseGenerationOperator):
 
 请直接返回重新组织后的答案。"""
 
+
+class FusedPostprocessOperator(LLMPostprocessOperator):
+    """
+    融合后处理操作器
+
+    精炼、引用标注、结构化三个后处理步骤作用于同一个答案，
+    分别调用需要三次往返。这里把选中的步骤合并为一个 prompt，
+    要求 LLM 按顺序依次完成并以 JSON 返回各步骤结果，只需一次 LLM 调用。
+
+    配置：
+    - steps: 要执行的步骤，按顺序（默认 ["refine", "cite", "structure"]）
+    - goals / style / type: 与 AnswerRefinementOperator / CitationOperator /
+      StructuredOutputOperator 的同名配置含义相同
+    """
+
+    __slots__ = ("_step_goals", "citation_style", "refinement_goals", "steps", "structure_type")
+
+    _failure_message = "融合后处理失败"
+
+    # 需要解析完整的 JSON 输出，不能逐段转发
+    _streamable = False
+
+    # 步骤 -> 返回 JSON 中的字段
+    _FIELDS = {"refine": "refined", "cite": "cited", "structure": "structured"}
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self.steps = [
+            step for step in self.config.get("steps", ["refine", "cite", "structure"])
+            if step in self._FIELDS
+        ]
+        self.refinement_goals = self.config.get(
+            "goals",
+            ["clarity", "conciseness", "completeness"]
+        )
+        self.citation_style = self.config.get("style", "inline")
+        self.structure_type = self.config.get("type", "bullet")
+        # 各步骤的任务描述只构建一次
+        self._step_goals = {
+            "refine": f"精炼答案，使其更加{_goals_description(self.refinement_goals)}，保持核心信息和准确性",
+            "cite": "对于每个事实陈述，如果能在来源中找到支持，在句尾添加 [数字] 标注，不改动内容",
+            "structure": f"{_structure_instruction(self.structure_type)}，保持所有关键信息",
+        }
+        self.llm = self._init_llm(0.0)
+
+    def _build_prompt(self, query: str, context: Optional[List[Document]], answer: str) -> Optional[str]:
+        """构建融合 prompt（没有可执行的步骤时不调用 LLM）"""
+        steps = [step for step in self.steps if step != "cite" or context]
+        if not steps:
+            return None
+
+        goals = "\n".join(
+            f"{i}. {self._FIELDS[step]}：{self._step_goals[step]}" for i, step in enumerate(steps, 1)
+        )
+
+        parts = [
+            "请按顺序对答案依次完成以下处理，每一步都在上一步的结果上进行：",
+            goals,
+            f"原始问题：{query}",
+            f"原始答案：\n{answer}",
+        ]
+        if "cite" in steps:
+            parts.append(f"可用来源：\n{_format_sources(context)}")
+
+        fields = ", ".join(f'"{self._FIELDS[step]}": "..."' for step in steps)
+        parts.append(f"请只返回一个 JSON 对象，包含各步骤的结果：{{{fields}}}")
+        return "\n\n".join(parts)
+
+    def _finish(self, content: str, answer: str, context: Optional[List[Document]]) -> str:
+        """解析 JSON，取最后一个步骤的结果"""
+        match = re.search(r"\{.*\}", content, re.DOTALL)
         try:
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            return response.content
-        except Exception as e:
-            print(f"⚠️  结构化输出失败: {e}")
+            result = _json.loads(match.group()) if match else {}
+        except _json.JSONDecodeError:
+            result = {}
+
+        final = None
+        for step in reversed(self.steps):
+            final = result.get(self._FIELDS[step])
+            if isinstance(final, str) and final:
+                break
+        else:
+            print("⚠️  融合后处理结果解析失败，返回原答案")
             return answer
+
+        if "cite" in self.steps and context and self.citation_style == "footnote":
+            final += "\n\n---\n参考文献：\n" + _numbered_sources(context)
+        return final
@@ -4,13 +4,100 @@ Prompt Engineering Operators（提示工程）
 提供多种提示模板和策略
 """
 
-from typing import List, Dict, Any
+import functools
+from bisect import bisect_right
+from itertools import accumulate
+from typing import List, Dict, Any, Optional, Tuple
 from langchain_core.documents import Document
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
-from .base import BaseGenerationOperator
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from .base import BaseGenerationOperator, CacheableOperator
 
+try:
+    import tiktoken
+except ImportError:  # tiktoken 为可选依赖，缺失时按字符数截断上下文
+    tiktoken = None
 
-class PromptTemplateOperator(BaseGenerationOperator):
+# 模型上下文窗口（token 数），未列出的模型按 32k 估计
+MODEL_CONTEXT_WINDOWS = {
+    "qwen-turbo": 131072,
+    "qwen-plus": 131072,
+    "qwen-max": 32768,
+    "qwen-long": 1000000,
+}
+
+
+# 无上下文时的占位文本
+NO_CONTEXT = "暂无上下文信息。"
+
+
+def _format_inline(documents: List[Document]) -> str:
+    """格式化上下文：每个文档一段，编号与内容同行"""
+    return "\n\n".join(f"[文档 {i}] {doc.page_content}" for i, doc in enumerate(documents, 1))
+
+
+def _load_encoding(model: str):
+    """
+    加载模型对应的 tiktoken 编码（未知模型使用 cl100k_base 近似）
+
+    Returns:
+        编码器；tiktoken 不可用或编码文件无法加载时返回 None
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def default_context_budget(model: str) -> int:
+    """默认上下文 token 预算：模型上下文窗口的 75%（为系统消息、查询和答案留出余量）"""
+    return int(MODEL_CONTEXT_WINDOWS.get(model, 32768) * 0.75)
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    """按模型缓存的 tiktoken 编码（加载编码文件只发生一次）"""
+    return _load_encoding(model)
+
+
+@functools.lru_cache(maxsize=256)
+def pack_contents(contents: Tuple[str, ...], token_budget: int, model: str) -> Tuple[str, ...]:
+    """
+    按 token 预算贪心装填文档内容，装不下的文档截断到剩余预算（不足 50 token 时丢弃）
+
+    tiktoken 不可用时按字符数估算 token 数（对中文偏保守）。
+
+    Args:
+        contents: 按装填顺序排列的文档内容
+        token_budget: token 预算
+        model: 计算 token 数使用的模型
+
+    Returns:
+        装填后的文档内容（最后一个可能被截断并以 "..." 结尾）
+    """
+    enc = _encoding(model)
+    packed = []
+    remaining = token_budget
+
+    for content in contents:
+        tokens = enc.encode(content, disallowed_special=()) if enc is not None else content
+        if len(tokens) > remaining:
+            if remaining > 50:
+                head = enc.decode(tokens[:remaining]) if enc is not None else content[:remaining]
+                packed.append(head + "...")
+            break
+        packed.append(content)
+        remaining -= len(tokens)
+
+    return tuple(packed)
+
+
+class PromptTemplateOperator(CacheableOperator, BaseGenerationOperator):
     """
     基础 Prompt Template 操作器
 
@@ -24,10 +111,15 @@ class PromptTemplateOperator(BaseGenerationOperator):
     - 需要一致的提示格式
     """
 
+    __slots__ = ("_prompt_cache", "_render", "include_sources", "template")
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.template = self.config.get("template", self._default_template())
         self.include_sources = self.config.get("include_sources", False)
+        # 模板为 f-string 格式：绑定 str.format 一次，每次调用只替换 {query} / {context}，
+        # 不再经过 PromptTemplate 的输入校验和变量合并
+        self._render = self.template.format
 
     def _default_template(self) -> str:
         """默认提示模板"""
@@ -44,7 +136,7 @@ class PromptTemplateOperator(BaseGenerationOperator):
 
     def execute(self, query: str, context: List[Document] = None, **kwargs) -> str:
         """
-        构建提示
+        构建提示（相同的查询和上下文命中 LRU 缓存）
 
         Args:
             query: 用户查询
@@ -54,12 +146,15 @@ class PromptTemplateOperator(BaseGenerationOperator):
         Returns:
             格式化的提示文本
         """
+        return self._cached(self._cache_key(query, context), lambda: self._build_prompt(query, context))
+
+    def _build_prompt(self, query: str, context: List[Document] = None) -> str:
+        """构建提示"""
         # 格式化上下文
         context_text = self._format_context(context) if context else "暂无相关上下文信息。"
 
         # 构建提示
-        prompt_template = PromptTemplate.from_template(self.template)
-        prompt = prompt_template.format(
+        prompt = self._render(
             query=query,
             context=context_text
         )
@@ -76,21 +171,15 @@ class PromptTemplateOperator(BaseGenerationOperator):
         Returns:
             格式化的上下文文本
         """
-        formatted_parts = []
-
-        for i, doc in enumerate(documents, 1):
-            content = doc.page_content
+        if self.include_sources:
+            return "\n\n".join(
+                f"[文档 {i}] (来源: {doc.metadata.get('source', '未知来源')})\n{doc.page_content}"
+                for i, doc in enumerate(documents, 1)
+            )
+        return "\n\n".join(f"[文档 {i}]\n{doc.page_content}" for i, doc in enumerate(documents, 1))
 
-            if self.include_sources:
-                source = doc.metadata.get("source", "未知来源")
-                formatted_parts.append(f"[文档 {i}] (来源: {source})\n{content}")
-            else:
-                formatted_parts.append(f"[文档 {i}]\n{content}")
 
-        return "\n\n".join(formatted_parts)
-
-
-class ContextualPromptOperator(BaseGenerationOperator):
+class ContextualPromptOperator(CacheableOperator, BaseGenerationOperator):
     """
     Contextual Prompt 操作器（上下文感知提示）
 
@@ -99,19 +188,51 @@ class ContextualPromptOperator(BaseGenerationOperator):
     - 动态生成适合的提示策略
     - 优化上下文利用
 
+    输出为消息列表：系统消息是所有请求共用的同一个固定字符串，
+    检索到的上下文、上下文可靠性评估和查询按此顺序放在用户消息中。
+    这样请求的前缀在不同查询、不同上下文质量间都保持不变，可以命中服务端的前缀缓存（prompt cache）。
+
     应用场景：
     - 上下文数量不确定
     - 需要自适应提示
     """
 
+    __slots__ = (
+        "_format_doc",
+        "_prompt_cache",
+        "_token_model",
+        "max_context_length",
+        "max_context_tokens",
+        "prioritize_recent",
+    )
+
+    # 固定的系统指令（不包含任何随查询或上下文质量变化的内容）
+    SYSTEM_MESSAGE = "你是一个专业的AI助手。请根据用户消息中的上下文信息及其可靠性评估回答问题。"
+
+    # 上下文可靠性评估（按上下文质量选择，放在上下文之后）
+    QUALITY_HINTS = {
+        "none": "没有找到相关的上下文信息，请基于你的知识回答，并说明这是基于通用知识的回答。",
+        "high": "上下文充分可靠，请严格基于上下文信息回答问题，不要使用上下文之外的信息。",
+        "medium": "上下文基本可靠，请主要基于上下文信息回答，必要时可以补充相关背景知识。",
+        "low": "上下文可能不太相关，请谨慎使用，必要时可以主要依靠你的知识回答。",
+    }
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.max_context_length = self.config.get("max_context_length", 3000)
         self.prioritize_recent = self.config.get("prioritize_recent", True)
-
-    def execute(self, query: str, context: List[Document] = None, **kwargs) -> str:
+        # 按 token 预算装填上下文（默认为模型上下文窗口的 75%）
+        # 显式配置了 max_context_length 时始终按字符数截断，已有配置的限制保持生效
+        model = self.config.get("model", "qwen-plus")
+        self.max_context_tokens = self.config.get("max_context_tokens", default_context_budget(model))
+        token_packing = "max_context_length" not in self.config and _encoding(model) is not None
+        self._token_model = model if token_packing else None
+        # 单个文档的格式字符串只解析一次，格式化时直接调用绑定的 format_map
+        self._format_doc = self.config.get("doc_format", "[文档 {index}]\n{content}").format_map
+
+    def execute(self, query: str, context: List[Document] = None, **kwargs) -> List[BaseMessage]:
         """
-        构建上下文感知的提示
+        构建上下文感知的提示（相同的查询和上下文命中 LRU 缓存）
 
         Args:
             query: 用户查询
@@ -119,97 +240,120 @@ class ContextualPromptOperator(BaseGenerationOperator):
             **kwargs: 额外参数
 
         Returns:
-            格式化的提示文本
+            消息列表：[静态系统消息, 上下文 + 查询的用户消息]
         """
+        return self._cached(self._cache_key(query, context), lambda: self._build_prompt(query, context))
+
+    def _build_prompt(self, query: str, context: List[Document] = None) -> List[BaseMessage]:
+        """构建上下文感知的提示"""
         if not context or len(context) == 0:
             # 无上下文情况
-            template = """你是一个AI助手。用户提出了以下问题：
+            return [
+                SystemMessage(self.SYSTEM_MESSAGE),
+                HumanMessage(f"上下文可靠性评估：{self.QUALITY_HINTS['none']}\n\n用户问题：{query}\n\n答案："),
+            ]
 
-{query}
-
-注意：没有找到相关的上下文信息，请基于你的知识回答，并说明这是基于通用知识的回答。
-
-答案："""
-            return template.format(query=query)
-
-        # 有上下文的情况
-        context_quality = self._assess_context_quality(context)
-
-        if context_quality == "high":
-            # 高质量上下文：强调使用上下文
-            system_msg = "你是一个专业的AI助手。请严格基于提供的上下文信息回答问题，不要使用上下文之外的信息。"
-        elif context_quality == "medium":
-            # 中等质量：平衡上下文和知识
-            system_msg = "你是一个AI助手。请主要基于提供的上下文信息回答，必要时可以补充相关背景知识。"
-        else:
-            # 低质量：警告可能不相关
-            system_msg = "你是一个AI助手。提供的上下文可能不太相关，请谨慎使用，必要时可以主要依靠你的知识回答。"
+        # 有上下文的情况：质量评估放在上下文之后，系统消息保持不变
+        # 文档长度只统计一次，质量评估和按字符截断共用
+        context_quality, _, lengths = self._analyze_context(context)
+        quality_hint = self.QUALITY_HINTS[context_quality]
 
         # 格式化上下文（可能需要截断）
-        context_text = self._format_and_truncate_context(context)
-
-        template = f"""{system_msg}
+        context_text = self._format_and_truncate_context(context, lengths)
 
-上下文信息：
-{context_text}
+        return [
+            SystemMessage(self.SYSTEM_MESSAGE),
+            HumanMessage(
+                f"上下文信息：\n{context_text}\n\n上下文可靠性评估：{quality_hint}\n\n用户问题：{query}\n\n答案："
+            ),
+        ]
 
-用户问题：{{query}}
+    def _analyze_context(self, documents: List[Document]) -> Tuple[str, int, List[int]]:
+        """
+        一次遍历统计文档长度，并据此评估上下文质量
 
-答案："""
+        Args:
+            documents: 文档列表
 
-        return template.format(query=query)
+        Returns:
+            (质量等级, 总字符数, 各文档字符数)
+        """
+        lengths = [len(doc.page_content) for doc in documents]
+        total_length = sum(lengths)
+        return self._assess_context_quality(len(documents), total_length), total_length, lengths
 
-    def _assess_context_quality(self, documents: List[Document]) -> str:
+    def _assess_context_quality(self, num_documents: int, total_length: int) -> str:
         """
         评估上下文质量
 
         Args:
-            documents: 文档列表
+            num_documents: 文档数量
+            total_length: 文档总字符数
 
         Returns:
             质量等级：high, medium, low
         """
-        if len(documents) >= 3:
+        if num_documents >= 3:
             # 假设有足够多的文档
-            avg_length = sum(len(doc.page_content) for doc in documents) / len(documents)
+            avg_length = total_length / num_documents
             if avg_length > 200:
                 return "high"
             elif avg_length > 100:
                 return "medium"
             else:
                 return "low"
-        elif len(documents) >= 1:
+        elif num_documents >= 1:
             return "medium"
         else:
             return "low"
 
-    def _format_and_truncate_context(self, documents: List[Document]) -> str:
+    def _format_and_truncate_context(self, documents: List[Document], lengths: Optional[List[int]] = None) -> str:
         """
         格式化并截断上下文（如果太长）
 
+        未显式配置 max_context_length 且有 tiktoken 时，按 token 数贪心装填到 max_context_tokens，
+        装不下的文档截断到剩余预算；否则按字符数 max_context_length 截断。
+
         Args:
             documents: 文档列表
+            lengths: 预先统计的各文档字符数（None 时现算）
 
         Returns:
             格式化的上下文
         """
-        formatted_parts = []
-        current_length = 0
+        if self._token_model is None:
+            return self._truncate_by_chars(documents, lengths)
 
-        for i, doc in enumerate(documents, 1):
-            content = doc.page_content
+        contents = pack_contents(
+            tuple(doc.page_content for doc in documents), self.max_context_tokens, self._token_model
+        )
+        return "\n\n".join(
+            self._format_doc({"index": i, "content": content}) for i, content in enumerate(contents, 1)
+        )
 
-            # 检查是否会超出长度限制
-            if current_length + len(content) > self.max_context_length:
-                # 截断这个文档
-                remaining = self.max_context_length - current_length
-                if remaining > 100:  # 至少保留100字符
-                    content = content[:remaining] + "..."
-                    formatted_parts.append(f"[文档 {i}]\n{content}")
-                break
+    def _truncate_by_chars(self, documents: List[Document], lengths: Optional[List[int]] = None) -> str:
+        """
+        按字符数截断上下文
 
-            formatted_parts.append(f"[文档 {i}]\n{content}")
-            current_length += len(content)
+        先计算累计长度并二分出第一个超出 max_context_length 的文档，
+        只格式化会被保留的文档，最后一次拼接。
+        """
+        if lengths is None:
+            lengths = [len(doc.page_content) for doc in documents]
+        cumulative = list(accumulate(lengths))
+        cut = bisect_right(cumulative, self.max_context_length)
+
+        formatted_parts = [
+            self._format_doc({"index": i, "content": doc.page_content})
+            for i, doc in enumerate(documents[:cut], 1)
+        ]
+
+        if cut < len(documents):
+            # 截断第一个超出限制的文档
+            remaining = self.max_context_length - (cumulative[cut - 1] if cut else 0)
+            if remaining > 100:  # 至少保留100字符
+                content = documents[cut].page_content[:remaining] + "..."
+                formatted_parts.append(self._format_doc({"index": cut + 1, "content": content}))
 
         return "\n\n".join(formatted_parts)
 
@@ -229,10 +373,22 @@ class ChainOfThoughtPromptOperator(BaseGenerationOperator):
     - 需要展示推理过程
     """
 
+    __slots__ = ("_prefix", "steps")
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.steps = self.config.get("steps", ["理解问题", "分析上下文", "推理", "得出结论"])
 
+        # 预先渲染静态部分（角色说明 + 推理步骤），每次调用只拼接上下文和查询
+        steps_text = "\n".join([f"{i}. {step}" for i, step in enumerate(self.steps, 1)])
+        self._prefix = f"""你是一个擅长逐步推理的AI助手。请按照以下步骤仔细分析并回答问题：
+
+推理步骤：
+{steps_text}
+
+上下文信息：
+"""
+
     def execute(self, query: str, context: List[Document] = None, **kwargs) -> str:
         """
         构建 CoT 提示
@@ -246,37 +402,20 @@ class ChainOfThoughtPromptOperator(BaseGenerationOperator):
             CoT 提示文本
         """
         # 格式化上下文
-        context_text = self._format_context(context) if context else "暂无上下文信息。"
+        context_text = self._format_context(context) if context else NO_CONTEXT
 
         # 构建思维链提示
-        steps_text = "\n".join([f"{i}. {step}" for i, step in enumerate(self.steps, 1)])
-
-        template = f"""你是一个擅长逐步推理的AI助手。请按照以下步骤仔细分析并回答问题：
-
-推理步骤：
-{steps_text}
-
-上下文信息：
-{context_text}
+        return f"""{self._prefix}{context_text}
 
-用户问题：{{query}}
+用户问题：{query}
 
 请按照上述步骤逐步展开你的推理过程，最后给出明确的答案。
 
 推理过程："""
 
-        return template.format(query=query)
-
     def _format_context(self, documents: List[Document]) -> str:
         """格式化上下文"""
-        if not documents:
-            return "暂无上下文信息。"
-
-        formatted_parts = []
-        for i, doc in enumerate(documents, 1):
-            formatted_parts.append(f"[文档 {i}] {doc.page_content}")
-
-        return "\n\n".join(formatted_parts)
+        return _format_inline(documents) if documents else NO_CONTEXT
 
 
 class FewShotPromptOperator(BaseGenerationOperator):
@@ -294,11 +433,23 @@ class FewShotPromptOperator(BaseGenerationOperator):
     - 需要风格一致性
     """
 
+    __slots__ = ("_prefix", "examples", "max_examples")
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.examples = self.config.get("examples", self._default_examples())
         self.max_examples = self.config.get("max_examples", 2)
 
+        # 预先渲染静态部分（角色说明 + 示例），每次调用只拼接上下文和查询
+        self._prefix = f"""你是一个AI助手。以下是一些示例，展示了如何基于上下文回答问题：
+
+{self._format_examples()}
+
+现在，请用同样的方式回答以下问题：
+
+上下文信息：
+"""
+
     def _default_examples(self) -> List[Dict[str, str]]:
         """默认示例"""
         return [
@@ -321,27 +472,15 @@ class FewShotPromptOperator(BaseGenerationOperator):
         Returns:
             Few-Shot 提示文本
         """
-        # 构建示例部分
-        examples_text = self._format_examples()
-
         # 格式化当前上下文
-        context_text = self._format_context(context) if context else "暂无上下文信息。"
-
-        template = f"""你是一个AI助手。以下是一些示例，展示了如何基于上下文回答问题：
+        context_text = self._format_context(context) if context else NO_CONTEXT
 
-{examples_text}
-
-现在，请用同样的方式回答以下问题：
+        return f"""{self._prefix}{context_text}
 
-上下文信息：
-{context_text}
-
-用户问题：{{query}}
+用户问题：{query}
 
 答案："""
 
-        return template.format(query=query)
-
     def _format_examples(self) -> str:
         """格式化示例"""
         formatted_examples = []
@@ -357,14 +496,7 @@ class FewShotPromptOperator(BaseGenerationOperator):
 
     def _format_context(self, documents: List[Document]) -> str:
         """格式化上下文"""
-        if not documents:
-            return "暂无上下文信息。"
-
-        formatted_parts = []
-        for i, doc in enumerate(documents, 1):
-            formatted_parts.append(f"{doc.page_content}")
-
-        return "\n".join(formatted_parts)
+        return "\n".join(doc.page_content for doc in documents) if documents else NO_CONTEXT
 
 
 class InstructPromptOperator(BaseGenerationOperator):
@@ -382,12 +514,17 @@ class InstructPromptOperator(BaseGenerationOperator):
     - 结构化输出
     """
 
+    __slots__ = ("_prefix", "constraints", "instructions", "output_format")
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.instructions = self.config.get("instructions", [])
         self.constraints = self.config.get("constraints", [])
         self.output_format = self.config.get("output_format", None)
 
+        # 预先拼接静态部分（指令、约束、输出格式），每次调用只拼接上下文和查询
+        self._prefix = self._build_prefix()
+
     def execute(self, query: str, context: List[Document] = None, **kwargs) -> str:
         """
         构建指令提示
@@ -400,6 +537,13 @@ class InstructPromptOperator(BaseGenerationOperator):
         Returns:
             指令提示文本
         """
+        # 格式化上下文
+        context_text = self._format_context(context) if context else NO_CONTEXT
+
+        return f"{self._prefix}{context_text}\n用户问题：{query}\n答案："
+
+    def _build_prefix(self) -> str:
+        """拼接提示的静态部分"""
         # 构建指令部分
         instructions_text = self._format_instructions()
 
@@ -409,9 +553,6 @@ class InstructPromptOperator(BaseGenerationOperator):
         # 构建输出格式部分
         format_text = self._format_output_format()
 
-        # 格式化上下文
-        context_text = self._format_context(context) if context else "暂无上下文信息。"
-
         # 组合提示
         parts = ["你是一个AI助手。请严格按照以下要求完成任务："]
 
@@ -424,12 +565,9 @@ class InstructPromptOperator(BaseGenerationOperator):
         if format_text:
             parts.append(f"\n输出格式：\n{format_text}")
 
-        parts.append(f"\n上下文信息：\n{context_text}")
-        parts.append(f"\n用户问题：{{query}}")
-        parts.append("\n答案：")
+        parts.append("\n上下文信息：\n")
 
-        template = "".join(parts)
-        return template.format(query=query)
+        return "".join(parts)
 
     def _format_instructions(self) -> str:
         """格式化指令"""
@@ -451,11 +589,4 @@ class InstructPromptOperator(BaseGenerationOperator):
 
     def _format_context(self, documents: List[Document]) -> str:
         """格式化上下文"""
-        if not documents:
-            return "暂无上下文信息。"
-
-        formatted_parts = []
-        for i, doc in enumerate(documents, 1):
-            formatted_parts.append(f"[文档 {i}] {doc.page_content}")
-
-        return "\n\n".join(formatted_parts)
+        return _format_inline(documents) if documents else NO_CONTEXT
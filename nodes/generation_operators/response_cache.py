@@ -0,0 +1,334 @@
+"""
+LLM 响应缓存
+按 (模型, 消息, 生成参数) 持久化缓存完整答案，低温度生成时
+重复的请求（评测循环、重复运行的示例）直接返回缓存结果，跳过 API 调用
+
+存储方式与 EmbeddingCache 一致：SQLite 单文件，按最近访问时间做 LRU 淘汰。
+可选的语义层：上下文相同、查询语义几乎相同（embedding 余弦相似度 ≥ 阈值）时也视为命中。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage
+
+
+def response_key(model: str, messages: List[BaseMessage], params: Dict[str, Any]) -> str:
+    """
+    计算缓存键：sha256(模型 + 消息 + 生成参数)
+
+    Args:
+        model: 模型名称
+        messages: 发送给 LLM 的消息列表
+        params: 影响输出的生成参数（temperature、max_tokens 等）
+
+    Returns:
+        十六进制摘要
+    """
+    hasher = hashlib.sha256(model.encode("utf-8"))
+    for message in messages:
+        hasher.update(b"\x00")
+        hasher.update(message.type.encode("utf-8"))
+        hasher.update(b"\x01")
+        hasher.update(str(message.content).encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(repr(sorted(params.items())).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def context_namespace(model: str, context: Optional[List[Document]], params: Dict[str, Any]) -> str:
+    """
+    计算语义缓存的命名空间：sha256(模型 + 上下文内容 + 生成参数)
+
+    只有命名空间相同（同一模型、同样的上下文和参数）的查询之间才做语义匹配。
+    """
+    hasher = hashlib.sha256(model.encode("utf-8"))
+    for doc in context or []:
+        hasher.update(b"\x00")
+        hasher.update(doc.page_content.encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(repr(sorted(params.items())).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class ResponseCache:
+    """
+    基于 SQLite 的 LLM 响应缓存
+
+    - 键：response_key(model, messages, params)
+    - 值：完整答案文本
+    - 超过 max_entries 时淘汰最久未访问的条目
+    - 记录命中 / 未命中次数，stats() 查看命中率
+    - 语义层（提供 embedding_model 时启用，仅保存在内存中）：
+      同一命名空间内查询向量余弦相似度 ≥ semantic_threshold 即返回已有答案，
+      每个命名空间最多保留 semantic_max_entries 条，超出时淘汰最早写入的条目
+    """
+
+    def __init__(
+        self,
+        path: str = "./.llm_cache/responses.sqlite",
+        max_entries: int = 100_000,
+        embedding_model: Optional[Embeddings] = None,
+        semantic_threshold: float = 0.95,
+        semantic_max_entries: int = 1000,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite 数据库文件路径
+            max_entries: 最多保留的条目数
+            embedding_model: 语义层使用的 embedding 模型（None 表示只做精确匹配）
+            semantic_threshold: 语义命中的余弦相似度阈值
+            semantic_max_entries: 语义层每个命名空间最多保留的条目数
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.embedding_model = embedding_model
+        self.semantic_threshold = semantic_threshold
+        self.semantic_max_entries = semantic_max_entries
+        self.hits = 0
+        self.misses = 0
+        self.semantic_hits = 0
+
+        # 命名空间 -> (归一化查询向量队列, 答案队列)，队列满时自动丢弃最早的条目
+        self._semantic: Dict[str, tuple] = {}
+        self._last_embedding = (None, None)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 批量生成和集成生成会在多个线程中访问缓存
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        查询缓存的答案
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            答案文本（未命中时返回 None）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """
+        写入缓存，超出容量时淘汰最久未访问的条目
+
+        Args:
+            key: 缓存键
+            response: 答案文本
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, accessed) VALUES (?, ?, ?)",
+                (key, response, time.time()),
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (overflow,),
+                )
+            self._conn.commit()
+
+    def _embed(self, query: str) -> np.ndarray:
+        """计算归一化查询向量（查询后紧接着写入时复用上一次的结果）"""
+        with self._lock:
+            last_query, last_vector = self._last_embedding
+        if query == last_query:
+            return last_vector
+        # embedding 请求不持锁，避免串行化其他线程的缓存访问
+        vector = np.asarray(self.embedding_model.embed_query(query), dtype=np.float32)
+        vector /= np.linalg.norm(vector) + 1e-12
+        with self._lock:
+            self._last_embedding = (query, vector)
+        return vector
+
+    def get_similar(self, namespace: str, query: str) -> Optional[str]:
+        """
+        语义查询：同一命名空间内与 query 最相似的已缓存查询达到阈值时返回其答案
+
+        Args:
+            namespace: context_namespace() 计算的命名空间
+            query: 用户查询
+
+        Returns:
+            答案文本（未启用语义层或未命中时返回 None）
+        """
+        if self.embedding_model is None:
+            return None
+        with self._lock:
+            if not self._semantic.get(namespace):
+                return None
+
+        vector = self._embed(query)
+        with self._lock:
+            vectors, answers = self._semantic[namespace]
+            similarities = np.stack(vectors) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.semantic_threshold:
+                self.semantic_hits += 1
+                return answers[best]
+        return None
+
+    def put_similar(self, namespace: str, query: str, response: str):
+        """
+        写入语义层
+
+        Args:
+            namespace: context_namespace() 计算的命名空间
+            query: 用户查询
+            response: 答案文本
+        """
+        if self.embedding_model is None:
+            return
+        vector = self._embed(query)
+        with self._lock:
+            entry = self._semantic.get(namespace)
+            if entry is None:
+                entry = self._semantic[namespace] = (
+                    deque(maxlen=self.semantic_max_entries),
+                    deque(maxlen=self.semantic_max_entries),
+                )
+            vectors, answers = entry
+            vectors.append(vector)
+            answers.append(response)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存统计
+
+        Returns:
+            包含 hits、misses、hit_rate、semantic_hits、size 的字典
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "semantic_hits": self.semantic_hits,
+            "size": len(self),
+        }
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._semantic.clear()
+            self._last_embedding = (None, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
+
+
+class CacheTicket(NamedTuple):
+    """一次缓存查询的键，生成完成后凭此写回缓存"""
+
+    key: str
+    namespace: Optional[str]
+    query: Optional[str]
+
+
+class ResponseCachingMixin:
+    """
+    生成器的响应缓存（mixin）
+
+    使用者需在 __slots__ 中声明 "response_cache"，在 __init__ 中调用 _init_response_cache。
+    配置：
+    - cache: True / False，或直接传入共享的 ResponseCache 实例
+    - cache_max_temperature: 温度高于该值时不缓存（默认 0.3，高温度下答案本就应当不同）
+    - cache_path / cache_max_entries: 缓存文件位置和容量
+    - semantic_cache_embedding / semantic_cache_threshold: 语义层的 embedding 模型和阈值
+    - semantic_cache_max_entries: 语义层每个命名空间的容量（默认 1000）
+    """
+
+    __slots__ = ()
+
+    def _init_response_cache(self, temperature: float):
+        """按配置创建（或复用）响应缓存"""
+        cache = self.config.get("cache", True)
+        if isinstance(cache, ResponseCache):
+            self.response_cache = cache
+        elif cache and temperature <= self.config.get("cache_max_temperature", 0.3):
+            self.response_cache = ResponseCache(
+                self.config.get("cache_path", "./.llm_cache/responses.sqlite"),
+                max_entries=self.config.get("cache_max_entries", 100_000),
+                embedding_model=self.config.get("semantic_cache_embedding", None),
+                semantic_threshold=self.config.get("semantic_cache_threshold", 0.95),
+                semantic_max_entries=self.config.get("semantic_cache_max_entries", 1000),
+            )
+        else:
+            self.response_cache = None
+
+    def _cache_lookup(
+        self,
+        model: str,
+        messages: List[BaseMessage],
+        params: Dict[str, Any],
+        query: Optional[str] = None,
+        context: Optional[List[Document]] = None,
+    ):
+        """
+        查询缓存（先精确匹配，再语义匹配）
+
+        Returns:
+            (缓存的答案或 None, 写回用的 CacheTicket；未启用缓存时为 None)
+        """
+        if self.response_cache is None:
+            return None, None
+
+        # 系统消息（任务说明）不同的请求不做语义匹配
+        system = messages[0].content if messages and messages[0].type == "system" else ""
+        namespace = context_namespace(model, context, {**params, "system": system}) if query else None
+        ticket = CacheTicket(response_key(model, messages, params), namespace, query)
+
+        answer = self.response_cache.get(ticket.key)
+        if answer is None and namespace is not None:
+            answer = self.response_cache.get_similar(namespace, query)
+        return answer, ticket
+
+    def _cache_store(self, ticket: Optional[CacheTicket], answer: str):
+        """生成完成后写回缓存"""
+        if ticket is None:
+            return
+        self.response_cache.put(ticket.key, answer)
+        if ticket.namespace is not None:
+            self.response_cache.put_similar(ticket.namespace, ticket.query, answer)
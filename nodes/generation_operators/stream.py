@@ -0,0 +1,171 @@
+"""
+流式输出批处理
+
+逐 token 转发流式增量会带来大量细碎的写操作（print / 网络发送 / 事件循环调度）。
+这里把增量按「数量上限 + 时间窗口」合并成较大的块再交给下游：
+- 累计 max_items 个增量，或
+- 距离本批第一个增量超过 max_latency_ms
+任一条件满足即输出一批。
+
+设置 growth > 1 时批大小从 1 开始按倍数增长到 max_items：
+首个增量立即输出（首字延迟不变），之后逐步合并为更大的块。
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Iterable, Iterator
+
+_SENTINEL = object()
+
+
+class BatchingQueue:
+    """
+    异步批处理队列
+
+    生产者通过 put() 写入增量、close() 结束；消费者迭代 batches() 获得合并后的块。
+    时间窗口由等待超时实现：即使生产者暂时没有新数据，到期后也会先输出已缓冲的内容。
+    """
+
+    def __init__(self, max_items: int = 16, max_latency_ms: float = 200, growth: int = 1):
+        """
+        初始化批处理队列
+
+        Args:
+            max_items: 每批最多合并的增量数量
+            max_latency_ms: 每批最长等待时间（毫秒）
+            growth: 批大小增长倍数（1 表示固定为 max_items）
+        """
+        self.max_items = max_items
+        self.max_latency = max_latency_ms / 1000
+        self.growth = growth
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def put(self, item: str):
+        """写入一个增量"""
+        await self._queue.put(item)
+
+    async def close(self):
+        """标记生产结束"""
+        await self._queue.put(_SENTINEL)
+
+    async def batches(self) -> AsyncIterator[str]:
+        """
+        迭代合并后的块
+
+        Yields:
+            拼接后的文本块
+        """
+        loop = asyncio.get_running_loop()
+        buffer = []
+        deadline = None
+        batch_size = 1 if self.growth > 1 else self.max_items
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                # 时间窗口到期：输出已缓冲的内容
+                yield "".join(buffer)
+                buffer = []
+                deadline = None
+                continue
+
+            if item is _SENTINEL:
+                if buffer:
+                    yield "".join(buffer)
+                return
+
+            buffer.append(item)
+            if deadline is None:
+                deadline = loop.time() + self.max_latency
+
+            if len(buffer) >= batch_size:
+                yield "".join(buffer)
+                buffer = []
+                deadline = None
+                batch_size = min(batch_size * self.growth, self.max_items)
+
+
+async def abatch_stream(
+    source: AsyncIterator[str],
+    max_items: int = 16,
+    max_latency_ms: float = 200,
+    growth: int = 1,
+) -> AsyncIterator[str]:
+    """
+    对异步增量流做批处理
+
+    Args:
+        source: 异步增量流（如 llm.astream 产生的文本）
+        max_items: 每批最多合并的增量数量
+        max_latency_ms: 每批最长等待时间（毫秒）
+        growth: 批大小增长倍数（1 表示固定为 max_items）
+
+    Yields:
+        拼接后的文本块
+    """
+    queue = BatchingQueue(max_items, max_latency_ms, growth)
+
+    async def produce():
+        try:
+            async for item in source:
+                await queue.put(item)
+        finally:
+            await queue.close()
+
+    producer = asyncio.create_task(produce())
+    try:
+        async for batch in queue.batches():
+            yield batch
+    finally:
+        # 消费方提前停止（break / aclose / 取消）时不再继续拉取上游流
+        if not producer.done():
+            producer.cancel()
+        try:
+            # 传播生产者中的异常
+            await producer
+        except asyncio.CancelledError:
+            if not producer.cancelled():
+                raise
+
+
+def batch_stream(
+    source: Iterable[str],
+    max_items: int = 16,
+    max_latency_ms: float = 200,
+    growth: int = 1,
+) -> Iterator[str]:
+    """
+    对同步增量流做批处理
+
+    同步迭代无法在等待期间触发定时器，因此时间窗口在每个增量到达时检查。
+
+    Args:
+        source: 增量流（如 llm.stream 产生的文本）
+        max_items: 每批最多合并的增量数量
+        max_latency_ms: 每批最长等待时间（毫秒）
+        growth: 批大小增长倍数（1 表示固定为 max_items）
+
+    Yields:
+        拼接后的文本块
+    """
+    max_latency = max_latency_ms / 1000
+    buffer = []
+    started = None
+    batch_size = 1 if growth > 1 else max_items
+
+    for item in source:
+        buffer.append(item)
+        now = time.monotonic()
+        if started is None:
+            started = now
+
+        if len(buffer) >= batch_size or now - started >= max_latency:
+            yield "".join(buffer)
+            buffer = []
+            started = None
+            batch_size = min(batch_size * growth, max_items)
+
+    if buffer:
+        yield "".join(buffer)
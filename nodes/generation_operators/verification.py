@@ -3,17 +3,150 @@
 
 实现论文中的验证技术：
 1. Fact Checking: 事实核查
-2. Consistency Check: 一致性检查
+2. Consistency Check: 一致性检查（可与事实核查合并为一次调用）
 3. Hallucination Detection: 幻觉检测
 4. Confidence Scoring: 置信度评分
 """
 
-from typing import List, Dict, Any
+import functools
+import re
+from typing import FrozenSet, List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
 from langchain_core.documents import Document
-from langchain_community.chat_models import QianfanChatEndpoint
+from langchain_core.embeddings import Embeddings
 from langchain_core.messages import HumanMessage
 
-from .base import BaseGenerationOperator
+from .. import _json
+from .base import BaseGenerationOperator, get_chat
+
+
+# LLM 输出中的 JSON 对象：先贪婪匹配最外层（支持嵌套），失败时逐个尝试不含嵌套的对象
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+_FLAT_JSON_RE = re.compile(r"\{[^{}]*\}")
+# 分句：中英文句末标点
+_SENTENCE_RE = re.compile(r"[。！？.!?]")
+# 分词：连续的汉字，或连续的其他单词字符（字母、数字等），标点不会粘在词上
+_TOKEN_RE = re.compile(r"[\u4e00-\u9fff]+|[^\W\u4e00-\u9fff]+")
+
+
+def _tokenize(text: str) -> Set[str]:
+    """
+    把文本切分为词集合（小写）
+
+    中文没有空格分隔，str.split() 会把整句当作一个词；
+    这里把连续汉字切成字符 bigram（单字保留原字），其他文字按单词切分。
+    """
+    tokens = set()
+    for run in _TOKEN_RE.findall(text.lower()):
+        if len(run) > 1 and "\u4e00" <= run[0] <= "\u9fff":
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.add(run)
+    return tokens
+
+
+def _extract_json(response: str) -> Optional[Dict[str, Any]]:
+    """
+    从 LLM 输出中提取 JSON 对象
+
+    Args:
+        response: LLM 输出（可能包含说明文字或代码块）
+
+    Returns:
+        解析出的字典；找不到合法 JSON 对象时返回 None
+    """
+    match = _JSON_RE.search(response)
+    if not match:
+        return None
+    candidates = [match.group()] + _FLAT_JSON_RE.findall(response)
+    for candidate in candidates:
+        try:
+            data = _json.loads(candidate)
+        except _json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+@functools.lru_cache(maxsize=64)
+def _context_words(contents: Tuple[str, ...]) -> FrozenSet[str]:
+    """上下文词集合（同一组文档被多个验证操作器检查时只分词一次）"""
+    return frozenset().union(*map(_tokenize, contents))
+
+
+def context_words(context: List[Document]) -> FrozenSet[str]:
+    """
+    计算上下文文档的词集合（按文档内容缓存）
+
+    Args:
+        context: 上下文文档
+
+    Returns:
+        小写词集合
+    """
+    return _context_words(tuple(doc.page_content for doc in context))
+
+
+def _overlap_ratio(text: str, ctx_words: FrozenSet[str]) -> float:
+    """文本的词有多大比例出现在上下文中（文本没有词时返回 0）"""
+    words = _tokenize(text)
+    if not words:
+        return 0.0
+    return len(words & ctx_words) / len(words)
+
+
+@functools.lru_cache(maxsize=64)
+def _context_text(contents: Tuple[str, ...]) -> str:
+    return "\n\n".join(contents)
+
+
+def context_text(context: List[Document], limit: int = 3) -> str:
+    """
+    拼接 LLM 核查使用的上下文文本（前 limit 个文档，按文档内容缓存）
+
+    流水线中多个验证操作器检查同一组文档时，可以预先调用一次，
+    通过 execute(..., context_text=...) 传给各个操作器。
+
+    Args:
+        context: 上下文文档
+        limit: 最多使用的文档数量
+
+    Returns:
+        以空行分隔的文档内容
+    """
+    return _context_text(tuple(doc.page_content for doc in context[:limit]))
+
+
+def _embed_with_context(
+    embedding_model: Embeddings,
+    texts: List[str],
+    context: List[Document]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一次 embedding 调用同时得到文本向量和上下文向量（均已归一化）
+
+    上下文文档都已附带同一模型在检索阶段产生的向量（doc.metadata["_embedding"]）时直接复用，
+    只对 texts 做 embedding；模型不同时上下文也用 embedding_model 重新计算（否则向量空间不一致）。
+
+    Args:
+        embedding_model: Embedding 模型
+        texts: 待比较的文本（答案或陈述）
+        context: 上下文文档
+
+    Returns:
+        (文本向量矩阵, 上下文向量矩阵)
+    """
+    # 只在配置了 embedding_model 时才加载检索后处理包
+    from ..post_retrieval_operators.similarity import has_embeddings, normalize_rows
+
+    cached = has_embeddings(context, embedding_model)
+    payload = texts if cached else texts + [doc.page_content for doc in context]
+    vectors = normalize_rows(embedding_model.embed_documents(payload))
+    if cached:
+        return vectors, normalize_rows([doc.metadata["_embedding"] for doc in context])
+    return vectors[:len(texts)], vectors[len(texts):]
 
 
 class VerificationOperator(BaseGenerationOperator):
@@ -21,11 +154,15 @@ class VerificationOperator(BaseGenerationOperator):
     基础验证操作器
 
     验证生成答案的质量和准确性
+    配置 embedding_model 时相关性为答案与上下文文档的最大余弦相似度，否则为词重叠率
     """
 
+    __slots__ = ("embedding_model", "threshold")
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.threshold = self.config.get("threshold", 0.7)
+        self.embedding_model = self.config.get("embedding_model", None)
 
     def execute(
         self,
@@ -63,8 +200,11 @@ class VerificationOperator(BaseGenerationOperator):
 
         # 检查是否与上下文相关
         if context:
-            context_text = " ".join([doc.page_content for doc in context])
-            relevance = self._check_relevance(answer, context_text)
+            if self.embedding_model is not None:
+                answer_vectors, ctx_vectors = _embed_with_context(self.embedding_model, [answer], context)
+                relevance = float((ctx_vectors @ answer_vectors[0]).max())
+            else:
+                relevance = self._check_relevance(answer, context_words(context))
 
             return {
                 "is_valid": relevance > self.threshold,
@@ -78,26 +218,25 @@ class VerificationOperator(BaseGenerationOperator):
             "reason": "No context to verify against"
         }
 
-    def _check_relevance(self, answer: str, context: str) -> float:
+    def _check_relevance(self, answer: str, ctx_words: FrozenSet[str]) -> float:
         """简单的相关性检查"""
         # 统计答案中有多少词出现在上下文中
-        answer_words = set(answer.lower().split())
-        context_words = set(context.lower().split())
-
-        if not answer_words:
-            return 0.0
-
-        common_words = answer_words & context_words
-        return len(common_words) / len(answer_words)
+        return _overlap_ratio(answer, ctx_words)
 
 
-class FactCheckOperator(BaseGenerationOperator):
+class _LLMCheckOperator(BaseGenerationOperator):
     """
-    事实核查操作器
+    基于 LLM 的检查操作器基类
 
-    使用 LLM 验证答案中的事实是否与上下文一致
+    子类在 _DEFAULT 中给出无法调用 LLM 或调用失败时的默认结果；
+    LLM 返回的 JSON 与默认结果合并，缺失的字段取默认值。
     """
 
+    __slots__ = ("llm", "model_name")
+
+    # 无法调用 LLM 或调用失败时的默认结果
+    _DEFAULT: Dict[str, Any] = {"confidence": 0.5}
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.model_name = self.config.get("model", "qwen-plus")
@@ -106,15 +245,47 @@ class FactCheckOperator(BaseGenerationOperator):
     def _init_llm(self):
         """初始化 LLM"""
         try:
-            from langchain_community.chat_models import ChatTongyi
-            return ChatTongyi(
-                model_name=self.model_name,
-                temperature=0.0
-            )
+            return get_chat(self.model_name, 0.0)
         except Exception as e:
             print(f"⚠️  初始化 LLM 失败: {e}")
             return None
 
+    def _default_result(self) -> Dict[str, Any]:
+        """默认结果的副本（列表字段也复制，调用方可以放心修改）"""
+        return {key: list(value) if isinstance(value, list) else value for key, value in self._DEFAULT.items()}
+
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        """解析 LLM 响应（找不到 JSON 时返回默认结果，置信度 0.7）"""
+        result = _extract_json(response)
+        if result is None:
+            return {**self._default_result(), "confidence": 0.7}
+        return {**self._default_result(), **result}
+
+
+class FactCheckOperator(_LLMCheckOperator):
+    """
+    事实核查操作器
+
+    使用 LLM 验证答案中的事实是否与上下文一致
+
+    廉价预检（enable_cheap_gate）：较短的答案中几乎所有词都出现在上下文里时，
+    直接判定为符合事实，跳过 LLM 调用。
+    """
+
+    __slots__ = ("cheap_gate_max_length", "enable_cheap_gate", "skip_llm_threshold")
+
+    _DEFAULT = {
+        "is_factual": True,
+        "confidence": 0.5,
+        "violations": []
+    }
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self.enable_cheap_gate = self.config.get("enable_cheap_gate", True)
+        self.skip_llm_threshold = self.config.get("skip_llm_threshold", 0.9)  # 词重叠率达到该值时跳过 LLM
+        self.cheap_gate_max_length = self.config.get("cheap_gate_max_length", 300)  # 只对不超过该长度的答案预检
+
     def execute(
         self,
         query: str,
@@ -127,7 +298,7 @@ class FactCheckOperator(BaseGenerationOperator):
         Args:
             query: 用户查询
             context: 上下文文档
-            **kwargs: 必须包含 answer 参数
+            **kwargs: 必须包含 answer 参数；可选 context_text（预先拼接的上下文文本）
 
         Returns:
             核查结果
@@ -135,19 +306,25 @@ class FactCheckOperator(BaseGenerationOperator):
         answer = kwargs.get("answer", "")
 
         if not self.llm or not context:
-            return {
-                "is_factual": True,
-                "confidence": 0.5,
-                "violations": []
-            }
+            return self._default_result()
+
+        # 廉价预检：答案短且几乎完全由上下文中的词构成时不调用 LLM
+        if self.enable_cheap_gate and len(answer) <= self.cheap_gate_max_length:
+            cheap_score = _overlap_ratio(answer, context_words(context[:3]))
+            if cheap_score >= self.skip_llm_threshold:
+                return {
+                    "is_factual": True,
+                    "confidence": cheap_score,
+                    "violations": []
+                }
 
         # 构建事实核查 prompt
-        context_text = "\n\n".join([doc.page_content for doc in context[:3]])
+        ctx_text = kwargs.get("context_text") or context_text(context)
 
         prompt = f"""请作为事实核查专家，验证答案中的陈述是否与提供的上下文一致。
 
 上下文：
-{context_text}
+{ctx_text}
 
 答案：
 {answer}
@@ -166,60 +343,27 @@ class FactCheckOperator(BaseGenerationOperator):
 
         try:
             response = self.llm.invoke([HumanMessage(content=prompt)])
-            result = self._parse_response(response.content)
-            return result
         except Exception as e:
             print(f"⚠️  事实核查失败: {e}")
-            return {
-                "is_factual": True,
-                "confidence": 0.5,
-                "violations": []
-            }
+            return self._default_result()
 
-    def _parse_response(self, response: str) -> Dict[str, Any]:
-        """解析 LLM 响应"""
-        import json
-        import re
-
-        # 尝试提取 JSON
-        json_match = re.search(r'\{[^}]+\}', response, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group())
-            except:
-                pass
-
-        # 如果解析失败，返回默认值
-        return {
-            "is_factual": True,
-            "confidence": 0.7,
-            "violations": []
-        }
+        return self._parse_response(response.content)
 
 
-class ConsistencyCheckOperator(BaseGenerationOperator):
+class ConsistencyCheckOperator(_LLMCheckOperator):
     """
     一致性检查操作器
 
     检查答案内部的逻辑一致性
     """
 
-    def __init__(self, config: Dict[str, Any] = None):
-        super().__init__(config)
-        self.model_name = self.config.get("model", "qwen-plus")
-        self.llm = self._init_llm()
+    __slots__ = ()
 
-    def _init_llm(self):
-        """初始化 LLM"""
-        try:
-            from langchain_community.chat_models import ChatTongyi
-            return ChatTongyi(
-                model_name=self.model_name,
-                temperature=0.0
-            )
-        except Exception as e:
-            print(f"⚠️  初始化 LLM 失败: {e}")
-            return None
+    _DEFAULT = {
+        "is_consistent": True,
+        "confidence": 0.5,
+        "issues": []
+    }
 
     def execute(
         self,
@@ -241,11 +385,7 @@ class ConsistencyCheckOperator(BaseGenerationOperator):
         answer = kwargs.get("answer", "")
 
         if not self.llm:
-            return {
-                "is_consistent": True,
-                "confidence": 0.5,
-                "issues": []
-            }
+            return self._default_result()
 
         # 构建一致性检查 prompt
         prompt = f"""请作为逻辑分析专家，检查以下答案的内部一致性。
@@ -269,35 +409,93 @@ class ConsistencyCheckOperator(BaseGenerationOperator):
 
         try:
             response = self.llm.invoke([HumanMessage(content=prompt)])
-            result = self._parse_response(response.content)
-            return result
         except Exception as e:
             print(f"⚠️  一致性检查失败: {e}")
-            return {
-                "is_consistent": True,
-                "confidence": 0.5,
-                "issues": []
-            }
+            return self._default_result()
 
-    def _parse_response(self, response: str) -> Dict[str, Any]:
-        """解析 LLM 响应"""
-        import json
-        import re
-
-        # 尝试提取 JSON
-        json_match = re.search(r'\{[^}]+\}', response, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group())
-            except:
-                pass
-
-        # 如果解析失败，返回默认值
-        return {
-            "is_consistent": True,
-            "confidence": 0.7,
-            "issues": []
-        }
+        return self._parse_response(response.content)
+
+
+class CombinedVerificationOperator(_LLMCheckOperator):
+    """
+    组合验证操作器
+
+    事实核查（FactCheckOperator）和一致性检查（ConsistencyCheckOperator）合并为一次 LLM 调用，
+    返回同时包含两项结果的 JSON。prompt 中固定的任务说明和上下文放在最前面，
+    随答案变化的查询和答案放在最后，同一上下文反复验证时可以命中服务端的前缀缓存。
+    """
+
+    __slots__ = ()
+
+    _DEFAULT = {
+        "is_factual": True,
+        "is_consistent": True,
+        "confidence": 0.5,
+        "violations": [],
+        "issues": []
+    }
+
+    def execute(
+        self,
+        query: str,
+        context: List[Document] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        执行事实核查 + 一致性检查
+
+        Args:
+            query: 用户查询
+            context: 上下文文档（无上下文时只做一致性检查）
+            **kwargs: 必须包含 answer 参数；可选 context_text（预先拼接的上下文文本）
+
+        Returns:
+            验证结果：is_factual、is_consistent、confidence、violations、issues
+        """
+        answer = kwargs.get("answer", "")
+
+        if not self.llm:
+            return self._default_result()
+
+        ctx_text = kwargs.get("context_text") or (context_text(context) if context else "（无上下文）")
+
+        prompt = f"""请作为事实核查和逻辑分析专家，同时完成两项检查：
+
+事实核查（基于上下文）：
+1. 答案中的事实陈述是否有上下文支持
+2. 是否存在与上下文矛盾的内容
+3. 是否包含上下文中没有的信息
+（无上下文时 is_factual 返回 true，violations 为空）
+
+一致性检查：
+1. 答案中是否存在自相矛盾的陈述
+2. 逻辑推理是否连贯
+3. 结论是否与论据一致
+
+以 JSON 格式返回：
+{{
+  "is_factual": true/false,
+  "is_consistent": true/false,
+  "confidence": 0.0-1.0,
+  "violations": ["列出与上下文不符的陈述"],
+  "issues": ["列出一致性问题"]
+}}
+
+上下文：
+{ctx_text}
+
+问题：{query}
+
+答案：
+{answer}"""
+
+        try:
+            response = self.llm.invoke([HumanMessage(content=prompt)])
+        except Exception as e:
+            print(f"⚠️  组合验证失败: {e}")
+            return self._default_result()
+
+        return self._parse_response(response.content)
 
 
 class HallucinationDetectionOperator(BaseGenerationOperator):
@@ -305,12 +503,16 @@ class HallucinationDetectionOperator(BaseGenerationOperator):
     幻觉检测操作器
 
     检测 LLM 生成的幻觉内容（即不基于上下文的虚构信息）
+    配置 embedding_model 时按陈述与上下文文档的最大余弦相似度判断支持度，否则按词重叠率
     """
 
+    __slots__ = ("embedding_model", "strict", "threshold")
+
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.threshold = self.config.get("threshold", 0.7)
         self.strict = self.config.get("strict", False)
+        self.embedding_model = self.config.get("embedding_model", None)
 
     def execute(
         self,
@@ -341,13 +543,15 @@ class HallucinationDetectionOperator(BaseGenerationOperator):
         # 提取答案中的关键陈述
         statements = self._extract_statements(answer)
 
-        # 检查每个陈述是否有上下文支持
-        context_text = " ".join([doc.page_content for doc in context])
-        hallucinations = []
-
-        for statement in statements:
-            if not self._is_supported(statement, context_text):
-                hallucinations.append(statement)
+        if self.embedding_model is not None and statements:
+            # 所有陈述和上下文一次 embedding，陈述×文档 相似度一次矩阵乘法
+            stmt_vectors, ctx_vectors = _embed_with_context(self.embedding_model, statements, context)
+            support = (stmt_vectors @ ctx_vectors.T).max(axis=1)
+            hallucinations = [s for s, score in zip(statements, support) if score < self.threshold]
+        else:
+            # 检查每个陈述是否有上下文支持（上下文只分词一次）
+            ctx_words = context_words(context)
+            hallucinations = [s for s in statements if not self._is_supported(s, ctx_words)]
 
         has_hallucination = len(hallucinations) > 0
         confidence = 1.0 - (len(hallucinations) / max(len(statements), 1))
@@ -362,20 +566,18 @@ class HallucinationDetectionOperator(BaseGenerationOperator):
     def _extract_statements(self, text: str) -> List[str]:
         """提取文本中的陈述句"""
         # 简单实现：按句号、问号、感叹号分句
-        import re
-        sentences = re.split(r'[。！？.!?]', text)
+        sentences = _SENTENCE_RE.split(text)
         return [s.strip() for s in sentences if len(s.strip()) > 10]
 
-    def _is_supported(self, statement: str, context: str) -> bool:
+    def _is_supported(self, statement: str, ctx_words: FrozenSet[str]) -> bool:
         """检查陈述是否有上下文支持"""
         # 简单实现：检查关键词重叠度
-        statement_words = set(statement.lower().split())
-        context_words = set(context.lower().split())
+        statement_words = _tokenize(statement)
 
         if not statement_words:
             return True
 
-        common_words = statement_words & context_words
+        common_words = statement_words & ctx_words
         overlap_ratio = len(common_words) / len(statement_words)
 
         return overlap_ratio >= self.threshold
@@ -19,25 +19,21 @@
 - Hierarchical Indexing（层次化索引）
 """
 
-from typing import List, Dict, Any, Optional, Union
+import asyncio
+import hashlib
+import os
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Set, Tuple, Union
+import numpy as np
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
 
-from .indexing_operators import (
-    PDFLoaderOperator,
-    WebLoaderOperator,
-    TextLoaderOperator,
-    DirectoryLoaderOperator,
-    RecursiveSplitterOperator,
-    SemanticSplitterOperator,
-    SmallToBigSplitterOperator,
-    StructureAwareSplitterOperator,
-    DashScopeEmbeddingOperator,
-    ChromaStoreOperator,
-    FAISSStoreOperator,
-    InMemoryStoreOperator,
-)
-from .strategies import HierarchicalIndexStrategy
+from ._async import run_async
+
+# 各 operator 在 _init_* 中按配置的类型按需导入：
+# 只加载当前 pipeline 用到的加载器 / 分块器 / 存储后端（及其 langchain_community 依赖），
+# 未使用的可选依赖（pypdf、chromadb、faiss 等）缺失时也不会影响导入
 
 
 class IndexModule:
@@ -70,6 +66,28 @@ class IndexModule:
         """
         self.config = config or {}
 
+        # 向量化并发参数（批次间的并发只在这里控制，embedding 模型内部按顺序请求）：
+        #   embedding.batch_size: 每次请求的文本数（DashScope 会截断到接口上限）
+        #   embedding.max_concurrency: 同时在途的请求数（受 API 限流约束）
+        embedding_config = self.config.get("embedding", {})
+        self.embed_batch_size = embedding_config.get("batch_size", 10)
+        self.embed_concurrency = embedding_config.get("max_concurrency", 8)
+
+        # （可选）持久化 embedding 缓存：重复索引相同内容时跳过 API 调用
+        cache_path = embedding_config.get("cache_path", None)
+        self.embedding_cache = None
+        if cache_path:
+            from .indexing_operators import EmbeddingCache
+            self.embedding_cache = EmbeddingCache(
+                cache_path,
+                fuzzy=embedding_config.get("cache_fuzzy", False),  # 近似文本块（错别字修正等）也复用向量
+            )
+
+        # 向量化前按内容去除完全重复的文档块（页眉页脚等）
+        self.dedupe = self.config.get("dedupe", True)
+        # 流式索引（index_documents(materialize=False)）时每批向量化并写入的文档块数量
+        self.stream_batch_size = self.config.get("stream_batch_size", 256)
+
         # 初始化各个 operator
         self.loader = self._init_loader()
         self.splitter = self._init_splitter()
@@ -77,9 +95,17 @@ class IndexModule:
         self.store = self._init_store()
         self.strategy = self._init_strategy()
 
-        # 存储处理结果
+        # Small-to-Big：父块存储默认放在向量数据库目录下（使用存储 operator 实际的目录）
+        if hasattr(self.splitter, "parent_store_path") and not self.splitter.parent_store_path:
+            store_dir = getattr(self.store, "persist_directory", None) or getattr(self.store, "index_path", None)
+            if store_dir:
+                self.splitter.parent_store_path = os.path.join(store_dir, "parent_store.json")
+
+        # 存储处理结果（流式索引时不保留列表，只记录数量）
         self.documents: List[Document] = []
         self.splits: List[Document] = []
+        self.documents_count = 0
+        self.splits_count = 0
         self.vectorstore: Optional[VectorStore] = None
 
     def _init_loader(self):
@@ -88,14 +114,19 @@ class IndexModule:
         loader_type = loader_config.get("type", "pdf")
 
         if loader_type == "pdf":
+            from .indexing_operators import PDFLoaderOperator
             return PDFLoaderOperator(loader_config)
         elif loader_type == "text":
+            from .indexing_operators import TextLoaderOperator
             return TextLoaderOperator(loader_config)
         elif loader_type == "directory":
+            from .indexing_operators import DirectoryLoaderOperator
             return DirectoryLoaderOperator(loader_config)
         elif loader_type == "web":
+            from .indexing_operators import WebLoaderOperator
             return WebLoaderOperator(loader_config)
         else:
+            from .indexing_operators import PDFLoaderOperator
             print(f"⚠️  未知的 loader 类型: {loader_type}，使用默认 PDF loader")
             return PDFLoaderOperator()
 
@@ -105,14 +136,19 @@ class IndexModule:
         splitter_type = splitter_config.get("type", "recursive")
 
         if splitter_type == "recursive":
+            from .indexing_operators import RecursiveSplitterOperator
             return RecursiveSplitterOperator(splitter_config)
         elif splitter_type == "semantic":
+            from .indexing_operators import SemanticSplitterOperator
             return SemanticSplitterOperator(splitter_config)
         elif splitter_type == "small_to_big":
+            from .indexing_operators import SmallToBigSplitterOperator
             return SmallToBigSplitterOperator(splitter_config)
         elif splitter_type == "structure_aware":
+            from .indexing_operators import StructureAwareSplitterOperator
             return StructureAwareSplitterOperator(splitter_config)
         else:
+            from .indexing_operators import RecursiveSplitterOperator
             print(f"⚠️  未知的 splitter 类型: {splitter_type}，使用默认递归分块器")
             return RecursiveSplitterOperator()
 
@@ -120,6 +156,7 @@ class IndexModule:
         """初始化 embedding 模型"""
         embedding_config = self.config.get("embedding", {})
         embedding_type = embedding_config.get("type", "dashscope")
+        from .indexing_operators import DashScopeEmbeddingOperator
 
         if embedding_type == "dashscope":
             return DashScopeEmbeddingOperator(embedding_config)
@@ -133,12 +170,19 @@ class IndexModule:
         store_type = store_config.get("type", "chroma")
 
         if store_type == "chroma":
+            from .indexing_operators import ChromaStoreOperator
             return ChromaStoreOperator(store_config)
         elif store_type == "faiss":
+            from .indexing_operators import FAISSStoreOperator
             return FAISSStoreOperator(store_config)
+        elif store_type == "faiss_hnsw":
+            from .indexing_operators import FAISSHNSWStoreOperator
+            return FAISSHNSWStoreOperator(store_config)
         elif store_type == "memory":
+            from .indexing_operators import InMemoryStoreOperator
             return InMemoryStoreOperator(store_config)
         else:
+            from .indexing_operators import ChromaStoreOperator
             print(f"⚠️  未知的 store 类型: {store_type}，使用默认 Chroma")
             return ChromaStoreOperator()
 
@@ -148,15 +192,20 @@ class IndexModule:
         strategy_type = strategy_config.get("type", None)
 
         if strategy_type == "hierarchical":
+            from .strategies import HierarchicalIndexStrategy
             return HierarchicalIndexStrategy(strategy_config)
+        elif strategy_type == "flat":
+            from .strategies import FlatIndexStrategy
+            return FlatIndexStrategy(strategy_config)
         else:
             return None
 
     def index_documents(
         self,
         file_path: Union[str, List[str]],
-        verbose: bool = True
-    ) -> VectorStore:
+        verbose: bool = True,
+        materialize: bool = True,
+    ) -> Optional[VectorStore]:
         """
         执行完整的索引 pipeline
 
@@ -169,37 +218,38 @@ class IndexModule:
         Args:
             file_path: 文件路径或文件路径列表
             verbose: 是否打印详细信息
+            materialize: 是否在 self.documents / self.splits 中保留完整的文档列表。
+                         False 时逐个文件加载、分块，按 stream_batch_size 分批向量化并写入，
+                         内存占用与批大小而非语料规模成正比（需要全量文档的策略会退回完整模式）
 
         Returns:
-            VectorStore 对象
+            VectorStore 对象（没有可索引的文档块时为 None）
         """
         if verbose:
             print("=" * 60)
             print("🚀 开始索引 Pipeline")
             print("=" * 60)
 
-        # 1. 文档加载
-        if verbose:
-            print("\n📂 步骤 1: 文档加载")
-        self.documents = self.loader.execute(file_path)
-        if verbose:
-            print(f"   ✓ 加载了 {len(self.documents)} 个文档")
+        if not materialize:
+            if self.strategy is None or self.strategy.streamable:
+                return self._index_streaming(file_path, verbose)
+            print(f"⚠️  {self.strategy.__class__.__name__} 需要完整文档列表，使用非流式索引")
 
-        # 2. 文本分块
+        # 1-2. 文档加载 + 文本分块（流水线：每个文件加载完成即分块，其余文件继续在后台解析）
         if verbose:
-            print("\n✂️  步骤 2: 文本分块")
-        self.splits = self.splitter.execute(self.documents)
+            print("\n📂 步骤 1-2: 文档加载 + 文本分块")
+        self.documents, self.splits = self._load_and_split(file_path)
+        self.documents_count = len(self.documents)
         if verbose:
-            print(f"   ✓ 生成了 {len(self.splits)} 个文档块")
+            print(f"   ✓ 加载了 {len(self.documents)} 个文档，生成了 {len(self.splits)} 个文档块")
 
         # 3. 应用索引策略（可选）
         if self.strategy:
             if verbose:
                 print(f"\n🌲 步骤 3: 应用索引策略 ({self.strategy.__class__.__name__})")
 
-            if isinstance(self.strategy, HierarchicalIndexStrategy):
-                # 对于层次化策略，使用原始文档而不是分块后的文档
-                self.splits = self.strategy.build_hierarchy(self.documents)
+            # 由策略决定入库的文档（如层次化策略基于原始文档重建节点）
+            self.splits = self.strategy.apply(self.documents, self.splits)
 
             if verbose:
                 print(f"   ✓ 策略应用完成，文档数: {len(self.splits)}")
@@ -208,11 +258,28 @@ class IndexModule:
         if verbose:
             print("\n🔧 步骤 4: 向量化 + 存储")
 
+        if self.dedupe:
+            total = len(self.splits)
+            self.splits = self._dedupe_splits(self.splits)
+            if verbose and len(self.splits) < total:
+                print(f"   - 去重: 移除 {total - len(self.splits)} 个重复文档块，剩余 {len(self.splits)} 个")
+
+        self.splits_count = len(self.splits)
+        if not self.splits:
+            print("⚠️  没有可索引的文档块，跳过向量化和存储")
+            self.vectorstore = None
+            return None
+
         # 获取 embedding 模型
         _, embedding_model = self.embedding.execute(self.splits)
 
+        # 并发计算所有文档块的向量
+        embeddings = self._embed_documents(embedding_model, self.splits, verbose)
+
         # 存储到向量数据库
-        self.vectorstore = self.store.execute(self.splits, embedding_model)
+        self.vectorstore = self.store.execute(self.splits, embedding_model, embeddings)
+        if hasattr(self.splitter, "save_parents"):
+            self.splitter.save_parents()
 
         if verbose:
             print("\n" + "=" * 60)
@@ -221,6 +288,189 @@ class IndexModule:
 
         return self.vectorstore
 
+    def _index_streaming(self, file_path: Union[str, List[str]], verbose: bool = True) -> Optional[VectorStore]:
+        """
+        流式索引：加载 → 分块 → 去重 → 向量化 → 写入 逐批进行，不保留完整的文档列表
+
+        Args:
+            file_path: 文件路径或文件路径列表
+            verbose: 是否打印详细信息
+
+        Returns:
+            VectorStore 对象（没有可索引的文档块时为 None）
+        """
+        self.documents, self.splits = [], []
+        self.documents_count = self.splits_count = 0
+
+        if verbose:
+            print(f"\n🌊 流式索引: 每批 {self.stream_batch_size} 个文档块")
+
+        _, embedding_model = self.embedding.execute([])
+
+        def embedded_batches():
+            splits = self._iter_splits(file_path)
+            while True:
+                batch = list(islice(splits, self.stream_batch_size))
+                if not batch:
+                    return
+                self.splits_count += len(batch)
+                yield batch, self._embed_documents(embedding_model, batch, verbose=False)
+                if verbose:
+                    print(f"   - 已写入 {self.splits_count} 个文档块（来自 {self.documents_count} 个文档）")
+
+        self.vectorstore = self.store.execute_streaming(embedded_batches(), embedding_model)
+        if self.vectorstore is None:
+            print("⚠️  没有可索引的文档块，未创建向量库")
+            return None
+        if hasattr(self.splitter, "save_parents"):
+            self.splitter.save_parents()
+
+        if verbose:
+            print("\n" + "=" * 60)
+            print(f"✅ 索引 Pipeline 完成！共 {self.documents_count} 个文档，{self.splits_count} 个文档块")
+            print("=" * 60)
+
+        return self.vectorstore
+
+    def _load_and_split(self, file_path: Union[str, List[str]]) -> Tuple[List[Document], List[Document]]:
+        """
+        逐个文件加载并分块
+
+        目录加载器在进程池中并行解析文件，主线程对已完成的文件分块，
+        分块与剩余文件的解析重叠进行，而不是等全部文件加载完再统一分块。
+        整型 chunk_id 按全部文档连续编号（与一次性分块时一致）。
+
+        Args:
+            file_path: 文件路径或文件路径列表
+
+        Returns:
+            (文档列表, 文档块列表)
+        """
+        documents: List[Document] = []
+        splits: List[Document] = []
+        for file_documents in self.loader.iter_load(file_path):
+            offset = len(splits)
+            file_splits = self.splitter.execute(file_documents)
+            if offset:
+                for split in file_splits:
+                    if isinstance(split.metadata.get("chunk_id"), int):
+                        split.metadata["chunk_id"] += offset
+            documents.extend(file_documents)
+            splits.extend(file_splits)
+        return documents, splits
+
+    def _iter_splits(self, file_path: Union[str, List[str]]) -> Iterator[Document]:
+        """逐个文件加载并分块（流式索引使用，分块元数据中的 chunk_id 在每个文件内编号）"""
+        seen: Set[bytes] = set()
+        for documents in self.loader.iter_load(file_path):
+            self.documents_count += len(documents)
+            splits = self.splitter.execute(documents)
+            if self.strategy:
+                splits = self.strategy.apply(documents, splits)
+            if self.dedupe:
+                splits = self._dedupe_splits(splits, seen)
+            yield from splits
+
+    @staticmethod
+    def _dedupe_splits(splits: Iterable[Document], seen: Optional[Set[bytes]] = None) -> List[Document]:
+        """
+        按内容哈希去除完全重复的文档块（保留首次出现的块及其元数据）
+
+        Args:
+            splits: 文档块列表
+            seen: 已出现过的内容摘要（流式索引时跨批次共享，None 表示新建）
+
+        Returns:
+            去重后的文档块列表
+        """
+        seen = set() if seen is None else seen
+        unique = []
+        for doc in splits:
+            digest = hashlib.blake2b(doc.page_content.encode("utf-8"), digest_size=16).digest()
+            if digest not in seen:
+                seen.add(digest)
+                unique.append(doc)
+        return unique
+
+    def _embed_documents(
+        self, embedding_model: Embeddings, splits: List[Document], verbose: bool = True
+    ) -> List[List[float]]:
+        """
+        将文档块分批，并发调用 embedding 接口
+
+        入库前统一做 L2 归一化：之后检索后处理中的余弦相似度
+        直接退化为内积，不再逐对计算范数和除法。
+
+        Args:
+            embedding_model: Embedding 模型
+            splits: 文档块列表
+            verbose: 是否打印详细信息
+
+        Returns:
+            与 splits 一一对应的向量列表
+        """
+        texts = [doc.page_content for doc in splits]
+        if not texts:
+            return []
+        model_id = self.embedding.model_id
+
+        # 先查缓存，只对未命中的文本调用 embedding 接口
+        if self.embedding_cache is not None:
+            vectors, missing = self.embedding_cache.find_uncached_texts(texts, model_id)
+            vectors = [v.tolist() if v is not None else None for v in vectors]
+        else:
+            vectors, missing = [None] * len(texts), list(range(len(texts)))
+
+        missing_texts = [texts[i] for i in missing]
+        batches = [
+            missing_texts[i:i + self.embed_batch_size]
+            for i in range(0, len(missing_texts), self.embed_batch_size)
+        ]
+
+        if verbose:
+            if self.embedding_cache is not None:
+                print(f"   - 缓存命中: {len(texts) - len(missing)}/{len(texts)}")
+            print(f"   - 向量化: {len(batches)} 个批次，最大并发 {self.embed_concurrency}")
+
+        if batches:
+            new_vectors = run_async(self._embed_batches_async(batches, embedding_model))
+            for i, vector in zip(missing, new_vectors):
+                vectors[i] = vector
+
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(
+                    (missing_texts[j], model_id, vector) for j, vector in enumerate(new_vectors)
+                )
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        return matrix.tolist()
+
+    async def _embed_batches_async(
+        self, batches: List[List[str]], embedding_model: Embeddings
+    ) -> List[List[float]]:
+        """
+        并发执行多个批次的 embedding 请求
+
+        每个批次的同步 HTTP 调用放到线程中执行，用信号量限制在途请求数，
+        总耗时从各批次延迟之和降到约等于最慢批次的延迟。
+
+        Args:
+            batches: 文本批次列表
+            embedding_model: Embedding 模型
+
+        Returns:
+            按原顺序拼接的向量列表
+        """
+        semaphore = asyncio.Semaphore(self.embed_concurrency)
+
+        async def embed(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await asyncio.to_thread(embedding_model.embed_documents, batch)
+
+        results = await asyncio.gather(*[embed(batch) for batch in batches])
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
     def load_existing_index(self, verbose: bool = True) -> VectorStore:
         """
         加载已存在的向量数据库
@@ -243,6 +493,10 @@ class IndexModule:
         else:
             raise NotImplementedError(f"{self.store.__class__.__name__} 不支持加载已存在的索引")
 
+        # Small-to-Big：同时加载父块存储
+        if hasattr(self.splitter, "load_parents"):
+            self.splitter.load_parents()
+
         return self.vectorstore
 
     def get_vectorstore(self) -> VectorStore:
@@ -279,7 +533,8 @@ class IndexModule:
             "embedding": self.embedding.name,
             "store": self.store.name,
             "strategy": self.strategy.__class__.__name__ if self.strategy else None,
-            "documents_count": len(self.documents),
-            "splits_count": len(self.splits),
+            "documents_count": self.documents_count,
+            "splits_count": self.splits_count,
             "vectorstore_initialized": self.vectorstore is not None,
+            "embedding_cache": self.embedding_cache.path if self.embedding_cache else None,
         }
@@ -1,18 +1,60 @@
 """
 Operators 包：索引模块的基本操作单元
 遵循论文的三层架构设计，这些是底层的 indexing_operators
+
+子模块按需加载：访问某个 operator 时才导入其所在模块（及对应的 langchain_community 依赖），
+只用到部分 operator 的 pipeline 不必为加载器、向量库等全部依赖付出导入开销。
 """
 
+import importlib
+from typing import TYPE_CHECKING
+
 from .base import BaseOperator
-from .loaders import LoaderOperator, PDFLoaderOperator, TextLoaderOperator, DirectoryLoaderOperator, WebLoaderOperator
-from .splitters import (
-    SplitterOperator,
-    RecursiveSplitterOperator,
-    SemanticSplitterOperator,
-    SmallToBigSplitterOperator, StructureAwareSplitterOperator
-)
-from .embeddings import EmbeddingOperator, DashScopeEmbeddingOperator
-from .stores import StoreOperator, ChromaStoreOperator, FAISSStoreOperator, InMemoryStoreOperator
+
+if TYPE_CHECKING:
+    from .loaders import LoaderOperator, PDFLoaderOperator, TextLoaderOperator, DirectoryLoaderOperator, WebLoaderOperator
+    from .splitters import (
+        SplitterOperator,
+        RecursiveSplitterOperator,
+        SemanticSplitterOperator,
+        SmallToBigSplitterOperator, StructureAwareSplitterOperator
+    )
+    from .embeddings import EmbeddingOperator, DashScopeEmbeddingOperator, DashScopeBatchEmbeddings, QuantizedEmbeddings
+    from .stores import StoreOperator, ChromaStoreOperator, FAISSStoreOperator, FAISSHNSWStoreOperator, InMemoryStoreOperator
+    from .embedding_cache import EmbeddingCache
+
+# 导出名 -> 所在子模块
+_SUBMODULES = {
+    "LoaderOperator": ".loaders",
+    "PDFLoaderOperator": ".loaders",
+    "TextLoaderOperator": ".loaders",
+    "DirectoryLoaderOperator": ".loaders",
+    "WebLoaderOperator": ".loaders",
+    "SplitterOperator": ".splitters",
+    "RecursiveSplitterOperator": ".splitters",
+    "SemanticSplitterOperator": ".splitters",
+    "SmallToBigSplitterOperator": ".splitters",
+    "StructureAwareSplitterOperator": ".splitters",
+    "EmbeddingOperator": ".embeddings",
+    "DashScopeEmbeddingOperator": ".embeddings",
+    "DashScopeBatchEmbeddings": ".embeddings",
+    "QuantizedEmbeddings": ".embeddings",
+    "StoreOperator": ".stores",
+    "ChromaStoreOperator": ".stores",
+    "FAISSStoreOperator": ".stores",
+    "FAISSHNSWStoreOperator": ".stores",
+    "InMemoryStoreOperator": ".stores",
+    "EmbeddingCache": ".embedding_cache",
+}
+
+
+def __getattr__(name: str):
+    submodule = _SUBMODULES.get(name)
+    if submodule is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(submodule, __name__), name)
+    globals()[name] = value  # 之后直接命中模块属性，不再经过 __getattr__
+    return value
 
 __all__ = [
     "BaseOperator",
@@ -26,10 +68,14 @@ __all__ = [
     "SmallToBigSplitterOperator",
     "EmbeddingOperator",
     "DashScopeEmbeddingOperator",
+    "DashScopeBatchEmbeddings",
+    "QuantizedEmbeddings",
     "StoreOperator",
     "ChromaStoreOperator",
     "DirectoryLoaderOperator",
     "StructureAwareSplitterOperator",
     "FAISSStoreOperator",
+    "FAISSHNSWStoreOperator",
     "InMemoryStoreOperator",
+    "EmbeddingCache",
 ]
@@ -0,0 +1,325 @@
+"""
+Embedding 缓存
+按 (模型, 文本内容) 持久化缓存向量，重复索引相同文档时直接复用，跳过 embedding 调用
+
+支持可选的 SimHash 模糊命中：PDF 重新导出、修正错别字等微小改动
+产生的近似文本块，也可以复用已有向量。
+"""
+
+import hashlib
+import os
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from blake3 import blake3 as _blake3
+except ImportError:  # blake3 为可选依赖，缺失时退回标准库 blake2b
+    _blake3 = None
+
+
+def _cache_key(text: str, model_id: str) -> bytes:
+    """计算缓存键：hash(model_id + text)，模型变化时键随之变化，旧缓存自然失效"""
+    data = model_id.encode("utf-8") + b"\x00" + text.encode("utf-8")
+    if _blake3 is not None:
+        return _blake3(data).digest()
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+_SIMHASH_BITS = 64
+_SIMHASH_BANDS = 4  # 64 位切成 4 段，每段 16 位
+_BAND_BITS = _SIMHASH_BITS // _SIMHASH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def _simhash(text: str, shingle_size: int = 4) -> int:
+    """
+    计算文本的 64 位 SimHash
+
+    以字符 n-gram 作为 shingle（对中英文都适用），
+    相似文本的 SimHash 之间汉明距离很小。
+    """
+    normalized = " ".join(text.split())
+    if len(normalized) <= shingle_size:
+        shingles = [normalized]
+    else:
+        shingles = [normalized[i:i + shingle_size] for i in range(len(normalized) - shingle_size + 1)]
+
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    bits = (hashes[:, None] >> np.arange(_SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    weights = bits.sum(axis=0).astype(np.int64) * 2 - len(shingles)
+
+    value = 0
+    for bit in np.nonzero(weights > 0)[0]:
+        value |= 1 << int(bit)
+    return value
+
+
+def _to_signed(value: int) -> int:
+    """SQLite INTEGER 为有符号 64 位，存储前转换"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    带上界的编辑距离
+
+    只计算对角线附近宽度为 limit 的带状区域，复杂度 O(len × limit)；
+    距离超过 limit 时提前返回 limit + 1。
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    big = limit + 1
+    prev = [j if j <= limit else big for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        lo = max(1, i - limit)
+        hi = min(len(b), i + limit)
+        cur = [big] * (len(b) + 1)
+        if i <= limit:
+            cur[0] = i
+        ca = a[i - 1]
+        for j in range(lo, hi + 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != b[j - 1]))
+        if min(cur[lo - 1:hi + 1]) > limit:
+            return big
+        prev = cur
+
+    return min(prev[len(b)], big)
+
+
+class EmbeddingCache:
+    """
+    基于 SQLite 的 Embedding 持久化缓存
+
+    - 键：hash(model_id + text)，更换模型即失效
+    - 值：float16 压缩后的向量 BLOB（体积减半，检索精度影响可忽略）
+    - 模糊命中（fuzzy=True）：精确未命中时，按 SimHash 分段桶查找汉明距离
+      ≤ max_hamming 的候选，再用编辑距离比例 < max_edit_ratio 确认
+    """
+
+    # SQLite 单条语句的参数个数上限较低，批量查询时按此大小分段
+    _QUERY_CHUNK = 500
+
+    def __init__(
+        self,
+        path: str = "./embedding_cache.sqlite",
+        fuzzy: bool = False,
+        max_hamming: int = 3,
+        max_edit_ratio: float = 0.05,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite 数据库文件路径
+            fuzzy: 是否启用 SimHash 模糊命中
+            max_hamming: SimHash 汉明距离阈值（需小于分段数 4，才能保证候选必落在某个相同分段）
+            max_edit_ratio: 编辑距离 / 文本长度 的阈值
+        """
+        self.path = path
+        self.fuzzy = fuzzy
+        self.max_hamming = max_hamming
+        self.max_edit_ratio = max_edit_ratio
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, model_id TEXT NOT NULL, vector BLOB NOT NULL, "
+            "simhash INTEGER, text TEXT)"
+        )
+        # 兼容旧版本缓存文件（缺少 simhash / text 列）
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        for column, column_type in (("simhash", "INTEGER"), ("text", "TEXT")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE embeddings ADD COLUMN {column} {column_type}")
+        self._conn.commit()
+
+        # SimHash 分段桶：(model_id, 段号, 段值) -> [(simhash, key)]，按模型懒加载
+        self._buckets: Dict[Tuple[str, int, int], List[Tuple[int, bytes]]] = defaultdict(list)
+        self._indexed_models = set()
+
+    @staticmethod
+    def _encode(vector: Sequence[float]) -> bytes:
+        return np.asarray(vector, dtype=np.float16).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> np.ndarray:
+        return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+
+    def get(self, text: str, model_id: str) -> Optional[np.ndarray]:
+        """
+        查询单条文本的缓存向量
+
+        Args:
+            text: 文本内容
+            model_id: embedding 模型标识
+
+        Returns:
+            向量（未命中时返回 None）
+        """
+        row = self._conn.execute(
+            "SELECT vector FROM embeddings WHERE key = ?", (_cache_key(text, model_id),)
+        ).fetchone()
+        if row:
+            return self._decode(row[0])
+        return self._fuzzy_get(text, model_id) if self.fuzzy else None
+
+    def get_many(self, texts: List[str], model_id: str) -> List[Optional[np.ndarray]]:
+        """
+        批量查询缓存向量
+
+        Args:
+            texts: 文本列表
+            model_id: embedding 模型标识
+
+        Returns:
+            与 texts 一一对应的向量列表（未命中的位置为 None）
+        """
+        keys = [_cache_key(text, model_id) for text in texts]
+        found = {}
+        for start in range(0, len(keys), self._QUERY_CHUNK):
+            chunk = keys[start:start + self._QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            )
+            for key, blob in rows:
+                found[key] = blob
+
+        vectors = [self._decode(found[key]) if key in found else None for key in keys]
+
+        if self.fuzzy:
+            for i, vector in enumerate(vectors):
+                if vector is None:
+                    vectors[i] = self._fuzzy_get(texts[i], model_id)
+
+        return vectors
+
+    def find_uncached_texts(
+        self, texts: List[str], model_id: str
+    ) -> Tuple[List[Optional[np.ndarray]], List[int]]:
+        """
+        区分已缓存和未缓存的文本
+
+        Args:
+            texts: 文本列表
+            model_id: embedding 模型标识
+
+        Returns:
+            (与 texts 对应的缓存向量列表, 未命中文本的下标列表)
+        """
+        vectors = self.get_many(texts, model_id)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        return vectors, missing
+
+    def put_many(self, items: Iterable[Tuple[str, str, Sequence[float]]]):
+        """
+        批量写入缓存
+
+        Args:
+            items: (text, model_id, vector) 三元组
+        """
+        rows = []
+        for text, model_id, vector in items:
+            key = _cache_key(text, model_id)
+            simhash = _simhash(text) if self.fuzzy else None
+            rows.append((
+                key,
+                model_id,
+                self._encode(vector),
+                _to_signed(simhash) if simhash is not None else None,
+                text if self.fuzzy else None,
+            ))
+            if simhash is not None and model_id in self._indexed_models:
+                self._add_to_buckets(model_id, simhash, key)
+
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, model_id, vector, simhash, text) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._conn.commit()
+
+    def _add_to_buckets(self, model_id: str, simhash: int, key: bytes):
+        for band in range(_SIMHASH_BANDS):
+            band_value = (simhash >> (band * _BAND_BITS)) & _BAND_MASK
+            self._buckets[(model_id, band, band_value)].append((simhash, key))
+
+    def _ensure_simhash_index(self, model_id: str):
+        """首次模糊查询某个模型时，从数据库加载其 SimHash 分段桶"""
+        if model_id in self._indexed_models:
+            return
+        rows = self._conn.execute(
+            "SELECT key, simhash FROM embeddings WHERE model_id = ? AND simhash IS NOT NULL",
+            (model_id,),
+        )
+        for key, simhash in rows:
+            self._add_to_buckets(model_id, simhash & ((1 << 64) - 1), key)
+        self._indexed_models.add(model_id)
+
+    def _fuzzy_get(self, text: str, model_id: str) -> Optional[np.ndarray]:
+        """
+        模糊查询：汉明距离 ≤ max_hamming 的两个 SimHash 至少有一段完全相同，
+        因此只需探测 4 个分段桶，再用编辑距离确认候选
+        """
+        self._ensure_simhash_index(model_id)
+        simhash = _simhash(text)
+
+        candidates = set()
+        for band in range(_SIMHASH_BANDS):
+            band_value = (simhash >> (band * _BAND_BITS)) & _BAND_MASK
+            for other, key in self._buckets.get((model_id, band, band_value), ()):
+                if (simhash ^ other).bit_count() <= self.max_hamming:
+                    candidates.add(key)
+
+        for key in candidates:
+            row = self._conn.execute(
+                "SELECT text, vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if not row or row[0] is None:
+                continue
+            cached_text, blob = row
+            limit = int(self.max_edit_ratio * max(len(text), len(cached_text)))
+            if _bounded_edit_distance(text, cached_text, limit) <= limit:
+                return self._decode(blob)
+
+        return None
+
+    def clear(self, model_id: Optional[str] = None):
+        """
+        清空缓存
+
+        Args:
+            model_id: 只清除指定模型的缓存；为 None 时清空全部
+        """
+        if model_id is None:
+            self._conn.execute("DELETE FROM embeddings")
+            self._buckets.clear()
+            self._indexed_models.clear()
+        else:
+            self._conn.execute("DELETE FROM embeddings WHERE model_id = ?", (model_id,))
+            for bucket_key in [k for k in self._buckets if k[0] == model_id]:
+                del self._buckets[bucket_key]
+            self._indexed_models.discard(model_id)
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
@@ -3,12 +3,140 @@
 支持不同的 embedding 模型
 """
 
-from typing import List, Dict, Any
+import os
+import time
+from typing import List, Dict, Any, Optional
+import numpy as np
 from langchain_core.documents import Document
-from langchain_community.embeddings import DashScopeEmbeddings
 from langchain_core.embeddings import Embeddings
+from openai import OpenAI
+from .._http import get_client
+from .._retry import RETRYABLE_ERRORS, retry_delay
 from .base import BaseOperator
 
+INT8_SCALE = 127
+
+DASHSCOPE_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+
+# 单次请求最多包含的文本数（DashScope 接口限制），未列出的模型按 10 计
+DASHSCOPE_MAX_BATCH = {
+    "text-embedding-v1": 25,
+    "text-embedding-v2": 25,
+}
+
+
+def quantize_int8(vectors) -> np.ndarray:
+    """
+    将向量 L2 归一化后量化为 int8
+
+    归一化后每个分量落在 [-1, 1]，乘以 127 取整即可映射到 int8，
+    余弦排序几乎不受影响，而存储和带宽只有 float32 的 1/4。
+
+    Args:
+        vectors: 形状为 (n, dim) 的向量（或单个向量）
+
+    Returns:
+        int8 数组
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    vectors = vectors / (norms + 1e-12)
+    return np.clip(np.round(vectors * INT8_SCALE), -INT8_SCALE, INT8_SCALE).astype(np.int8)
+
+
+def dequantize_int8(quantized: np.ndarray) -> np.ndarray:
+    """将 int8 向量还原为（近似）归一化的 float32 向量"""
+    return quantized.astype(np.float32) / INT8_SCALE
+
+
+class QuantizedEmbeddings(Embeddings):
+    """
+    int8 量化 Embedding 包装器
+
+    文档和查询都先量化到 int8 网格再还原为单位尺度的 float32：
+    与 IndexModule 归一化后的文档向量尺度一致，相关性分数、score_threshold、
+    范围检索半径保持原有含义。
+    向量库仍以 float32 存储，需要节省内存时使用 FAISS 存储的 quantize（SQ8）。
+    """
+
+    def __init__(self, base: Embeddings):
+        self.base = base
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return dequantize_int8(quantize_int8(self.base.embed_documents(texts))).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return dequantize_int8(quantize_int8(self.base.embed_query(text))).tolist()
+
+
+class DashScopeBatchEmbeddings(Embeddings):
+    """
+    DashScope 批量 Embedding
+
+    每次请求的 input 是一个文本数组（最多 batch_size 条），
+    一批文本只需一次 HTTP 往返；返回结果按 index 还原为输入顺序。
+    多个批次按顺序请求（批次间的并发由 IndexModule 按 embedding.max_concurrency 控制），
+    遇到 429 限流、连接错误或 5xx 时按 Retry-After（缺省时指数退避）加随机抖动后重试。
+    请求走进程内共享的 HTTP 客户端（连接池 + 可用时 HTTP/2），
+    所有批次复用已建立的连接，响应按 gzip 压缩传输。
+    """
+
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        base_url: str = DASHSCOPE_BASE_URL,
+        max_retries: int = 5,
+    ):
+        """
+        Args:
+            model: 模型名称
+            api_key: API Key（None 时读取环境变量 DASHSCOPE_API_KEY）
+            batch_size: 每次请求的文本数（不超过接口限制）
+            base_url: OpenAI 兼容接口地址
+            max_retries: 遇到限流或临时错误时的最大重试次数
+        """
+        limit = DASHSCOPE_MAX_BATCH.get(model, 10)
+        self.model = model
+        self.batch_size = min(batch_size or limit, limit)
+        self.max_retries = max_retries
+        # 重试由 _embed_batch 负责（带抖动），关闭客户端自带的重试
+        self.client = OpenAI(
+            api_key=api_key or os.getenv("DASHSCOPE_API_KEY"),
+            base_url=base_url,
+            max_retries=0,
+            http_client=get_client(),
+            default_headers={"Accept-Encoding": "gzip"},
+        )
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """一次请求计算一批文本的向量，遇到限流或临时错误时退避重试"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embeddings.create(model=self.model, input=texts, encoding_format="float")
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                # 随机抖动：避免多个批次在同一时刻集中重试
+                time.sleep(retry_delay(e, attempt, jitter=0.5))
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for item in response.data:
+            vectors[item.index] = item.embedding
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [
+            vector
+            for i in range(0, len(texts), self.batch_size)
+            for vector in self._embed_batch(texts[i:i + self.batch_size])
+        ]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0]
+
 
 class EmbeddingOperator(BaseOperator):
     """向量化操作器基类"""
@@ -16,6 +144,13 @@ class EmbeddingOperator(BaseOperator):
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.embedding_model = None
+        self.quantize = self.config.get("quantize", False)  # 是否输出 int8 量化向量
+
+    @property
+    def model_id(self) -> str:
+        """模型标识（用于缓存键），量化输出与原始输出区分开"""
+        model_name = getattr(self, "model_name", self.name)
+        return f"{model_name}:int8" if self.quantize else model_name
 
     def execute(self, documents: List[Document]) -> tuple[List[Document], Embeddings]:
         """
@@ -38,24 +173,27 @@ class EmbeddingOperator(BaseOperator):
 class DashScopeEmbeddingOperator(EmbeddingOperator):
     """
     DashScope (通义千问) Embedding 操作器
+
+    使用 DashScopeBatchEmbeddings：每次请求批量发送 batch_size 条文本，
+    而不是每个文本块一次 HTTP 往返。
     """
 
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.model_name = self.config.get("model", "text-embedding-v4")
-        self.api_key = self.config.get("api_key", None)
+        self.api_key = self.config.get("api_key", None)  # 未传入时使用环境变量 DASHSCOPE_API_KEY
 
         # 初始化 embedding 模型
-        if self.api_key:
-            self.embedding_model = DashScopeEmbeddings(
-                model=self.model_name,
-                dashscope_api_key=self.api_key,
-            )
-        else:
-            # 如果没有传入 API key，使用环境变量
-            self.embedding_model = DashScopeEmbeddings(
-                model=self.model_name,
-            )
+        self.embedding_model = DashScopeBatchEmbeddings(
+            model=self.model_name,
+            api_key=self.api_key,
+            batch_size=self.config.get("batch_size", None),
+            base_url=self.config.get("base_url", DASHSCOPE_BASE_URL),
+            max_retries=self.config.get("max_retries", 5),
+        )
+
+        if self.quantize:
+            self.embedding_model = QuantizedEmbeddings(self.embedding_model)
 
     def execute(self, documents: List[Document]) -> tuple[List[Document], Embeddings]:
         """
@@ -68,6 +206,8 @@ class DashScopeEmbeddingOperator(EmbeddingOperator):
             (文档列表, embedding 模型)
         """
         print(f"🔧 使用 DashScope Embedding 模型: {self.model_name}")
+        if self.quantize:
+            print(f"   - 输出 int8 量化向量")
         return documents, self.embedding_model
 
 
@@ -6,12 +6,15 @@
 3. Small-to-Big（小到大策略）
 """
 
-from typing import List, Dict, Any
+import hashlib
+import os
+from typing import List, Dict, Any, Optional
 from langchain_core.documents import Document
 from langchain_text_splitters import (
     RecursiveCharacterTextSplitter,
     CharacterTextSplitter,
 )
+from .. import _json
 from .base import BaseOperator
 
 
@@ -39,6 +42,12 @@ class RecursiveSplitterOperator(SplitterOperator):
         self.chunk_overlap = self.config.get("chunk_overlap", 200)  # 滑动窗口重叠 相邻两个分块之间重叠的部分。
         self.add_start_index = self.config.get("add_start_index", True) # 记录该分块在原始文档中的起始字符位置。
         self.separators = self.config.get("separators", None)
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            add_start_index=self.add_start_index,
+            separators=self.separators,
+        )
 
     def execute(self, documents: List[Document]) -> List[Document]:
         """
@@ -50,14 +59,7 @@ class RecursiveSplitterOperator(SplitterOperator):
         Returns:
             分块后的 Document 对象列表
         """
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            add_start_index=self.add_start_index,
-            separators=self.separators,
-        )
-
-        splits = splitter.split_documents(documents)
+        splits = self.splitter.split_documents(documents)
 
         # 元数据增强：添加分块信息
         for i, split in enumerate(splits):
@@ -80,6 +82,12 @@ class SemanticSplitterOperator(SplitterOperator):
         self.chunk_overlap = self.config.get("chunk_overlap", 100)
         # 使用段落和句子作为分隔符
         self.separators = ["\n\n", "\n", "。", "!", "?", ";", "；", ":", "："]
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            add_start_index=True,
+            separators=self.separators,
+        )
 
     def execute(self, documents: List[Document]) -> List[Document]:
         """
@@ -91,14 +99,7 @@ class SemanticSplitterOperator(SplitterOperator):
         Returns:
             分块后的 Document 对象列表
         """
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            add_start_index=True,
-            separators=self.separators,
-        )
-
-        splits = splitter.split_documents(documents)
+        splits = self.splitter.split_documents(documents)
 
         # 元数据增强
         for i, split in enumerate(splits):
@@ -121,7 +122,11 @@ class SmallToBigSplitterOperator(SplitterOperator):
     实现方式：
     - 小块：用于向量化和检索
     - 大块：作为父文档，提供完整上下文
-    - 通过 metadata 维护父子关系
+    - 小块 metadata 中只保存 parent_chunk_id，父块文本单独存放在 parent_store 中，
+      通过 get_parent() 查询（避免同一父块文本在每个子块里重复存储、序列化）
+    - parent_chunk_id 为父块内容的哈希：跨进程、重复索引时保持稳定，不会与已入库的子块冲突
+    - 配置 parent_store_path 时，save_parents() / load_parents() 以 JSON 文件持久化 parent_store
+      （保存时与文件中已有的父块合并）
     """
 
     def __init__(self, config: Dict[str, Any] = None):
@@ -134,6 +139,21 @@ class SmallToBigSplitterOperator(SplitterOperator):
         self.big_chunk_size = self.config.get("big_chunk_size", 2000)
         self.big_chunk_overlap = self.config.get("big_chunk_overlap", 200)
 
+        # 父块存储：parent_chunk_id -> 父块文本
+        self.parent_store: Dict[str, str] = {}
+        self.parent_store_path = self.config.get("parent_store_path", None)
+
+        self.big_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.big_chunk_size,
+            chunk_overlap=self.big_chunk_overlap,
+            add_start_index=True,
+        )
+        self.small_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.small_chunk_size,
+            chunk_overlap=self.small_chunk_overlap,
+            add_start_index=True,
+        )
+
     def execute(self, documents: List[Document]) -> List[Document]:
         """
         执行 Small-to-Big 分块策略
@@ -145,31 +165,22 @@ class SmallToBigSplitterOperator(SplitterOperator):
             小块列表，每个小块的 metadata 中包含父块信息
         """
         # 1. 创建大块（父块）
-        big_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.big_chunk_size,
-            chunk_overlap=self.big_chunk_overlap,
-            add_start_index=True,
-        )
-        big_chunks = big_splitter.split_documents(documents)
+        big_chunks = self.big_splitter.split_documents(documents)
 
         # 2. 对每个大块再分割成小块
-        small_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.small_chunk_size,
-            chunk_overlap=self.small_chunk_overlap,
-            add_start_index=True,
-        )
-
         all_small_chunks = []
-        for big_chunk_id, big_chunk in enumerate(big_chunks):
+        for big_chunk in big_chunks:
+            big_chunk_id = hashlib.blake2b(big_chunk.page_content.encode("utf-8"), digest_size=8).hexdigest()
+            self.parent_store[big_chunk_id] = big_chunk.page_content
+
             # 分割成小块
-            small_chunks = small_splitter.split_documents([big_chunk])
+            small_chunks = self.small_splitter.split_documents([big_chunk])
 
             # 为每个小块添加父块信息
             for small_chunk_id, small_chunk in enumerate(small_chunks):
                 small_chunk.metadata.update({
                     "chunk_id": f"{big_chunk_id}_{small_chunk_id}",
                     "parent_chunk_id": big_chunk_id,
-                    "parent_chunk_content": big_chunk.page_content,  # 保存父块内容
                     "chunk_size": len(small_chunk.page_content),
                     "parent_chunk_size": len(big_chunk.page_content),
                     "splitter_type": "small_to_big",
@@ -180,6 +191,51 @@ class SmallToBigSplitterOperator(SplitterOperator):
         print(f"📊 Small-to-Big 策略：生成 {len(big_chunks)} 个父块，{len(all_small_chunks)} 个子块")
         return all_small_chunks
 
+    def get_parent(self, parent_chunk_id: str) -> Optional[str]:
+        """
+        查询父块文本
+
+        Args:
+            parent_chunk_id: 小块 metadata 中的 parent_chunk_id
+
+        Returns:
+            父块文本（不存在时返回 None）
+        """
+        return self.parent_store.get(parent_chunk_id)
+
+    def save_parents(self, path: Optional[str] = None):
+        """
+        将 parent_store 保存为 JSON 文件（与文件中已有的父块合并，已入库的子块仍能找到父块）
+
+        Args:
+            path: 文件路径（默认使用配置中的 parent_store_path，均未设置时不保存）
+        """
+        path = path or self.parent_store_path
+        if not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.parent_store = {**_json.loads(f.read()), **self.parent_store}
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(_json.dumps(self.parent_store))
+        print(f"   - 父块存储: {path}（{len(self.parent_store)} 个父块）")
+
+    def load_parents(self, path: Optional[str] = None):
+        """
+        从 JSON 文件加载 parent_store
+
+        Args:
+            path: 文件路径（默认使用配置中的 parent_store_path）
+        """
+        path = path or self.parent_store_path
+        if not path or not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            self.parent_store = _json.loads(f.read())
+
 
 class StructureAwareSplitterOperator(SplitterOperator):
     """
@@ -201,6 +257,12 @@ class StructureAwareSplitterOperator(SplitterOperator):
             "。",        # 中文句子
             ". ",        # 英文句子
         ]
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            add_start_index=True,
+            separators=self.separators,
+        )
 
     def execute(self, documents: List[Document]) -> List[Document]:
         """
@@ -212,14 +274,7 @@ class StructureAwareSplitterOperator(SplitterOperator):
         Returns:
             分块后的 Document 对象列表
         """
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            add_start_index=True,
-            separators=self.separators,
-        )
-
-        splits = splitter.split_documents(documents)
+        splits = self.splitter.split_documents(documents)
 
         # 元数据增强：尝试识别块的类型
         for i, split in enumerate(splits):
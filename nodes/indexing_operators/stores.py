@@ -3,7 +3,9 @@
 支持不同的向量数据库
 """
 
-from typing import List, Dict, Any, Optional
+import os
+import uuid
+from typing import Iterable, List, Dict, Any, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores import Chroma, FAISS
@@ -19,7 +21,10 @@ class StoreOperator(BaseOperator):
         self.vectorstore: Optional[VectorStore] = None
 
     def execute(
-        self, documents: List[Document], embedding_model: Embeddings
+        self,
+        documents: List[Document],
+        embedding_model: Embeddings,
+        embeddings: Optional[List[List[float]]] = None,
     ) -> VectorStore:
         """
         将文档向量化并存储到向量数据库
@@ -27,16 +32,118 @@ class StoreOperator(BaseOperator):
         Args:
             documents: Document 对象列表
             embedding_model: Embedding 模型
+            embeddings: （可选）预先计算好的向量，与 documents 一一对应；
+                        提供时直接写入，不再调用 embedding_model
 
         Returns:
             VectorStore 对象
         """
         raise NotImplementedError
 
+    def execute_streaming(
+        self,
+        batches: Iterable[Tuple[List[Document], List[List[float]]]],
+        embedding_model: Embeddings,
+    ) -> Optional[VectorStore]:
+        """
+        分批写入预先计算好的向量（流式索引使用）
+
+        第一批通过 execute() 创建向量库，之后的批次用 add_batch() 追加，全部写完后 persist()。
+
+        Args:
+            batches: (文档块列表, 向量列表) 的迭代器
+            embedding_model: Embedding 模型
+
+        Returns:
+            VectorStore 对象（没有任何文档时为 None）
+        """
+        self.vectorstore = None
+        for documents, embeddings in batches:
+            if self.vectorstore is None:
+                self.execute(documents, embedding_model, embeddings)
+            else:
+                self.add_batch(documents, embeddings)
+        if self.vectorstore is not None:
+            self.persist()
+        return self.vectorstore
+
+    def add_batch(self, documents: List[Document], embeddings: List[List[float]]):
+        """
+        向已创建的向量库追加一批预计算向量
+
+        Args:
+            documents: Document 对象列表
+            embeddings: 与 documents 一一对应的向量
+        """
+        self.vectorstore.add_embeddings(
+            text_embeddings=[(doc.page_content, vector) for doc, vector in zip(documents, embeddings)],
+            metadatas=[doc.metadata for doc in documents],
+        )
+
+    def persist(self):
+        """持久化向量库（默认不需要，如内存存储）"""
+
     def get_vectorstore(self) -> VectorStore:
         """获取向量数据库实例"""
         return self.vectorstore
 
+    @staticmethod
+    def _build_faiss(
+        documents: List[Document],
+        embedding_model: Embeddings,
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> FAISS:
+        """构建 FAISS 向量库（有预计算向量时跳过 embedding 调用）"""
+        if embeddings is None:
+            return FAISS.from_documents(
+                documents=documents,
+                embedding=embedding_model,
+            )
+
+        return FAISS.from_embeddings(
+            text_embeddings=[
+                (doc.page_content, vector) for doc, vector in zip(documents, embeddings)
+            ],
+            embedding=embedding_model,
+            metadatas=[doc.metadata for doc in documents],
+        )
+
+    @staticmethod
+    def _wrap_faiss_index(
+        index,
+        documents: List[Document],
+        embedding_model: Embeddings,
+        embeddings: List[List[float]],
+    ) -> FAISS:
+        """
+        用自定义的 faiss 索引构建 FAISS 向量库（内积度量，写入与查询时都做 L2 归一化）
+
+        Args:
+            index: 空的 faiss 索引（需要训练的索引应已训练）
+            documents: Document 对象列表
+            embedding_model: Embedding 模型（用于查询向量化）
+            embeddings: 与 documents 一一对应的向量
+
+        Returns:
+            FAISS VectorStore 对象
+        """
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores.utils import DistanceStrategy
+
+        vectorstore = FAISS(
+            embedding_function=embedding_model,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+            normalize_L2=True,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        )
+        vectorstore.add_embeddings(
+            text_embeddings=[(doc.page_content, vector) for doc, vector in zip(documents, embeddings)],
+            metadatas=[doc.metadata for doc in documents],
+        )
+        return vectorstore
+
 
 class ChromaStoreOperator(StoreOperator):
     """
@@ -47,36 +154,64 @@ class ChromaStoreOperator(StoreOperator):
         super().__init__(config)
         self.persist_directory = self.config.get("persist_directory", "./chroma_db")
         self.collection_name = self.config.get("collection_name", "default_collection")
+        self.batch_size = self.config.get("batch_size", 200)  # 每批写入的文档块数量（Chroma 推荐 100-250）
 
     def execute(
-        self, documents: List[Document], embedding_model: Embeddings
+        self,
+        documents: List[Document],
+        embedding_model: Embeddings,
+        embeddings: Optional[List[List[float]]] = None,
     ) -> VectorStore:
         """
         使用 Chroma 存储文档向量
 
+        文档块按 batch_size 分批写入：每批只调用一次 embed_documents
+        和一次 collection 写入，把逐条写入的事务开销摊薄到整批。
+
         Args:
             documents: Document 对象列表
             embedding_model: Embedding 模型
+            embeddings: （可选）预先计算好的向量
 
         Returns:
             Chroma VectorStore 对象
         """
         print(f"💾 正在使用 Chroma 存储 {len(documents)} 个文档块...")
 
-        self.vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=embedding_model,
+        self.vectorstore = Chroma(
             persist_directory=self.persist_directory,
+            embedding_function=embedding_model,
             collection_name=self.collection_name,
+            # 预计算向量由 IndexModule 统一 L2 归一化，标记在集合元数据上
+            collection_metadata={"normalized": True} if embeddings is not None else None,
         )
 
+        if embeddings is None:
+            for start in range(0, len(documents), self.batch_size):
+                self.vectorstore.add_documents(documents[start:start + self.batch_size])
+        else:
+            # add_batch 内部按 batch_size 分批写入
+            self.add_batch(documents, embeddings)
+
         print(f"✅ 向量数据库创建成功！")
         print(f"   - 存储路径: {self.persist_directory}")
         print(f"   - 集合名称: {self.collection_name}")
         print(f"   - 文档数量: {len(documents)}")
+        print(f"   - 写入批大小: {self.batch_size}")
 
         return self.vectorstore
 
+    def add_batch(self, documents: List[Document], embeddings: List[List[float]]):
+        """已有向量：直接写入 collection，避免重复调用 embedding 接口"""
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start:start + self.batch_size]
+            self.vectorstore._collection.upsert(
+                ids=[str(uuid.uuid4()) for _ in batch],
+                embeddings=embeddings[start:start + self.batch_size],
+                documents=[doc.page_content for doc in batch],
+                metadatas=[doc.metadata for doc in batch],
+            )
+
     def load_existing(self, embedding_model: Embeddings) -> VectorStore:
         """
         加载已存在的 Chroma 向量数据库
@@ -103,14 +238,87 @@ class FAISSStoreOperator(StoreOperator):
     """
     FAISS 向量数据库操作器
     （FAISS 适合大规模数据，性能更好）
+
+    index_type 为 faiss.index_factory 描述串：
+    - "Flat"（默认）：暴力检索，结果精确
+    - "HNSW32"：图索引，大规模语料下查询延迟远低于暴力检索
+    - "IVF1024,PQ64" 等：倒排 + 乘积量化，需要先用语料向量训练
+    非 Flat 索引使用内积度量（向量 L2 归一化后即余弦相似度）；
+    search_params 为查询参数（如 "nprobe=16"、"efSearch=64"），不随索引持久化，加载时重新设置。
+    （流式索引时需要训练的索引只用第一批向量训练，stream_batch_size 需足够大）
+
+    quantize=True 时以 int8 标量量化（SQ8）存储向量：内存和带宽降为 float32 的 1/4，
+    归一化向量的余弦排序几乎不受影响。
     """
 
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.index_path = self.config.get("index_path", "./faiss_index")
+        self.index_type = self._quantized_index_type(
+            self.config.get("index_type", "Flat"),
+            self.config.get("quantize", False),
+        )
+        self.search_params = self.config.get("search_params", None)
+        self.num_threads = self.config.get("num_threads", os.cpu_count())  # faiss 内部 OpenMP 线程数
+
+    @staticmethod
+    def _quantized_index_type(index_type: str, quantize: bool) -> str:
+        """
+        将 index_type 中的 float32 向量存储替换为 int8 标量量化（SQ8）
+
+        Args:
+            index_type: index_factory 描述串
+            quantize: 是否量化
+
+        Returns:
+            量化后的描述串（"Flat" -> "SQ8"，"HNSW32" -> "HNSW32,SQ8"，"IVF1024,Flat" -> "IVF1024,SQ8"）
+        """
+        if not quantize:
+            return index_type
+        if index_type == "Flat":
+            return "SQ8"
+        if index_type.endswith(",Flat"):
+            return index_type[:-len("Flat")] + "SQ8"
+        if index_type.startswith("HNSW") and "," not in index_type:
+            return f"{index_type},SQ8"
+        print(f"⚠️  index_type={index_type} 已使用压缩编码，忽略 quantize")
+        return index_type
+
+    def _build_index(self, embeddings: List[List[float]]):
+        """
+        按 index_type 创建 faiss 索引，需要训练时用语料向量训练
+
+        Args:
+            embeddings: 语料向量
+
+        Returns:
+            空的（已训练的）faiss 索引
+        """
+        import faiss
+        import numpy as np
+
+        faiss.omp_set_num_threads(self.num_threads)
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        index = faiss.index_factory(vectors.shape[1], self.index_type, faiss.METRIC_INNER_PRODUCT)
+        if not index.is_trained:
+            print(f"   - 训练 {self.index_type} 索引（{len(vectors)} 个向量）...")
+            index.train(vectors)
+        self._apply_search_params(index)
+        return index
+
+    def _apply_search_params(self, index):
+        """设置查询参数（nprobe / efSearch 等）"""
+        if self.search_params:
+            import faiss
+            faiss.ParameterSpace().set_index_parameters(index, self.search_params)
 
     def execute(
-        self, documents: List[Document], embedding_model: Embeddings
+        self,
+        documents: List[Document],
+        embedding_model: Embeddings,
+        embeddings: Optional[List[List[float]]] = None,
     ) -> VectorStore:
         """
         使用 FAISS 存储文档向量
@@ -118,16 +326,20 @@ class FAISSStoreOperator(StoreOperator):
         Args:
             documents: Document 对象列表
             embedding_model: Embedding 模型
+            embeddings: （可选）预先计算好的向量
 
         Returns:
             FAISS VectorStore 对象
         """
-        print(f"💾 正在使用 FAISS 存储 {len(documents)} 个文档块...")
+        print(f"💾 正在使用 FAISS ({self.index_type}) 存储 {len(documents)} 个文档块...")
 
-        self.vectorstore = FAISS.from_documents(
-            documents=documents,
-            embedding=embedding_model,
-        )
+        if self.index_type == "Flat":
+            self.vectorstore = self._build_faiss(documents, embedding_model, embeddings)
+        else:
+            if embeddings is None:
+                embeddings = embedding_model.embed_documents([doc.page_content for doc in documents])
+            index = self._build_index(embeddings)
+            self.vectorstore = self._wrap_faiss_index(index, documents, embedding_model, embeddings)
 
         # 保存索引
         self.vectorstore.save_local(self.index_path)
@@ -138,6 +350,10 @@ class FAISSStoreOperator(StoreOperator):
 
         return self.vectorstore
 
+    def persist(self):
+        """保存索引"""
+        self.vectorstore.save_local(self.index_path)
+
     def load_existing(self, embedding_model: Embeddings) -> VectorStore:
         """
         加载已存在的 FAISS 向量数据库
@@ -148,13 +364,114 @@ class FAISSStoreOperator(StoreOperator):
         Returns:
             FAISS VectorStore 对象
         """
+        from langchain_community.vectorstores.utils import DistanceStrategy
+
         print(f"📂 正在加载已存在的 FAISS 索引...")
 
+        if self.index_type == "Flat":
+            self.vectorstore = FAISS.load_local(
+                self.index_path,
+                embedding_model,
+                allow_dangerous_deserialization=True,  # FAISS 需要此参数
+            )
+        else:
+            self.vectorstore = FAISS.load_local(
+                self.index_path,
+                embedding_model,
+                allow_dangerous_deserialization=True,
+                normalize_L2=True,
+                distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+            )
+            self._apply_search_params(self.vectorstore.index)
+
+        print(f"✅ 向量数据库加载成功！")
+        return self.vectorstore
+
+
+class FAISSHNSWStoreOperator(FAISSStoreOperator):
+    """
+    FAISS HNSW 向量数据库操作器
+    （图索引近似最近邻检索，大规模语料下查询延迟远低于暴力检索）
+
+    写入时对向量做 L2 归一化，余弦相似度即等价于内积，
+    因此索引使用内积度量（METRIC_INNER_PRODUCT）。
+    quantize=True 时图节点以 int8 标量量化存储（HNSW{M},SQ8）。
+    """
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self.index_path = self.config.get("index_path", "./faiss_hnsw_index")
+        self.m = self.config.get("m", 32)  # 每个节点的邻居数
+        self.ef_construction = self.config.get("ef_construction", 200)  # 建图时的候选队列长度
+        self.ef_search = self.config.get("ef_search", 64)  # 查询时的候选队列长度（越大召回越高、越慢）
+        self.index_type = self._quantized_index_type(f"HNSW{self.m}", self.config.get("quantize", False))
+
+    def execute(
+        self,
+        documents: List[Document],
+        embedding_model: Embeddings,
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> VectorStore:
+        """
+        使用 FAISS HNSW 索引存储文档向量
+
+        Args:
+            documents: Document 对象列表
+            embedding_model: Embedding 模型
+            embeddings: （可选）预先计算好的向量
+
+        Returns:
+            FAISS VectorStore 对象
+        """
+        if not documents:
+            raise ValueError("FAISS HNSW 索引至少需要一个文档块")
+
+        print(f"💾 正在使用 FAISS HNSW ({self.index_type}) 存储 {len(documents)} 个文档块...")
+
+        if embeddings is None:
+            embeddings = embedding_model.embed_documents([doc.page_content for doc in documents])
+
+        # 量化时需要用语料向量训练 SQ8 编码器，由 _build_index 负责
+        index = self._build_index(embeddings)
+        index.hnsw.efConstruction = self.ef_construction
+        index.hnsw.efSearch = self.ef_search
+
+        # 写入与查询时都做 L2 归一化
+        self.vectorstore = self._wrap_faiss_index(index, documents, embedding_model, embeddings)
+
+        # 保存索引（内部使用 faiss.write_index）
+        self.vectorstore.save_local(self.index_path)
+
+        print(f"✅ 向量数据库创建成功！")
+        print(f"   - 存储路径: {self.index_path}")
+        print(f"   - 文档数量: {len(documents)}")
+        print(f"   - HNSW 参数: M={self.m}, efConstruction={self.ef_construction}, efSearch={self.ef_search}")
+
+        return self.vectorstore
+
+    def load_existing(self, embedding_model: Embeddings) -> VectorStore:
+        """
+        加载已存在的 FAISS HNSW 索引
+
+        Args:
+            embedding_model: Embedding 模型
+
+        Returns:
+            FAISS VectorStore 对象
+        """
+        from langchain_community.vectorstores.utils import DistanceStrategy
+
+        print(f"📂 正在加载已存在的 FAISS HNSW 索引...")
+
         self.vectorstore = FAISS.load_local(
             self.index_path,
             embedding_model,
             allow_dangerous_deserialization=True,  # FAISS 需要此参数
+            normalize_L2=True,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
         )
+        # 索引文件中保存的是建库时的 efSearch，加载后以当前配置为准
+        self.vectorstore.index.hnsw.efSearch = self.ef_search
 
         print(f"✅ 向量数据库加载成功！")
         return self.vectorstore
@@ -167,7 +484,10 @@ class InMemoryStoreOperator(StoreOperator):
     """
 
     def execute(
-        self, documents: List[Document], embedding_model: Embeddings
+        self,
+        documents: List[Document],
+        embedding_model: Embeddings,
+        embeddings: Optional[List[List[float]]] = None,
     ) -> VectorStore:
         """
         使用内存存储文档向量（使用 FAISS，不持久化）
@@ -175,16 +495,14 @@ class InMemoryStoreOperator(StoreOperator):
         Args:
             documents: Document 对象列表
             embedding_model: Embedding 模型
+            embeddings: （可选）预先计算好的向量
 
         Returns:
             FAISS VectorStore 对象（内存）
         """
         print(f"💾 正在使用内存存储 {len(documents)} 个文档块...")
 
-        self.vectorstore = FAISS.from_documents(
-            documents=documents,
-            embedding=embedding_model,
-        )
+        self.vectorstore = self._build_faiss(documents, embedding_model, embeddings)
 
         print(f"✅ 内存向量数据库创建成功！（数据不会持久化）")
         print(f"   - 文档数量: {len(documents)}")
@@ -32,6 +32,9 @@
    - Redundancy: 冗余过滤
    - Quality: 质量过滤
    - Contradiction: 矛盾过滤
+
+4. Fused（融合）
+   - 重排序 + 去冗余 + 压缩一次遍历完成，共享向量和相似度矩阵
 """
 
 from typing import List, Dict, Any
@@ -48,6 +51,7 @@ from .post_retrieval_operators import (
     SelectionOperator,
     RelevanceFilterOperator,
     RedundancyFilterOperator,
+    FusedPostRetrievalOperator,
 )
 
 
@@ -109,6 +113,10 @@ class PostRetrievalModule:
         elif strategy == "redundancy_filter":
             return RedundancyFilterOperator(self.config)
 
+        # Fused（重排序 + 去冗余 + 压缩）
+        elif strategy == "fused":
+            return FusedPostRetrievalOperator(self.config)
+
         # 默认
         else:
             print(f"⚠️  未知的策略: {strategy}，使用默认的 Rerank")
@@ -5,6 +5,7 @@ Post-Retrieval Operators 包
 1. Rerank（重排序）
 2. Compression（压缩）
 3. Selection（选择/过滤）
+4. Fused（重排序 + 去冗余 + 压缩 融合为一次遍历）
 """
 
 from .base import BasePostRetrievalOperator
@@ -23,6 +24,7 @@ from .selection import (
     RelevanceFilterOperator,
     RedundancyFilterOperator,
 )
+from .fused import FusedPostRetrievalOperator
 
 __all__ = [
     "BasePostRetrievalOperator",
@@ -35,4 +37,5 @@ __all__ = [
     "SelectionOperator",
     "RelevanceFilterOperator",
     "RedundancyFilterOperator",
+    "FusedPostRetrievalOperator",
 ]
@@ -12,6 +12,7 @@ from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_qwq import ChatQwen
+from .._http import http_clients
 from .base import BasePostRetrievalOperator
 
 
@@ -163,6 +164,7 @@ class SummaryCompressionOperator(BasePostRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def process(self, documents: List[Document], query: str = None) -> List[Document]:
@@ -0,0 +1,132 @@
+"""
+Fused Post-Retrieval Operator（融合检索后处理）
+
+把常见的 重排序 → 冗余过滤 → 压缩 三步流水线融合为一次遍历：
+- 查询向量、文档向量只计算一次
+- 文档×查询 相关性分数用于重排序，文档×文档 相似度矩阵用于去冗余
+- 压缩阶段直接复用已选中的文档，不再重复构造中间列表
+"""
+
+import re
+from typing import List, Dict, Any, Set
+
+import numpy as np
+from langchain_core.documents import Document
+from .base import BasePostRetrievalOperator
+from .similarity import embed_documents, normalize_rows, similarity_matrix
+
+# 句子切分：保留句末标点
+_SENTENCE_SPLIT = re.compile(r"(?<=[。！？!?；;])")
+
+
+class FusedPostRetrievalOperator(BasePostRetrievalOperator):
+    """
+    融合检索后处理操作器
+
+    功能：
+    - 按 embedding 余弦相似度重排序
+    - 与已保留文档过于相似的文档直接跳过（冗余过滤）
+    - 对保留的文档做句子级抽取压缩
+
+    应用场景：
+    - 替代 rerank + redundancy_filter + context_compression 的流水线
+    - 减少重复的 embedding 调用和相似度计算
+    """
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self.top_n = self.config.get("top_n", 5)
+        self.similarity_threshold = self.config.get("similarity_threshold", 0.85)
+        self.compression_ratio = self.config.get("compression_ratio", 0.5)
+        self.min_length = self.config.get("min_length", 200)  # 短于此长度的文档不压缩
+        self.embedding_model = self.config.get("embedding_model", None)
+
+    def process(self, documents: List[Document], query: str = None) -> List[Document]:
+        """
+        一次遍历完成重排序、去冗余和压缩
+
+        Args:
+            documents: 文档列表
+            query: 原始查询（必需）
+
+        Returns:
+            处理后的文档列表
+        """
+        if not documents:
+            return []
+
+        if self.embedding_model is None or not query:
+            print("⚠️  Fused Post-Retrieval 需要 embedding_model 和查询，仅保留前 top_n 个文档")
+            return documents[:self.top_n]
+
+        print(f"⚡ Fused Post-Retrieval: 重排序 → 去冗余 → 压缩 {len(documents)} 个文档...")
+
+        # 向量只计算一次（检索阶段已附加向量时直接复用）
+        doc_vectors = embed_documents(documents, self.embedding_model)
+        query_vector = normalize_rows([self.embedding_model.embed_query(query)])[0]
+
+        # 1. 重排序：文档×查询 相关性
+        scores = doc_vectors @ query_vector
+        order = np.argsort(-scores)
+
+        # 2. 去冗余：按相关性顺序贪心选择，复用 文档×文档 相似度矩阵
+        similarities = similarity_matrix(doc_vectors)
+        kept = []
+        for idx in order:
+            if kept and similarities[idx, kept].max() >= self.similarity_threshold:
+                continue
+            kept.append(int(idx))
+            if len(kept) >= self.top_n:
+                break
+
+        # 3. 压缩：句子级抽取
+        query_words = set(query.lower().split())
+        processed_docs = []
+        for idx in kept:
+            doc = documents[idx]
+            content = self._compress_content(doc.page_content, query_words)
+
+            new_doc = Document(page_content=content, metadata=doc.metadata.copy())
+            new_doc.metadata["relevance_score"] = float(scores[idx])
+            new_doc.metadata["original_length"] = len(doc.page_content)
+            new_doc.metadata["compressed_length"] = len(content)
+            processed_docs.append(new_doc)
+
+        print(f"   ✓ 融合处理完成，保留 {len(processed_docs)}/{len(documents)} 个文档")
+
+        return processed_docs
+
+    def _compress_content(self, content: str, query_words: Set[str]) -> str:
+        """
+        按句子与查询的词重叠选择句子，直到达到目标长度（保持原文顺序）
+
+        Args:
+            content: 原始内容
+            query_words: 查询词集合
+
+        Returns:
+            压缩后的内容
+        """
+        target_length = max(int(len(content) * self.compression_ratio), self.min_length)
+        if len(content) <= target_length:
+            return content
+
+        sentences = [s for s in _SENTENCE_SPLIT.split(content) if s.strip()]
+        scored = sorted(
+            range(len(sentences)),
+            key=lambda i: len(query_words & set(sentences[i].lower().split())),
+            reverse=True,
+        )
+
+        selected = []
+        current_length = 0
+        for i in scored:
+            if current_length + len(sentences[i]) > target_length:
+                continue
+            selected.append(i)
+            current_length += len(sentences[i])
+
+        if not selected:
+            return content[:target_length]
+
+        return "".join(sentences[i] for i in sorted(selected))
@@ -8,11 +8,77 @@ Rerank Operators（重排序）
 """
 
 from typing import List, Dict, Any
+
+import numpy as np
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_qwq import ChatQwen
+from .._http import http_clients
 from .base import BasePostRetrievalOperator
+from .similarity import embed_documents, has_embeddings, normalize_rows, similarity_matrix
+
+try:
+    from numba import njit
+except ImportError:  # numba 为可选依赖，缺失时按普通 Python 函数执行
+    njit = None
+
+
+def _jit(func):
+    return njit(cache=True, fastmath=True)(func) if njit is not None else func
+
+
+@_jit
+def mmr_select(sim_dd: np.ndarray, k: int, diversity_weight: float) -> np.ndarray:
+    """
+    MMR 式贪心选择内核（有 numba 时 JIT 编译为机器码）
+
+    相关性按候选在剩余列表中的位置递减（检索结果已按相关性排序），
+    多样性为 1 - 与已选文档的最小相似度。每轮选中文档后只用其一列
+    增量更新各候选的最小相似度，不再对已选文档逐对重算。
+
+    Args:
+        sim_dd: 文档×文档 相似度矩阵，形状 (n, n)
+        k: 需要选出的文档数量（1 ≤ k ≤ n）
+        diversity_weight: 多样性权重
+
+    Returns:
+        选中文档的下标（按选择顺序）
+    """
+    n = sim_dd.shape[0]
+    order = np.empty(k, dtype=np.int64)
+    available = np.ones(n, dtype=np.bool_)
+    min_sim = np.ones(n, dtype=np.float32)
+
+    # 先选择第一个（最相关的）
+    order[0] = 0
+    available[0] = False
+    min_sim = np.minimum(min_sim, sim_dd[:, 0])
+
+    for step in range(1, k):
+        remaining = n - step
+        best_idx = -1
+        best_score = -np.inf
+        position = 0
+        for j in range(n):
+            if not available[j]:
+                continue
+            relevance_score = 1.0 - position / remaining
+            diversity_score = 1.0 - min_sim[j]
+            combined_score = (
+                (1 - diversity_weight) * relevance_score +
+                diversity_weight * diversity_score
+            )
+            if combined_score > best_score:
+                best_score = combined_score
+                best_idx = j
+            position += 1
+
+        order[step] = best_idx
+        available[best_idx] = False
+        min_sim = np.minimum(min_sim, sim_dd[:, best_idx])
+
+    return order
 
 
 class RerankOperator(BasePostRetrievalOperator):
@@ -23,6 +89,8 @@ class RerankOperator(BasePostRetrievalOperator):
     - 基于相似度分数重排序
     - 将最相关的文档放在前面和后面（避免 Lost in the middle）
     - 简单高效
+    - （可选）配置 embedding_model 时先按 向量×查询 相似度重新打分，
+      适合在 BM25 等稀疏检索召回之后做稠密精排
 
     应用场景：
     - 快速重排序
@@ -33,6 +101,7 @@ class RerankOperator(BasePostRetrievalOperator):
         super().__init__(config)
         self.top_n = self.config.get("top_n", None)  # 只保留前 N 个
         self.reverse_order = self.config.get("reverse_order", False)  # 是否反转顺序
+        self.embedding_model = self.config.get("embedding_model", None)  # 提供时按向量相似度重新打分
 
     def process(self, documents: List[Document], query: str = None) -> List[Document]:
         """
@@ -50,6 +119,9 @@ class RerankOperator(BasePostRetrievalOperator):
 
         print(f"🔄 Rerank: 重排序 {len(documents)} 个文档...")
 
+        if self.embedding_model is not None and query:
+            documents = self._rescore_by_embedding(documents, query)
+
         # 假设文档已经按相关性排序（来自检索器）
         # 策略：将最相关的放在首尾，避免 "Lost in the middle"
         reranked = self._reorder_for_llm(documents)
@@ -68,6 +140,26 @@ class RerankOperator(BasePostRetrievalOperator):
 
         return reranked
 
+    def _rescore_by_embedding(self, documents: List[Document], query: str) -> List[Document]:
+        """
+        按 文档×查询 向量相似度重新排序（只对召回的少量文档计算）
+
+        Args:
+            documents: 文档列表
+            query: 原始查询
+
+        Returns:
+            按相似度降序排列的文档副本（metadata 中带 rerank_score，不修改输入文档）
+        """
+        doc_vectors = embed_documents(documents, self.embedding_model)
+        query_vector = normalize_rows([self.embedding_model.embed_query(query)])[0]
+        scores = doc_vectors @ query_vector
+
+        return [
+            documents[i].model_copy(update={"metadata": {**documents[i].metadata, "rerank_score": float(scores[i])}})
+            for i in np.argsort(-scores, kind="stable")
+        ]
+
     def _reorder_for_llm(self, documents: List[Document]) -> List[Document]:
         """
         重新排序以优化 LLM 感知
@@ -123,6 +215,7 @@ class DiversityRerankOperator(BasePostRetrievalOperator):
         super().__init__(config)
         self.diversity_weight = self.config.get("diversity_weight", 0.5)
         self.top_n = self.config.get("top_n", None)
+        self.embedding_model = self.config.get("embedding_model", None)  # 提供时使用向量余弦相似度，否则使用词重叠
 
     def process(self, documents: List[Document], query: str = None) -> List[Document]:
         """
@@ -140,81 +233,40 @@ class DiversityRerankOperator(BasePostRetrievalOperator):
 
         print(f"🌈 Diversity Rerank: 重排序 {len(documents)} 个文档（多样性权重: {self.diversity_weight}）...")
 
-        selected = []
-        remaining = documents.copy()
-
-        # 先选择第一个（最相关的）
-        selected.append(remaining.pop(0))
-
-        # 迭代选择，平衡相关性和多样性
-        while remaining:
-            best_idx = self._select_next(selected, remaining)
-            selected.append(remaining.pop(best_idx))
-
-        # 限制数量
-        if self.top_n and self.top_n < len(selected):
-            selected = selected[:self.top_n]
+        # 相似度矩阵只计算一次，选择循环交给 mmr_select 内核
+        sim_dd = self._similarity_matrix(documents)
+        k = min(self.top_n, len(documents)) if self.top_n else len(documents)
+        order = mmr_select(sim_dd, k, float(self.diversity_weight))
+        selected = [documents[i] for i in order]
 
         print(f"   ✓ 多样性重排序完成")
 
         return selected
 
-    def _select_next(self, selected: List[Document], remaining: List[Document]) -> int:
+    def _similarity_matrix(self, documents: List[Document]) -> np.ndarray:
         """
-        选择下一个文档（平衡相关性和多样性）
+        计算文档两两之间的相似度矩阵
 
-        Args:
-            selected: 已选择的文档
-            remaining: 剩余的文档
-
-        Returns:
-            下一个应选择的文档索引
-        """
-        best_idx = 0
-        best_score = -float('inf')
-
-        for idx, doc in enumerate(remaining):
-            # 相关性分数（假设按顺序递减）
-            relevance_score = 1.0 - (idx / len(remaining))
-
-            # 多样性分数（与已选择文档的差异）
-            diversity_score = self._calculate_diversity(doc, selected)
-
-            # 综合分数
-            combined_score = (
-                (1 - self.diversity_weight) * relevance_score +
-                self.diversity_weight * diversity_score
-            )
-
-            if combined_score > best_score:
-                best_score = combined_score
-                best_idx = idx
-
-        return best_idx
-
-    def _calculate_diversity(self, doc: Document, selected: List[Document]) -> float:
-        """
-        计算文档与已选择文档的多样性
+        有向量时为归一化向量的内积（一次矩阵乘法），否则为词重叠相似度
 
         Args:
-            doc: 候选文档
-            selected: 已选择的文档列表
+            documents: 文档列表
 
         Returns:
-            多样性分数（0-1）
+            形状为 (n, n) 的 float32 连续矩阵
         """
-        if not selected:
-            return 1.0
+        if self.embedding_model or has_embeddings(documents):
+            vectors = embed_documents(documents, self.embedding_model)
+            return np.ascontiguousarray(similarity_matrix(vectors), dtype=np.float32)
 
-        # 简单的多样性度量：内容相似度的倒数
-        min_similarity = 1.0
-
-        for sel_doc in selected:
-            similarity = self._simple_similarity(doc.page_content, sel_doc.page_content)
-            min_similarity = min(min_similarity, similarity)
-
-        # 多样性 = 1 - 最大相似度
-        return 1.0 - min_similarity
+        n = len(documents)
+        matrix = np.ones((n, n), dtype=np.float32)
+        for i in range(n):
+            for j in range(i + 1, n):
+                matrix[i, j] = matrix[j, i] = self._simple_similarity(
+                    documents[i].page_content, documents[j].page_content
+                )
+        return matrix
 
     def _simple_similarity(self, text1: str, text2: str) -> float:
         """
@@ -264,6 +316,7 @@ class LLMRerankOperator(BasePostRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def process(self, documents: List[Document], query: str = None) -> List[Document]:
@@ -12,7 +12,9 @@ from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_qwq import ChatQwen
+from .._http import http_clients
 from .base import BasePostRetrievalOperator
+from .similarity import embed_documents, has_embeddings, similarity_matrix
 
 
 class SelectionOperator(BasePostRetrievalOperator):
@@ -81,6 +83,7 @@ class RelevanceFilterOperator(BasePostRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def process(self, documents: List[Document], query: str = None) -> List[Document]:
@@ -101,6 +104,11 @@ class RelevanceFilterOperator(BasePostRetrievalOperator):
             print("⚠️  Relevance Filter 需要查询，返回所有文档")
             return documents
 
+        # 范围检索（strategy="range"）返回的文档已在索引内按相似度阈值筛选过
+        if all("range_score" in doc.metadata for doc in documents):
+            print(f"🎯 Relevance Filter: {len(documents)} 个文档已由范围检索按阈值筛选，跳过")
+            return documents
+
         print(f"🎯 Relevance Filter: 过滤 {len(documents)} 个文档（阈值: {self.relevance_threshold}）...")
 
         filtered_docs = []
@@ -177,6 +185,7 @@ class RedundancyFilterOperator(BasePostRetrievalOperator):
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.similarity_threshold = self.config.get("similarity_threshold", 0.85)
+        self.embedding_model = self.config.get("embedding_model", None)  # 提供时使用向量余弦相似度，否则使用词重叠
 
     def process(self, documents: List[Document], query: str = None) -> List[Document]:
         """
@@ -194,31 +203,80 @@ class RedundancyFilterOperator(BasePostRetrievalOperator):
 
         print(f"🔍 Redundancy Filter: 检测冗余文档（阈值: {self.similarity_threshold}）...")
 
-        filtered_docs = []
-        filtered_docs.append(documents[0])  # 保留第一个
+        if self.embedding_model or has_embeddings(documents):
+            kept_indices = self._filter_by_vectors(documents)
+        else:
+            kept_indices = self._filter_by_words(documents)
 
-        for i, doc in enumerate(documents[1:], 2):
+        filtered_docs = [documents[i] for i in kept_indices]
+
+        print(f"   ✓ 冗余过滤完成，保留 {len(filtered_docs)}/{len(documents)} 个文档")
+
+        return filtered_docs
+
+    def _filter_by_vectors(self, documents: List[Document]) -> List[int]:
+        """
+        基于向量余弦相似度去重
+
+        所有两两相似度由一次矩阵乘法得到，之后每个文档只需一次
+        向量化的行切片比较，不再有 O(N²) 的 Python 内层循环。
+
+        Args:
+            documents: 文档列表
+
+        Returns:
+            保留的文档下标列表
+        """
+        vectors = embed_documents(documents, self.embedding_model)
+        similarities = similarity_matrix(vectors)
+
+        kept_indices = [0]  # 保留第一个
+
+        for i in range(1, len(documents)):
+            # 与已保留文档的最大相似度
+            row = similarities[i, kept_indices]
+            max_similarity = float(row.max())
+
+            if max_similarity >= self.similarity_threshold:
+                print(f"   ✗ 文档 {i + 1}: 冗余（相似度: {max_similarity:.2f}）")
+            else:
+                kept_indices.append(i)
+                print(f"   ✓ 文档 {i + 1}: 保留")
+
+        return kept_indices
+
+    def _filter_by_words(self, documents: List[Document]) -> List[int]:
+        """
+        基于词重叠去重（没有可用向量时使用）
+
+        Args:
+            documents: 文档列表
+
+        Returns:
+            保留的文档下标列表
+        """
+        kept_indices = [0]  # 保留第一个
+
+        for i in range(1, len(documents)):
             # 检查与已选择文档的相似度
             is_redundant = False
 
-            for selected_doc in filtered_docs:
+            for j in kept_indices:
                 similarity = self._calculate_similarity(
-                    doc.page_content,
-                    selected_doc.page_content
+                    documents[i].page_content,
+                    documents[j].page_content
                 )
 
                 if similarity >= self.similarity_threshold:
                     is_redundant = True
-                    print(f"   ✗ 文档 {i}: 冗余（相似度: {similarity:.2f}）")
+                    print(f"   ✗ 文档 {i + 1}: 冗余（相似度: {similarity:.2f}）")
                     break
 
             if not is_redundant:
-                filtered_docs.append(doc)
-                print(f"   ✓ 文档 {i}: 保留")
-
-        print(f"   ✓ 冗余过滤完成，保留 {len(filtered_docs)}/{len(documents)} 个文档")
+                kept_indices.append(i)
+                print(f"   ✓ 文档 {i + 1}: 保留")
 
-        return filtered_docs
+        return kept_indices
 
     def _calculate_similarity(self, text1: str, text2: str) -> float:
         """
@@ -373,6 +431,7 @@ class ContradictionFilterOperator(BasePostRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def process(self, documents: List[Document], query: str = None) -> List[Document]:
@@ -0,0 +1,122 @@
+"""
+向量相似度工具
+
+为冗余过滤、多样性重排序等操作器提供基于 embedding 的余弦相似度计算。
+向量统一先做 L2 归一化，之后余弦相似度即为内积。
+安装了 simsimd 时使用其 SIMD 内核（AVX-512 / NEON 自动分派），否则退回 numpy。
+"""
+
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+try:
+    import simsimd
+except ImportError:  # simsimd 为可选依赖
+    simsimd = None
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    对矩阵按行做 L2 归一化（归一化后余弦相似度即为内积）
+
+    Args:
+        matrix: 形状为 (n, dim) 的向量矩阵
+
+    Returns:
+        float32 归一化矩阵
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def embedding_model_id(embedding_model: Embeddings) -> str:
+    """Embedding 模型标识（类名 + 模型名），检索阶段随向量记录在 doc.metadata["_embedding_model"]"""
+    name = getattr(embedding_model, "model", None) or getattr(embedding_model, "model_name", None) or ""
+    return f"{type(embedding_model).__name__}:{name}"
+
+
+def _has_reusable_embedding(doc: Document, model_id: Optional[str]) -> bool:
+    """文档附带的向量能否与 model_id 对应模型的向量比较（model_id 为 None 时只比较文档之间，任何向量都可复用）"""
+    if "_embedding" not in doc.metadata:
+        return False
+    return model_id is None or doc.metadata.get("_embedding_model") == model_id
+
+
+def has_embeddings(documents: List[Document], embedding_model: Optional[Embeddings] = None) -> bool:
+    """
+    文档是否都已附带检索阶段的向量（doc.metadata["_embedding"]）
+
+    Args:
+        documents: 文档列表
+        embedding_model: 要与之比较的 embedding 模型（提供时只认同一模型产生的向量）
+
+    Returns:
+        是否都可直接复用
+    """
+    model_id = embedding_model_id(embedding_model) if embedding_model is not None else None
+    return bool(documents) and all(_has_reusable_embedding(doc, model_id) for doc in documents)
+
+
+def embed_documents(documents: List[Document], embedding_model: Optional[Embeddings]) -> np.ndarray:
+    """
+    获取文档向量矩阵，并一次性归一化
+
+    优先复用检索阶段附加的 doc.metadata["_embedding"]（须由同一模型产生，
+    否则向量空间 / 维度不同无法比较），只对缺少向量的文档批量调用一次 embedding 模型。
+
+    Args:
+        documents: 文档列表
+        embedding_model: Embedding 模型（所有文档都已附带向量时可为 None）
+
+    Returns:
+        形状为 (n, dim) 的归一化向量矩阵
+    """
+    model_id = embedding_model_id(embedding_model) if embedding_model is not None else None
+    vectors = [
+        doc.metadata["_embedding"] if _has_reusable_embedding(doc, model_id) else None
+        for doc in documents
+    ]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+    if missing:
+        if embedding_model is None:
+            raise ValueError("部分文档缺少向量，且未提供 embedding_model")
+        embedded = embedding_model.embed_documents([documents[i].page_content for i in missing])
+        for i, vector in zip(missing, embedded):
+            vectors[i] = vector
+
+    return normalize_rows(vectors)
+
+
+def similarity_matrix(vectors: np.ndarray) -> np.ndarray:
+    """
+    计算归一化向量两两之间的余弦相似度（一次矩阵乘法，交给 BLAS）
+
+    Args:
+        vectors: 形状为 (n, dim) 的归一化向量矩阵
+
+    Returns:
+        形状为 (n, n) 的相似度矩阵
+    """
+    return vectors @ vectors.T
+
+
+def inner_product(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    计算两个归一化向量的余弦相似度（即内积，无需再除以范数）
+
+    Args:
+        a: 归一化向量 a
+        b: 归一化向量 b
+
+    Returns:
+        余弦相似度（-1 到 1）
+    """
+    if simsimd is not None:
+        return float(simsimd.dot(a, b))
+    return float(np.dot(a, b))
@@ -25,7 +25,9 @@
    - Metadata Filter: 提取过滤条件
 """
 
+import asyncio
 from typing import List, Dict, Any, Union, Optional
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
 from .pre_retrieval_operators import (
     BasePreRetrievalOperator,
     MultiQueryOperator,
@@ -72,6 +74,12 @@ class PreRetrievalModule:
         self.strategy = self.config.get("strategy", "query_rewrite")
         self.operator = self._init_operator()
 
+        # 异步批量处理：同时在途的 LLM 请求数 + 失败重试次数（指数退避）
+        self.max_concurrency = self.config.get("max_concurrency", 8)
+        self.max_retries = self.config.get("max_retries", 3)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+
     def _init_operator(self) -> BasePreRetrievalOperator:
         """根据策略初始化 operator"""
         strategy = self.strategy.lower()
@@ -141,6 +149,12 @@ class PreRetrievalModule:
         Returns:
             优化后的查询列表
         """
+        # 支持批量请求的策略（multi_query / sub_query）：多个查询合并到同一次 LLM 调用
+        if hasattr(self.operator, "execute_many") and len(queries) > 1:
+            if verbose:
+                print(f"\n批量处理 {len(queries)} 个查询")
+            return self.operator.execute_many(queries)
+
         results = []
         for i, query in enumerate(queries, 1):
             if verbose:
@@ -150,6 +164,61 @@ class PreRetrievalModule:
 
         return results
 
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """获取当前事件循环下的并发信号量（信号量不能跨事件循环复用）"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def aprocess(self, query: str, verbose: bool = False) -> Union[str, List[str], Dict[str, Any]]:
+        """
+        异步处理查询
+
+        并发数受 max_concurrency 限制；调用失败时按指数退避重试 max_retries 次。
+
+        Args:
+            query: 原始查询
+            verbose: 是否打印详细信息
+
+        Returns:
+            优化后的查询（可能是单个字符串、列表或字典）
+        """
+        async with self._get_semaphore():
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.max_retries),
+                wait=wait_exponential(multiplier=0.5, max=8),
+                reraise=True,
+            ):
+                with attempt:
+                    result = await self.operator.aexecute(query)
+
+        if verbose:
+            print(f"🔧 {self.strategy}: {query} -> {result}")
+
+        return result
+
+    async def aprocess_batch(
+        self, queries: List[str], verbose: bool = False
+    ) -> List[Union[str, List[str], Dict[str, Any]]]:
+        """
+        异步批量处理查询（并发发出请求，结果与输入顺序一致）
+
+        相同的查询只处理一次，结果分发给所有重复的位置。
+
+        Args:
+            queries: 查询列表
+            verbose: 是否打印详细信息
+
+        Returns:
+            优化后的查询列表
+        """
+        unique = list(dict.fromkeys(queries))
+        results = await asyncio.gather(*(self.aprocess(q, verbose=verbose) for q in unique))
+        by_query = dict(zip(unique, results))
+        return [by_query[q] for q in queries]
+
     def change_strategy(self, new_strategy: str, new_config: Dict[str, Any] = None):
         """
         动态更换优化策略
@@ -241,9 +310,7 @@ class PreRetrievalPipeline:
 
             next_queries = []
 
-            for q in current_queries:
-                result = step.process(q, verbose=False)
-
+            for result in step.process_batch(current_queries, verbose=False):
                 # 处理不同类型的返回值
                 if isinstance(result, list):
                     next_queries.extend(result)
@@ -2,6 +2,7 @@
 Pre-Retrieval Operator 基类
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Union
 
@@ -36,5 +37,20 @@ class BasePreRetrievalOperator(ABC):
         """
         pass
 
+    async def aexecute(self, query: str) -> Union[str, List[str]]:
+        """
+        异步执行查询优化
+
+        默认把同步的 execute（阻塞的 LLM 调用）放到线程中执行，
+        多个查询并发时网络往返可以重叠。
+
+        Args:
+            query: 原始查询
+
+        Returns:
+            优化后的查询（单个或多个）
+        """
+        return await asyncio.to_thread(self.execute, query)
+
     def __repr__(self) -> str:
         return f"{self.name}(config={self.config})"
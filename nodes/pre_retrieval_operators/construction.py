@@ -11,6 +11,8 @@ from typing import Dict, Any
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_qwq import ChatQwen
+from .. import _json
+from .._http import http_clients
 from .base import BasePreRetrievalOperator
 
 
@@ -39,6 +41,7 @@ class TextToSQLOperator(BasePreRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def execute(self, query: str) -> str:
@@ -134,6 +137,7 @@ class TextToCypherOperator(BasePreRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def execute(self, query: str) -> str:
@@ -227,6 +231,7 @@ class MetadataFilterOperator(BasePreRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def execute(self, query: str) -> Dict[str, Any]:
@@ -271,11 +276,10 @@ class MetadataFilterOperator(BasePreRetrievalOperator):
         }).strip()
 
         # 尝试解析JSON
-        import json
         try:
-            filter_dict = json.loads(filter_json)
+            filter_dict = _json.loads(filter_json)
             print(f"   提取的过滤条件: {filter_dict}")
             return filter_dict
-        except json.JSONDecodeError:
+        except _json.JSONDecodeError:
             print(f"   ⚠️  无法解析过滤条件，返回空字典")
             return {}
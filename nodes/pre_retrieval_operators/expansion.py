@@ -6,13 +6,48 @@ Query Expansion Operators（查询扩展）
 2. Sub-Query: 将复杂问题分解为多个子问题
 """
 
+import re
 from typing import List, Dict, Any
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_qwq import ChatQwen
+from .. import _json
+from .._http import http_clients
 from .base import BasePreRetrievalOperator
 
 
+def _parse_marshalled(result: str, n: int) -> Dict[int, List[str]]:
+    """
+    解析批量请求的 JSON 输出：{"1": [...], "2": [...], ...}
+
+    Args:
+        result: LLM 输出（可能包裹在 ```json 代码块中）
+        n: 批内查询数量
+
+    Returns:
+        序号（从 1 开始）-> 结果列表；解析失败或缺失的序号不出现在结果中
+    """
+    match = re.search(r"\{.*\}", result, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        data = _json.loads(match.group())
+    except _json.JSONDecodeError:
+        return {}
+
+    parsed = {}
+    for i in range(1, n + 1):
+        items = data.get(str(i))
+        if isinstance(items, list):
+            parsed[i] = [str(item).strip() for item in items if str(item).strip()]
+    return parsed
+
+
+def _format_marshalled_queries(queries: List[str]) -> str:
+    """把一批查询按 1..N 编号，拼成一个请求"""
+    return "\n".join(f"{i}. {q}" for i, q in enumerate(queries, 1))
+
+
 class MultiQueryOperator(BasePreRetrievalOperator):
     """
     Multi-Query 操作器
@@ -31,11 +66,13 @@ class MultiQueryOperator(BasePreRetrievalOperator):
         self.num_queries = self.config.get("num_queries", 3)
         self.model = self.config.get("model", "qwen-plus")
         self.temperature = self.config.get("temperature", 0.7)
+        self.marshal_batch_size = self.config.get("marshal_batch_size", 8)  # 批量处理时每个请求合并的查询数
 
         # 初始化 LLM
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def execute(self, query: str) -> List[str]:
@@ -79,13 +116,7 @@ class MultiQueryOperator(BasePreRetrievalOperator):
 
         # 过滤掉可能的编号
         queries = [q.split(":", 1)[-1].strip() if ":" in q else q for q in queries]
-
-        # 确保包含原始查询
-        if query not in queries:
-            queries.insert(0, query)
-
-        # 限制数量
-        queries = queries[:self.num_queries + 1]
+        queries = self._finalize(query, queries)
 
         print(f"   ✓ 生成了 {len(queries)} 个查询（包含原始查询）")
         for i, q in enumerate(queries, 1):
@@ -93,6 +124,62 @@ class MultiQueryOperator(BasePreRetrievalOperator):
 
         return queries
 
+    def _finalize(self, query: str, variants: List[str]) -> List[str]:
+        """确保包含原始查询，并限制数量"""
+        queries = list(variants)
+        if query not in queries:
+            queries.insert(0, query)
+        return queries[:self.num_queries + 1]
+
+    def execute_many(self, queries: List[str]) -> List[List[str]]:
+        """
+        批量生成查询变体
+
+        每 marshal_batch_size 个查询合并为一次 LLM 调用，要求按编号返回 JSON，
+        请求次数降为原来的 1/N；某个编号解析失败时单独回退到 execute。
+
+        Args:
+            queries: 原始查询列表
+
+        Returns:
+            与 queries 顺序一致的查询列表的列表
+        """
+        print(f"🔄 Multi-Query: 批量为 {len(queries)} 个查询生成变体（每次请求 {self.marshal_batch_size} 个）...")
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", """你是一个查询优化助手。下面给出 N 个按 1..N 编号的用户查询，为每个查询生成 {num_queries} 个语义相似但表述不同的查询变体。
+
+要求：
+1. 从不同角度重新表述原始查询
+2. 保持核心语义不变
+3. 使用不同的关键词和表达方式
+4. 只输出一个 JSON 对象，键为查询编号（字符串），值为该查询的变体列表
+
+示例：
+{{"1": ["机器学习的定义是什么？", "请解释一下机器学习的概念"], "2": ["..."]}}"""),
+            ("human", "{queries}"),
+        ])
+        chain = prompt | self.llm | StrOutputParser()
+
+        results = []
+        for start in range(0, len(queries), self.marshal_batch_size):
+            batch = queries[start:start + self.marshal_batch_size]
+            parsed = _parse_marshalled(
+                chain.invoke({
+                    "queries": _format_marshalled_queries(batch),
+                    "num_queries": self.num_queries,
+                }),
+                len(batch),
+            )
+            for i, query in enumerate(batch, 1):
+                if i in parsed:
+                    results.append(self._finalize(query, parsed[i]))
+                else:
+                    results.append(self.execute(query))
+
+        print(f"   ✓ 批量生成完成")
+        return results
+
 
 class SubQueryOperator(BasePreRetrievalOperator):
     """
@@ -112,11 +199,13 @@ class SubQueryOperator(BasePreRetrievalOperator):
         self.model = self.config.get("model", "qwen-plus")
         self.temperature = self.config.get("temperature", 0.3)
         self.max_sub_queries = self.config.get("max_sub_queries", 4)
+        self.marshal_batch_size = self.config.get("marshal_batch_size", 8)  # 批量处理时每个请求合并的查询数
 
         # 初始化 LLM
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def execute(self, query: str) -> List[str]:
@@ -164,14 +253,12 @@ class SubQueryOperator(BasePreRetrievalOperator):
 
         # 过滤掉可能的编号或前缀
         sub_queries = [q.split(":", 1)[-1].strip() if ":" in q else q for q in sub_queries]
-
-        # 限制数量
-        sub_queries = sub_queries[:self.max_sub_queries]
+        sub_queries = self._finalize(query, sub_queries)
 
         # 如果没有成功分解（只有1个或没有），返回原始查询
-        if len(sub_queries) <= 1:
+        if sub_queries == [query]:
             print(f"   ℹ️  查询无需分解，使用原始查询")
-            return [query]
+            return sub_queries
 
         print(f"   ✓ 分解为 {len(sub_queries)} 个子查询：")
         for i, sq in enumerate(sub_queries, 1):
@@ -179,6 +266,58 @@ class SubQueryOperator(BasePreRetrievalOperator):
 
         return sub_queries
 
+    def _finalize(self, query: str, sub_queries: List[str]) -> List[str]:
+        """限制数量；没有成功分解（只有1个或没有）时返回原始查询"""
+        sub_queries = sub_queries[:self.max_sub_queries]
+        return sub_queries if len(sub_queries) > 1 else [query]
+
+    def execute_many(self, queries: List[str]) -> List[List[str]]:
+        """
+        批量分解查询
+
+        每 marshal_batch_size 个查询合并为一次 LLM 调用，要求按编号返回 JSON；
+        某个编号解析失败时单独回退到 execute。
+
+        Args:
+            queries: 原始查询列表
+
+        Returns:
+            与 queries 顺序一致的子查询列表的列表
+        """
+        print(f"🔍 Sub-Query: 批量分解 {len(queries)} 个查询（每次请求 {self.marshal_batch_size} 个）...")
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", """你是一个查询分解专家。下面给出 N 个按 1..N 编号的用户查询，将每个查询分解为多个简单的子查询。
+
+分解原则：
+1. 识别查询中的多个信息需求
+2. 每个子查询应该是独立的、可以单独回答的
+3. 子查询应该按逻辑顺序排列
+4. 避免过度分解（2-4个子查询为佳），无需分解的查询返回只含原查询的列表
+5. 只输出一个 JSON 对象，键为查询编号（字符串），值为该查询的子查询列表
+
+示例：
+{{"1": ["美国科技行业的当前状况如何？", "美国科技行业存在哪些投资风险？"], "2": ["..."]}}"""),
+            ("human", "{queries}"),
+        ])
+        chain = prompt | self.llm | StrOutputParser()
+
+        results = []
+        for start in range(0, len(queries), self.marshal_batch_size):
+            batch = queries[start:start + self.marshal_batch_size]
+            parsed = _parse_marshalled(
+                chain.invoke({"queries": _format_marshalled_queries(batch)}),
+                len(batch),
+            )
+            for i, query in enumerate(batch, 1):
+                if i in parsed:
+                    results.append(self._finalize(query, parsed[i]))
+                else:
+                    results.append(self.execute(query))
+
+        print(f"   ✓ 批量分解完成")
+        return results
+
 
 class HybridExpansionOperator(BasePreRetrievalOperator):
     """
@@ -11,6 +11,7 @@ from typing import List, Dict, Any
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_qwq import ChatQwen
+from .._http import http_clients
 from .base import BasePreRetrievalOperator
 
 
@@ -39,6 +40,7 @@ class QueryRewriteOperator(BasePreRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def execute(self, query: str) -> str:
@@ -118,6 +120,7 @@ class HyDEOperator(BasePreRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def execute(self, query: str) -> str:
@@ -199,6 +202,7 @@ class StepBackOperator(BasePreRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def execute(self, query: str) -> str:
@@ -269,6 +273,7 @@ class ChainOfThoughtRewriteOperator(BasePreRetrievalOperator):
         self.llm = ChatQwen(
             model=self.model,
             temperature=self.temperature,
+            **http_clients(),
         )
 
     def execute(self, query: str) -> str:
@@ -14,6 +14,7 @@
    - 语义向量检索
    - MMR 多样性检索
    - 多向量融合
+   - 范围检索（FAISS range_search，按相似度阈值返回）
 
 2. Sparse Retrieval（稀疏检索）
    - BM25 算法
@@ -31,7 +32,9 @@
    - 阈值过滤
 """
 
+import asyncio
 from typing import List, Dict, Any, Union
+import numpy as np
 from langchain_core.documents import Document
 from langchain_core.vectorstores import VectorStore
 from langchain_core.retrievers import BaseRetriever
@@ -41,6 +44,7 @@ from .retrieval_operators import (
     DenseRetrieverOperator,
     SemanticRetrieverOperator,
     MultiVectorRetrieverOperator,
+    RangeRetrieverOperator,
     BM25RetrieverOperator,
     TFIDFRetrieverOperator,
     KeywordRetrieverOperator,
@@ -85,6 +89,10 @@ class RetrievalModule:
         """
         self.config = config or {}
         self.strategy = self.config.get("strategy", "dense")
+        # 是否在检索结果上附加向量（doc.metadata["_embedding"]），供检索后模块复用
+        self.attach_embeddings = self.config.get("attach_embeddings", False)
+        self.vectorstore = None
+        self._faiss_positions: Dict[str, int] = {}
         self.operator = self._init_operator()
 
     def _init_operator(self) -> BaseRetrievalOperator:
@@ -98,6 +106,8 @@ class RetrievalModule:
             return SemanticRetrieverOperator(self.config)
         elif strategy == "multi_vector":
             return MultiVectorRetrieverOperator(self.config)
+        elif strategy == "range":
+            return RangeRetrieverOperator(self.config)
 
         # Sparse Retrieval
         elif strategy == "bm25":
@@ -149,6 +159,8 @@ class RetrievalModule:
         print("=" * 60)
 
         retriever = self.operator.build_retriever(**kwargs)
+        self.vectorstore = kwargs.get("vectorstore", None)
+        self._faiss_positions = {}
 
         print("=" * 60)
 
@@ -158,6 +170,7 @@ class RetrievalModule:
         self,
         query: Union[str, List[str]],
         verbose: bool = True,
+        k: int = None,
         **kwargs
     ) -> List[Document]:
         """
@@ -166,6 +179,8 @@ class RetrievalModule:
         Args:
             query: 查询（单个或多个）
             verbose: 是否打印详细信息
+            k: （可选）本次查询返回的文档数，覆盖构建时的配置；
+               同一个已构建的模块可以在不同场景下复用
             **kwargs: 检索参数
 
         Returns:
@@ -181,14 +196,121 @@ class RetrievalModule:
             else:
                 print(f"查询数量: {len(query)}")
 
+        if k is not None:
+            # 向量检索器会把 k 透传给 similarity_search；不支持的检索器则截断结果
+            kwargs["k"] = k
+
         results = self.operator.retrieve(query, **kwargs)
 
+        if k is not None:
+            results = results[:k]
+
+        if self.attach_embeddings and self.vectorstore is not None:
+            results = self._attach_embeddings(results)
+
         if verbose:
             print(f"\n✅ 检索完成，找到 {len(results)} 个文档")
             print("=" * 60)
 
         return results
 
+    def _attach_embeddings(self, documents: List[Document]) -> List[Document]:
+        """
+        为检索到的文档附加向量（doc.metadata["_embedding"]）
+
+        优先读取向量库中已存储的向量（零额外 API 调用）；
+        读取不到时对剩余文档批量 embed 一次。下游的重排序、去冗余等
+        操作直接复用这些向量，不再按文本重复向量化。
+
+        FAISS docstore / BM25 返回的是语料中 Document 的引用，
+        向量只写入浅拷贝的 metadata，不修改已存储的语料（否则 save_local 会把向量一并持久化）。
+
+        Args:
+            documents: 检索到的文档列表
+
+        Returns:
+            附加了向量的文档列表（与输入顺序一致）
+        """
+        pending = [doc for doc in documents if "_embedding" not in doc.metadata]
+        if not pending:
+            return documents
+
+        vectors = {}
+        ids = [doc.id for doc in pending if getattr(doc, "id", None)]
+
+        if ids and hasattr(self.vectorstore, "_collection"):
+            # Chroma：按 id 批量读取已存储的向量
+            try:
+                stored = self.vectorstore._collection.get(ids=ids, include=["embeddings"])
+                vectors = dict(zip(stored["ids"], stored["embeddings"]))
+            except Exception as e:
+                print(f"⚠️  读取已存储向量失败: {e}")
+        elif ids and hasattr(self.vectorstore, "index_to_docstore_id"):
+            # FAISS：docstore id -> 索引位置 -> reconstruct
+            if len(self._faiss_positions) != len(self.vectorstore.index_to_docstore_id):
+                self._faiss_positions = {
+                    doc_id: i for i, doc_id in self.vectorstore.index_to_docstore_id.items()
+                }
+            try:
+                for doc_id in ids:
+                    if doc_id in self._faiss_positions:
+                        vectors[doc_id] = self.vectorstore.index.reconstruct(self._faiss_positions[doc_id])
+            except RuntimeError as e:
+                print(f"⚠️  当前索引不支持读取已存储向量: {e}")
+
+        # 按文档对象记录向量（无 id 的文档也能对应）
+        attached = {}
+        for doc in pending:
+            doc_id = getattr(doc, "id", None)
+            if doc_id in vectors:
+                attached[id(doc)] = vectors[doc_id]
+
+        missing = [doc for doc in pending if id(doc) not in attached]
+        embedding_model = getattr(self.vectorstore, "embeddings", None)
+        if missing and embedding_model is not None:
+            embedded = embedding_model.embed_documents([doc.page_content for doc in missing])
+            for doc, vector in zip(missing, embedded):
+                attached[id(doc)] = vector
+
+        # 同时记录产生向量的模型，检索后模块只在模型一致时复用
+        extra = {}
+        if embedding_model is not None:
+            from .post_retrieval_operators.similarity import embedding_model_id
+            extra["_embedding_model"] = embedding_model_id(embedding_model)
+
+        return [
+            doc.model_copy(update={"metadata": {
+                **doc.metadata,
+                "_embedding": np.asarray(attached[id(doc)], dtype=np.float32),
+                **extra,
+            }})
+            if id(doc) in attached else doc
+            for doc in documents
+        ]
+
+    async def aretrieve(
+        self,
+        query: Union[str, List[str]],
+        verbose: bool = True,
+        k: int = None,
+        **kwargs
+    ) -> List[Document]:
+        """
+        异步执行检索
+
+        同步检索器放到线程中运行，多个检索可与其他 IO 任务并发执行。
+
+        Args:
+            query: 查询（单个或多个）
+            verbose: 是否打印详细信息
+            k: （可选）本次查询返回的文档数
+            **kwargs: 检索参数
+
+        Returns:
+            检索到的文档列表
+        """
+        return await asyncio.to_thread(self.retrieve, query, verbose, k, **kwargs)
+
     def change_strategy(self, new_strategy: str, new_config: Dict[str, Any] = None):
         """
         动态更换检索策略
@@ -13,6 +13,7 @@ from .dense import (
     DenseRetrieverOperator,
     SemanticRetrieverOperator,
     MultiVectorRetrieverOperator,
+    RangeRetrieverOperator,
 )
 from .sparse import (
     BM25RetrieverOperator,
@@ -36,6 +37,7 @@ __all__ = [
     "DenseRetrieverOperator",
     "SemanticRetrieverOperator",
     "MultiVectorRetrieverOperator",
+    "RangeRetrieverOperator",
     "BM25RetrieverOperator",
     "TFIDFRetrieverOperator",
     "KeywordRetrieverOperator",
@@ -7,7 +7,7 @@ Dense Retrieval Operators（密集检索/向量检索）
 - 更好地捕获复杂语义
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
 from langchain_core.vectorstores import VectorStore
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.documents import Document
@@ -32,7 +32,7 @@ class DenseRetrieverOperator(BaseRetrievalOperator):
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config)
         self.search_type = self.config.get("search_type", "similarity")
-        self.search_kwargs = self.config.get("search_kwargs", {"k": 5})
+        self.search_kwargs = self.config.get("search_kwargs", {"k": self.config.get("k", 5)})
         self.vectorstore = None
 
     def build_retriever(self, vectorstore: VectorStore = None, **kwargs) -> BaseRetriever:
@@ -251,3 +251,102 @@ class MultiVectorRetrieverOperator(BaseRetrievalOperator):
         )
 
         return [item["doc"] for item in sorted_docs]
+
+
+class RangeRetrieverOperator(DenseRetrieverOperator):
+    """
+    Range Retriever 操作器（FAISS 范围检索）
+
+    功能：
+    - 调用 FAISS index.range_search，直接返回相似度达到阈值的全部文档
+    - 把「先取 top-k 再按阈值过滤」下推到索引内部完成
+
+    优势：
+    - 返回数量由相关性决定，不需要预估 k
+    - 避免过量召回后在 Python 侧逐个过滤
+
+    说明：
+    - 需要 FAISS 向量库（推荐 faiss_hnsw，内积度量 + L2 归一化）
+    - 内积度量下 radius 为最小相似度；L2 度量下 radius 为最大（平方）距离
+    """
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self.radius = self.config.get("radius", 0.5)
+        self.max_results = self.config.get("max_results", None)  # 可选：结果数量上限
+
+    def build_retriever(self, vectorstore: VectorStore = None, **kwargs) -> BaseRetriever:
+        """
+        从 FAISS 向量库构建范围检索器
+
+        Args:
+            vectorstore: FAISS 向量数据库实例
+            **kwargs: 额外参数
+
+        Returns:
+            检索器实例（组合检索时按普通向量检索使用）
+        """
+        if vectorstore is None or not hasattr(vectorstore, "index_to_docstore_id"):
+            raise ValueError("Range Retriever 需要 FAISS 向量数据库")
+
+        retriever = super().build_retriever(vectorstore=vectorstore, **kwargs)
+        print(f"   - 范围阈值: {self.radius}")
+
+        return retriever
+
+    def retrieve(self, query: Union[str, List[str]], **kwargs) -> List[Document]:
+        """
+        范围检索
+
+        多个查询时一次 range_search 批量检索，结果按查询顺序拼接后去重。
+
+        Args:
+            query: 查询（单个或多个）
+            **kwargs: 检索参数
+                - radius: 覆盖配置中的阈值
+                - k: 每个查询的结果数量上限
+
+        Returns:
+            满足阈值的文档列表（按相关性排序），metadata 中包含 range_score
+        """
+        import faiss
+        import numpy as np
+
+        if self.vectorstore is None:
+            raise ValueError("检索器未初始化，请先调用 build_retriever()")
+
+        queries = [query] if isinstance(query, str) else list(query)
+        if not queries:
+            return []
+
+        radius = kwargs.get("radius", self.radius)
+        limit = kwargs.get("k", self.max_results)
+        index = self.vectorstore.index
+
+        embed_query = self.vectorstore.embedding_function.embed_query
+        vectors = np.asarray([embed_query(q) for q in queries], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(vectors)
+
+        lims, all_scores, all_positions = index.range_search(vectors, radius)
+
+        # 内积越大越相关，L2 距离越小越相关
+        similarity_first = index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+        documents = []
+        for start, end in zip(lims[:-1], lims[1:]):
+            scores, positions = all_scores[start:end], all_positions[start:end]
+            order = np.argsort(-scores if similarity_first else scores, kind="stable")
+            if limit is not None:
+                order = order[:limit]
+
+            for i in order:
+                doc_id = self.vectorstore.index_to_docstore_id[int(positions[i])]
+                doc = self.vectorstore.docstore.search(doc_id)
+                if not isinstance(doc, Document):
+                    continue
+                doc = Document(id=doc_id, page_content=doc.page_content, metadata=dict(doc.metadata))
+                doc.metadata["range_score"] = float(scores[i])
+                documents.append(doc)
+
+        return documents if isinstance(query, str) else self._deduplicate_documents(documents)
@@ -4,6 +4,7 @@
 - Knowledge Graph Indexing (知识图谱索引)
 """
 
+from .base import BaseIndexStrategy, FlatIndexStrategy
 from .hierarchical import HierarchicalIndexStrategy
 
-__all__ = ["HierarchicalIndexStrategy"]
+__all__ = ["BaseIndexStrategy", "FlatIndexStrategy", "HierarchicalIndexStrategy"]
@@ -0,0 +1,53 @@
+"""
+索引策略基类
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+from langchain_core.documents import Document
+
+
+class BaseIndexStrategy(ABC):
+    """
+    索引策略基类
+
+    IndexModule 在分块之后调用 apply()，由策略决定最终入库的文档列表；
+    新增策略只需实现 apply()，不需要修改 IndexModule。
+
+    streamable 表示 apply() 可以逐个文件调用（流式索引时每次只传入一个文件的文档）。
+    """
+
+    streamable = True
+
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        初始化策略
+
+        Args:
+            config: 配置字典
+        """
+        self.config = config or {}
+
+    @abstractmethod
+    def apply(self, documents: List[Document], splits: List[Document]) -> List[Document]:
+        """
+        应用索引策略
+
+        Args:
+            documents: 加载得到的原始文档
+            splits: 分块器输出的文档块
+
+        Returns:
+            最终入库的文档列表
+        """
+        pass
+
+
+class FlatIndexStrategy(BaseIndexStrategy):
+    """
+    平铺索引策略：直接使用分块器输出的文档块
+    """
+
+    def apply(self, documents: List[Document], splits: List[Document]) -> List[Document]:
+        """原样返回文档块"""
+        return splits
@@ -23,6 +23,7 @@ from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.vectorstores import VectorStore
+from .base import BaseIndexStrategy
 
 
 class HierarchicalNode:
@@ -75,7 +76,7 @@ class HierarchicalNode:
         return Document(page_content=content, metadata=metadata)
 
 
-class HierarchicalIndexStrategy:
+class HierarchicalIndexStrategy(BaseIndexStrategy):
     """
     层次化索引策略
 
@@ -85,11 +86,18 @@ class HierarchicalIndexStrategy:
     - 需要保留文档结构信息
     """
 
+    # 节点 ID 按整个语料中的文档序号编号，需要一次传入全部文档
+    streamable = False
+
     def __init__(self, config: Dict[str, Any] = None):
-        self.config = config or {}
+        super().__init__(config)
         self.nodes: Dict[str, HierarchicalNode] = {}  # node_id -> node
         self.root_nodes: List[str] = []  # 根节点 ID 列表
 
+    def apply(self, documents: List[Document], splits: List[Document]) -> List[Document]:
+        """层次化策略基于原始文档重新构建节点，不使用分块器的输出"""
+        return self.build_hierarchy(documents)
+
     def build_hierarchy(
         self, documents: List[Document], chunk_size: int = 1000
     ) -> List[Document]: